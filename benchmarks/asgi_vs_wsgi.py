@@ -0,0 +1,202 @@
+"""
+Compare the gunicorn WSGI deployment with uvicorn ASGI under high concurrency.
+
+Seeds a throwaway database, then starts each server in turn against it:
+
+- ``wsgi``: ``gunicorn library_system.wsgi --workers 3`` (as in ``Procfile``
+  and ``docker-compose.yml``) serving the DRF views;
+- ``asgi``: ``uvicorn library_system.asgi:application --workers 3`` serving
+  the same DRF views (run in a thread per request);
+- ``asgi-async``: the same uvicorn server hitting the native async views
+  under ``/api/async/``.
+
+An asyncio load generator keeps ``--concurrency`` connections busy for
+``--duration`` seconds per endpoint and reports throughput, latency
+percentiles and errors. The response cache is disabled unless
+``--response-cache`` is given, so every request reaches the database.
+
+    python -m benchmarks.asgi_vs_wsgi --concurrency 50 200 --duration 10 --json asgi.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import BASE_DIR, SURNAMES, analyze, seed_books, setup_django, summarize, write_json
+
+SERVERS = {
+    'wsgi': ['gunicorn', 'library_system.wsgi', '--workers', '3', '--timeout', '25', '--bind', '127.0.0.1:{port}'],
+    'asgi': ['uvicorn', 'library_system.asgi:application', '--workers', '3', '--port', '{port}',
+             '--log-level', 'warning', '--no-access-log'],
+}
+# (scenario, server, path prefix)
+DEPLOYMENTS = [('wsgi', 'wsgi', '/api/'), ('asgi', 'asgi', '/api/'), ('asgi-async', 'asgi', '/api/async/')]
+
+
+def endpoints(books: int, token: str) -> Dict[str, Callable[[random.Random], tuple]]:
+    """
+    Return request builders (path relative to the prefix, headers) for each benchmarked endpoint.
+    """
+    auth = {'Authorization': f'Bearer {token}'}
+    return {
+        'books_list': lambda rng: (f'books/?page={rng.randint(1, 50)}', {}),
+        'books_retrieve': lambda rng: (f'books/{rng.randint(1, books)}/', {}),
+        'books_search': lambda rng: (f'books/?search={rng.choice(SURNAMES).lower()}', {}),
+        'loans_list': lambda rng: ('loans/', auth),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    command = [arg.format(port=port) for arg in SERVERS[name]]
+    process = subprocess.Popen([sys.executable, '-m', *command], cwd=BASE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} server did not start on port {port}")
+
+
+async def fetch(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str,
+                headers: Dict[str, str]) -> tuple:
+    """
+    Send one keep-alive GET and read the response; returns ``(status, keep_alive)``.
+    """
+    lines = [f'GET {path} HTTP/1.1', 'Host: 127.0.0.1', 'Connection: keep-alive']
+    lines += [f'{key}: {value}' for key, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length, keep_alive, chunked = 0, True, False
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        key, _, value = line.partition(':')
+        key, value = key.lower(), value.strip().lower()
+        if key == 'content-length':
+            length = int(value)
+        elif key == 'connection' and value == 'close':
+            keep_alive = False
+        elif key == 'transfer-encoding' and value == 'chunked':
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def load(port: int, prefix: str, build: Callable, concurrency: int, duration: float) -> Dict[str, Any]:
+    durations: List[float] = []
+    errors: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        connection: Optional[tuple] = None
+        while time.perf_counter() < deadline:
+            path, headers = build(rng)
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection('127.0.0.1', port)
+                status, keep_alive = await fetch(*connection, prefix + path, headers)
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError) as exc:
+                errors[type(exc).__name__] = errors.get(type(exc).__name__, 0) + 1
+                connection = None
+                continue
+            durations.append(time.perf_counter() - started)
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+            if not keep_alive:
+                connection[1].close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {'throughput_rps': len(durations) / elapsed, 'errors': errors, **summarize(durations or [0.0])}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=20_000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per endpoint and concurrency.')
+    parser.add_argument('--response-cache', action='store_true', help='Keep the response cache enabled.')
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    database = setup_django()
+
+    from library.models import Book, Loan, User
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    print(f"seeding {args.books} books...", flush=True)
+    seed_books(args.books)
+    reader = User.objects.create_user(username='bench-reader', password='bench-Pass-123')
+    Loan.objects.bulk_create(
+        Loan(user=reader, book_id=pk) for pk in Book.objects.values_list('pk', flat=True)[:30]
+    )
+    analyze()
+    token = str(RefreshToken.for_user(reader).access_token)
+    builders = endpoints(Book.objects.count(), token)
+
+    env = {
+        **os.environ,
+        'LIBRARY_DATABASE_URL': f'sqlite:///{database}',
+        'REQUEST_LOG_LEVEL': 'WARNING',
+        'PYTHONPATH': str(BASE_DIR),
+        # Nothing is written while it runs, so per-worker caches cannot go stale
+        'LIBRARY_RESPONSE_CACHE': str(args.response_cache),
+        'LIBRARY_AUTH_CACHE_TIMEOUT': '60',
+    }
+
+    results = []
+    for server in SERVERS:
+        port = free_port()
+        process = start_server(server, port, env)
+        try:
+            for scenario, deployment_server, prefix in DEPLOYMENTS:
+                if deployment_server != server:
+                    continue
+                for concurrency in args.concurrency:
+                    for endpoint, build in builders.items():
+                        row = {'deployment': scenario, 'endpoint': endpoint, 'concurrency': concurrency,
+                               **asyncio.run(load(port, prefix, build, concurrency, args.duration))}
+                        results.append(row)
+                        print(f"{scenario:<11} c={concurrency:<4} {endpoint:<15} "
+                              f"{row['throughput_rps']:8.1f} req/s p50={row['p50_ms']:8.2f}ms "
+                              f"p99={row['p99_ms']:8.2f}ms errors={row['errors']}", flush=True)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    write_json(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
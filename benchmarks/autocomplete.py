@@ -0,0 +1,76 @@
+"""
+Typeahead lookups from the in-process prefix index versus the search endpoint.
+
+For each catalog size, builds the index and reports its build time and
+memory, then replays what a search box sends while someone types: every
+prefix of a title or author word, one keystroke at a time. Each prefix is
+looked up in the index (uncached and memoized) and, for comparison, through
+the full-text search the search box used before (``COUNT`` plus first page).
+
+    python -m benchmarks.autocomplete --sizes 10000 100000 --json autocomplete.json
+"""
+import argparse
+import random
+
+from benchmarks.common import SURNAMES, measure, seed_books, setup_django, summarize, write_json, zipf_word
+
+
+def keystrokes(rng: random.Random, count: int) -> list:
+    # Every prefix of ``count`` typed words, e.g. "g", "go", "gol", "gold", ...
+    words = [zipf_word(rng) if rng.random() < 0.7 else rng.choice(SURNAMES).lower() for _ in range(count)]
+    return [word[:end] for word in words for end in range(1, len(word) + 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--words', type=int, default=200, help='Words typed per size.')
+    parser.add_argument('--limit', type=int, default=8, help='Suggestions per lookup.')
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from library.autocomplete import PrefixIndex
+    from library.models import Book
+    from library.search import search_books
+
+    results = []
+    seeded = 0
+    for size in sorted(args.sizes):
+        seed_books(size, start=seeded)
+        seeded = size
+
+        rows = list(Book.objects.values_list('pk', 'title', 'author'))
+        [build] = measure(lambda: PrefixIndex.build(rows), 1)
+        index = PrefixIndex.build(rows)
+        memory = index.memory_usage()
+        prefixes = keystrokes(random.Random(size), args.words)
+
+        uncached, memoized, search = [], [], []
+        for prefix in prefixes:
+            index.memo.clear()
+            uncached += measure(lambda: index.complete(prefix, args.limit), 1)
+            memoized += measure(lambda: index.complete(prefix, args.limit), 1)
+        for prefix in prefixes[:100]:
+            queryset = search_books(Book.objects.all(), prefix)
+            search += measure(lambda: (queryset.count(), list(queryset[:10])), 1)
+
+        row = {
+            'books': size, 'build_ms': build * 1000, **memory, 'bytes_per_book': memory['bytes'] / size,
+            'lookup_uncached': summarize(uncached),
+            'lookup_memoized': summarize(memoized),
+            'search_endpoint_queries': summarize(search),
+        }
+        results.append(row)
+        print(f"{size:>8} books: build {row['build_ms']:7.1f}ms, {memory['entries']} entries, "
+              f"{memory['bytes'] / 2 ** 20:6.1f} MiB ({row['bytes_per_book']:.0f} B/book); "
+              f"lookup p50={row['lookup_uncached']['p50_ms']:.3f}ms p99={row['lookup_uncached']['p99_ms']:.3f}ms "
+              f"(memoized p99={row['lookup_memoized']['p99_ms']:.4f}ms); "
+              f"search p50={row['search_endpoint_queries']['p50_ms']:.2f}ms", flush=True)
+
+    write_json(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Concurrency stress test for the borrow path.
+
+Each round puts one book back on the shelf and releases ``--concurrency``
+threads at once, each POSTing ``/api/loans/`` for that book as a different
+user. Exactly one borrow per round may succeed; anything else is reported
+as a double loan. Prints throughput and latency percentiles.
+
+    python -m benchmarks.borrow_contention --concurrency 200 --rounds 10
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+from benchmarks.common import setup_django, summarize, write_json
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from rest_framework.test import APIClient
+    from library.models import Book, Loan, User
+
+    users = User.objects.bulk_create(
+        [User(username=f"bench{i}") for i in range(args.concurrency)]
+    )
+    book = Book.objects.create(title="Contended", author="Author", isbn="9990000000000", page_count=1)
+    connection.close()
+
+    durations = []
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def borrow(user, barrier):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            status_code = client.post('/api/loans/', {'book': book.pk}, format='json').status_code
+        except Exception as exc:  # "database is locked" and friends
+            status_code = type(exc).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            durations.append(elapsed)
+            outcomes[status_code] += 1
+        connection.close()
+
+    double_loans = 0
+    wall = 0.0
+    for _ in range(args.rounds):
+        Loan.objects.all().delete()
+        Book.objects.filter(pk=book.pk).update(total_copies=1, available_copies=1, available=True)
+        connection.close()
+
+        barrier = threading.Barrier(args.concurrency)
+        threads = [threading.Thread(target=borrow, args=(user, barrier)) for user in users]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall += time.perf_counter() - started
+
+        if Loan.objects.filter(book=book).count() > 1:
+            double_loans += 1
+
+    requests = args.concurrency * args.rounds
+    result = {
+        'requests': requests,
+        'throughput_rps': requests / wall,
+        'outcomes': {str(key): value for key, value in outcomes.items()},
+        'rounds_with_double_loans': double_loans,
+        **summarize(durations),
+    }
+    print(f"{requests} borrows in {wall:.2f}s ({result['throughput_rps']:.0f} req/s)")
+    print(f"p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms p99={result['p99_ms']:.1f}ms")
+    print(f"outcomes: {result['outcomes']}")
+    print(f"rounds with more than one loan: {double_loans}")
+    write_json(args.json, result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway, fully migrated SQLite database so they
+never touch ``db.sqlite3``. Call :func:`setup_django` before importing any
+models.
+"""
+import atexit
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+WORDS = (
+    'ancient', 'river', 'shadow', 'garden', 'empire', 'silent', 'winter', 'golden', 'hidden', 'forest',
+    'storm', 'letters', 'machine', 'journey', 'kingdom', 'ocean', 'secret', 'history', 'night', 'city',
+    'dragon', 'glass', 'memory', 'stone', 'summer', 'island', 'fire', 'song', 'war', 'house',
+    'broken', 'wild', 'last', 'lost', 'paper', 'iron', 'quiet', 'crimson', 'northern', 'little',
+)
+SYLLABLES = ('ka', 'lo', 'mi', 'ren', 'tor', 'sa', 'vel', 'dun', 'ar', 'is', 'quo', 'ben', 'shi', 'pa', 'zel')
+
+# A larger synthetic vocabulary so term frequencies look like a real catalog:
+# a handful of very common words and a long tail of rare ones.
+VOCABULARY = WORDS + tuple(
+    a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES
+)
+
+SURNAMES = (
+    'Smith', 'Garcia', 'Kowalski', 'Tanaka', 'Okafor', 'Novak', 'Schmidt', 'Rossi', 'Dubois', 'Silva',
+    'Ivanova', 'Kim', 'Nguyen', 'Murphy', 'Jensen', 'Haddad', 'Costa', 'Moreau', 'Fischer', 'Petrov',
+)
+
+
+def setup_django(database: Optional[str] = None) -> str:
+    """
+    Configure Django against a fresh migrated SQLite database and return its path.
+
+    A temporary file is used (and removed at exit) unless ``database`` is given.
+    """
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_system.settings')
+
+    import django
+    from django.conf import settings
+
+    if database is None:
+        handle, database = tempfile.mkstemp(prefix='library-bench-', suffix='.sqlite3')
+        os.close(handle)
+        atexit.register(_remove_database, database)
+    settings.DATABASES['default']['NAME'] = database
+    settings.DEBUG = False
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return database
+
+
+def _remove_database(path: str) -> None:
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def zipf_word(rng: random.Random) -> str:
+    """
+    Pick a vocabulary word with a long-tailed (Zipf-like) distribution.
+    """
+    if rng.random() < 0.5:
+        return VOCABULARY[min(int(rng.paretovariate(1.0)), len(VOCABULARY)) - 1]
+    return rng.choice(VOCABULARY)
+
+
+def book_rows(start: int, stop: int, seed: int = 1) -> Iterable[Dict[str, Any]]:
+    """
+    Yield deterministic fake book rows numbered ``start`` to ``stop - 1``.
+    """
+    rng = random.Random(seed * 1_000_003 + start)
+    for number in range(start, stop):
+        yield {
+            'title': ' '.join(zipf_word(rng) for _ in range(rng.randint(2, 5))).title(),
+            'author': f"{rng.choice(WORDS).title()} {rng.choice(SURNAMES)}",
+            'isbn': f"{9780000000000 + number:013d}",
+            'page_count': rng.randint(40, 1200),
+        }
+
+
+def seed_books(count: int, start: int = 0, batch_size: int = 5000) -> None:
+    """
+    Insert books numbered ``start`` to ``count - 1`` with ``bulk_create``.
+    """
+    from library.models import Book
+
+    for offset in range(start, count, batch_size):
+        rows = book_rows(offset, min(offset + batch_size, count))
+        Book.objects.bulk_create([Book(**row) for row in rows], batch_size=batch_size)
+
+
+def analyze() -> None:
+    """
+    Refresh planner statistics after seeding.
+    """
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def measure(func: Callable[[], Any], repeat: int) -> List[float]:
+    """
+    Call ``func`` ``repeat`` times and return the wall-clock durations in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """
+    Summarize durations (seconds) as milliseconds.
+    """
+    return {
+        'n': len(durations),
+        'mean_ms': statistics.mean(durations) * 1000,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p95_ms': percentile(durations, 95) * 1000,
+        'p99_ms': percentile(durations, 99) * 1000,
+    }
+
+
+def write_json(path: Optional[str], payload: Any) -> None:
+    if path:
+        with open(path, 'w') as handle:
+            json.dump(payload, handle, indent=2, default=str)
+        print(f"wrote {path}")
@@ -0,0 +1,196 @@
+"""
+Latency, throughput and SQL query count for every route in ``library/urls.py``.
+
+The database is seeded at each scale factor (``--scales 1 10`` means 1x and
+10x of ``BASE_SCALE``) and every route is called ``--requests`` times through
+the full Django stack with real JWT authentication. Password hashing routes
+(register, login) are called ``--auth-requests`` times. The response cache
+is cleared before each request unless ``--warm-cache`` is given, so the
+numbers reflect the database path.
+
+    python -m benchmarks.endpoints --scales 1 10 --json endpoints.json
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import quote
+
+from benchmarks.common import SURNAMES, analyze, seed_books, setup_django, summarize, write_json
+
+BASE_SCALE = {'users': 100, 'books': 2000, 'loans': 5000}
+PASSWORD = 'bench-Pass-123'
+
+
+def seed(target: Dict[str, int], current: Dict[str, int]) -> None:
+    """
+    Top the database up to ``target`` users, books and loans.
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.utils import timezone
+    from library.models import Book, Loan, User, due_date
+
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(username=f"bench{i}", email=f"bench{i}@example.com", password=password)
+        for i in range(current['users'], target['users'])
+    )
+    seed_books(target['books'], start=current['books'])
+
+    rng = random.Random(current['loans'])
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    book_ids = list(Book.objects.values_list('pk', flat=True))
+    now = timezone.now()
+    loans = []
+    for _ in range(current['loans'], target['loans']):
+        borrowed = now - timedelta(days=rng.randint(1, 720))
+        loans.append(Loan(user_id=rng.choice(user_ids), book_id=rng.choice(book_ids), borrowed_at=borrowed,
+                          due_at=due_date(borrowed), returned_at=borrowed + timedelta(days=rng.randint(1, 30))))
+    Loan.objects.bulk_create(loans, batch_size=5000)
+    current.update(target)
+
+
+def routes(ctx: Dict[str, Any], requests: int, auth_requests: int) -> List[Tuple[str, int, Callable]]:
+    """
+    Return ``(name, calls, build)`` scenarios in the order they must run (borrows before returns).
+
+    ``build(ctx, i)`` returns the ``(method, path, data, access_token)`` of the i-th call.
+    """
+    reader, admin = ctx['reader'], ctx['admin']
+    author, book_id = ctx['author'], ctx['book_id']
+
+    def borrow(ctx, i):
+        return 'post', '/api/loans/', {'book': next(ctx['shelf'])}, reader
+
+    def return_loan(ctx, i):
+        return 'post', f"/api/return/{ctx['loans'].pop()}/", None, reader
+
+    def bulk_borrow(ctx, i):
+        return 'post', '/api/loans/bulk/', {'books': [next(ctx['shelf']) for _ in range(10)]}, reader
+
+    def bulk_return(ctx, i):
+        return 'post', '/api/return/bulk/', {'loans': [ctx['loans'].pop() for _ in range(10)]}, reader
+
+    def register(ctx, i):
+        return 'post', '/api/auth/register/', {
+            'username': f"new{ctx['scale']}x{i}", 'email': f"new{i}@example.com", 'password': PASSWORD,
+        }, None
+
+    return [
+        ('api_root', requests, lambda ctx, i: ('get', '/api/', None, reader)),
+        ('books_list', requests, lambda ctx, i: ('get', f'/api/books/?page={i % 20 + 1}', None, None)),
+        ('books_filter_author', requests, lambda ctx, i: ('get', f'/api/books/?author={quote(author)}', None, None)),
+        ('books_filter_available', requests, lambda ctx, i: ('get', '/api/books/?available=true', None, None)),
+        ('books_order_title', requests, lambda ctx, i: ('get', '/api/books/?ordering=title', None, None)),
+        ('books_order_pages', requests, lambda ctx, i: ('get', '/api/books/?ordering=-page_count', None, None)),
+        ('books_search', requests, lambda ctx, i: ('get', f'/api/books/?search={SURNAMES[i % 20]}', None, None)),
+        ('books_facets', requests, lambda ctx, i: ('get', f'/api/books/?search={SURNAMES[i % 20]}&facets=true',
+                                                   None, None)),
+        ('books_cursor', requests, lambda ctx, i: ('get', '/api/books/?pagination=cursor&ordering=title',
+                                                   None, None)),
+        ('books_autocomplete', requests, lambda ctx, i: ('get', f'/api/books/autocomplete/?q={SURNAMES[i % 20][:3]}',
+                                                         None, None)),
+        ('books_retrieve', requests, lambda ctx, i: ('get', f'/api/books/{book_id + i}/', None, None)),
+        ('register', auth_requests, register),
+        ('login', auth_requests, lambda ctx, i: ('post', '/api/auth/login/',
+                                                 {'username': 'bench0', 'password': PASSWORD}, None)),
+        ('token_refresh', requests, lambda ctx, i: ('post', '/api/auth/token/refresh/',
+                                                    {'refresh': ctx['refresh']}, None)),
+        ('loans_list', requests, lambda ctx, i: ('get', '/api/loans/', None, reader)),
+        ('loans_list_admin', requests, lambda ctx, i: ('get', '/api/loans/?status=returned', None, admin)),
+        ('borrow', requests, borrow),
+        ('return', requests, return_loan),
+        ('bulk_borrow', requests, bulk_borrow),
+        ('bulk_return', requests, bulk_return),
+        ('export_books', min(requests, 5), lambda ctx, i: ('get', '/api/export/books/', None, admin)),
+        ('export_loans', min(requests, 5), lambda ctx, i: ('get', '/api/export/loans/?output=jsonl', None, admin)),
+        ('metrics', requests, lambda ctx, i: ('get', '/api/metrics/', None, admin)),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--requests', type=int, default=50, help='Calls per route.')
+    parser.add_argument('--auth-requests', type=int, default=5, help='Calls per password hashing route.')
+    parser.add_argument('--warm-cache', action='store_true', help='Keep the response cache between calls.')
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.cache import caches
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from library.models import Book, Loan, User
+
+    client = APIClient()
+    current = {'users': 0, 'books': 0, 'loans': 0}
+    User.objects.create_user(username='bench-admin', password=PASSWORD, is_admin=True)
+    results = []
+
+    def token(username):
+        response = client.post('/api/auth/login/', {'username': username, 'password': PASSWORD}, format='json')
+        return response.data
+
+    for scale in sorted(args.scales):
+        target = {key: value * scale for key, value in BASE_SCALE.items()}
+        print(f"seeding {target}...", flush=True)
+        seed(target, current)
+        analyze()
+
+        reader_tokens = token('bench0')
+        # Books nobody has borrowed yet: borrows draw from here, returns close what they opened
+        borrowed = Loan.objects.filter(returned_at__isnull=True).values_list('book_id', flat=True)
+        shelf = Book.objects.filter(available=True).exclude(pk__in=borrowed).values_list('pk', flat=True)
+        ctx = {
+            'scale': scale,
+            'reader': reader_tokens['access'],
+            'refresh': reader_tokens['refresh'],
+            'admin': token('bench-admin')['access'],
+            'author': Book.objects.values_list('author', flat=True).first(),
+            'book_id': Book.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'shelf': iter(list(shelf)),
+            'loans': [],
+        }
+
+        for name, calls, build in routes(ctx, args.requests, args.auth_requests):
+            durations, queries, statuses = [], [], Counter()
+            for i in range(calls):
+                method, path, data, access = build(ctx, i)
+                if not args.warm_cache:
+                    caches['default'].clear()
+                client.credentials(**({'HTTP_AUTHORIZATION': f'Bearer {access}'} if access else {}))
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(path, data, format='json')
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    durations.append(time.perf_counter() - started)
+                queries.append(sum(1 for query in captured.captured_queries if 'SAVEPOINT' not in query['sql']))
+                statuses[response.status_code] += 1
+                if name == 'borrow':
+                    ctx['loans'].append(response.data['id'])
+                elif name == 'bulk_borrow':
+                    ctx['loans'].extend(r['loan'] for r in response.data['results'] if 'loan' in r)
+            client.credentials()
+
+            row = {
+                'scale': scale, **target, 'route': name,
+                'throughput_rps': len(durations) / sum(durations),
+                'queries_min': min(queries), 'queries_max': max(queries),
+                'statuses': {str(code): count for code, count in statuses.items()},
+                **summarize(durations),
+            }
+            results.append(row)
+            print(f"{scale:>4}x {name:<24} p50={row['p50_ms']:8.2f}ms p95={row['p95_ms']:8.2f}ms "
+                  f"{row['throughput_rps']:8.1f} req/s queries={row['queries_max']:<3} {row['statuses']}")
+
+    write_json(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Compare the full-text book search with the old ``SearchFilter`` path.
+
+Both paths evaluate what ``GET /api/books/?search=...`` costs the database:
+the paginator's ``COUNT`` plus the first page of results.
+
+    python -m benchmarks.search --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+
+from benchmarks.common import SURNAMES, analyze, measure, seed_books, setup_django, summarize, write_json, zipf_word
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=50, help='Distinct search strings per size.')
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from functools import reduce
+    import operator
+
+    from django.db.models import Q
+    from library.models import Book
+    from library.search import search_books
+
+    def legacy(term):
+        conditions = (
+            Q(title__icontains=word) | Q(author__icontains=word) | Q(isbn__icontains=word)
+            for word in term.split()
+        )
+        return Book.objects.filter(reduce(operator.and_, conditions)).order_by('id')
+
+    def full_text(term):
+        return search_books(Book.objects.all(), term)
+
+    def page(build, term):
+        queryset = build(term)
+        queryset.count()
+        list(queryset[:args.page_size])
+
+    rng = random.Random(7)
+    terms = [
+        rng.choice([
+            zipf_word(rng),
+            f"{zipf_word(rng)} {zipf_word(rng)}",
+            rng.choice(SURNAMES).lower(),
+            zipf_word(rng)[:4],
+        ])
+        for _ in range(args.queries)
+    ]
+
+    results = []
+    seeded = 0
+    for size in sorted(args.sizes):
+        print(f"seeding {size} books...", flush=True)
+        seed_books(size, start=seeded)
+        seeded = size
+        analyze()
+
+        for name, build in (('search_filter', legacy), ('full_text', full_text)):
+            durations = []
+            for term in terms:
+                durations.extend(measure(lambda: page(build, term), repeat=3))
+            row = {'books': size, 'backend': name, **summarize(durations)}
+            results.append(row)
+            print(f"{size:>9} {name:<14} p50={row['p50_ms']:8.2f}ms p95={row['p95_ms']:8.2f}ms "
+                  f"p99={row['p99_ms']:8.2f}ms")
+
+    write_json(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Time to load, serialize and render 1,000 books (or loans) per response path.
+
+- ``drf``: DRF's per-field ``ListSerializer`` and ``JSONRenderer``, as the
+  list endpoints used before;
+- ``fast``: ``FastListSerializer`` and ``TimedJSONRenderer`` (orjson when it
+  is installed, the standard library otherwise);
+- ``fast+fields``: the same with ``?fields=id,title,author`` (``.only()``
+  in the ``SELECT``).
+
+Each phase is timed separately so the serializer and renderer gains can be
+told apart from the query.
+
+    python -m benchmarks.serialization --rows 1000 --repeat 50 --json serialization.json
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import seed_books, setup_django, summarize, write_json
+
+
+def run(load: Callable[[], List[Any]], serialize: Callable[[List[Any]], Any], render: Callable[[Any], bytes],
+        repeat: int) -> Dict[str, Any]:
+    phases: Dict[str, List[float]] = {'query': [], 'serialize': [], 'render': [], 'total': []}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = load()
+        loaded = time.perf_counter()
+        data = serialize(rows)
+        serialized = time.perf_counter()
+        body = render(data)
+        rendered = time.perf_counter()
+        for phase, duration in (('query', loaded - started), ('serialize', serialized - loaded),
+                                ('render', rendered - serialized), ('total', rendered - started)):
+            phases[phase].append(duration)
+    row = {phase: summarize(durations)['p50_ms'] for phase, durations in phases.items()}
+    row['bytes'] = len(body)
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework import serializers
+    from rest_framework.renderers import JSONRenderer
+    from library import renderers
+    from library.fieldsets import narrow_queryset
+    from library.models import Book, Loan, User
+    from library.serializers import BookSerializer, LoanSerializer
+
+    seed_books(args.rows)
+    reader = User.objects.create_user(username='bench-reader', password='bench-Pass-123')
+    Loan.objects.bulk_create(Loan(user=reader, book_id=pk) for pk in Book.objects.values_list('pk', flat=True))
+    print(f"orjson: {'installed' if renderers.orjson else 'not installed'}", flush=True)
+
+    def paths(serializer_class: type, fields: Optional[List[str]]) -> Dict[str, tuple]:
+        queryset = serializer_class.Meta.model.objects.order_by('pk')[:args.rows]
+        return {
+            'drf': (lambda: list(queryset.all()),
+                    lambda rows: serializers.ListSerializer(child=serializer_class(), instance=rows).data,
+                    JSONRenderer().render),
+            'fast': (lambda: list(queryset.all()), lambda rows: serializer_class(rows, many=True).data,
+                     renderers.TimedJSONRenderer().render),
+            'fast+fields': (lambda: list(narrow_queryset(queryset, serializer_class, fields)),
+                            lambda rows: serializer_class(rows, many=True, context={'fields': fields}).data,
+                            renderers.TimedJSONRenderer().render),
+        }
+
+    results = []
+    for model, serializer_class, fields in ((Book, BookSerializer, ['id', 'title', 'author']),
+                                            (Loan, LoanSerializer, ['id', 'book', 'due_at'])):
+        for name, (load, serialize, render) in paths(serializer_class, fields).items():
+            row = {'model': model.__name__, 'path': name, 'rows': args.rows,
+                   **run(load, serialize, render, args.repeat)}
+            results.append(row)
+            print(f"{row['model']:<5} {name:<12} query={row['query']:7.2f}ms serialize={row['serialize']:7.2f}ms "
+                  f"render={row['render']:6.2f}ms total={row['total']:7.2f}ms bytes={row['bytes']}", flush=True)
+
+    write_json(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
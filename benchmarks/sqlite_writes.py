@@ -0,0 +1,149 @@
+"""
+Write throughput of the SQLite production mode under several server processes.
+
+Seeds a throwaway SQLite database, then for each mode starts
+``gunicorn library_system.wsgi --workers 3`` (as in ``Procfile``) on its own
+copy of it and keeps ``--clients`` borrowers busy for ``--duration``
+seconds: each one borrows a random book (``POST /api/loans/``) and returns
+it (``POST /api/return/<id>/``), over and over.
+
+- ``default``: SQLite's defaults (rollback journal, ``BEGIN DEFERRED``,
+  ``SQLITE_PRODUCTION_MODE=False``);
+- ``production``: WAL, ``synchronous=NORMAL``, busy timeout, mmap and
+  ``BEGIN IMMEDIATE`` on the write paths (see ``library_system/settings.py``).
+
+Reports successful writes per second, latency percentiles and failures
+("database is locked" surfaces as HTTP 500), then checks that every book's
+``available_copies`` still matches its open loans.
+
+    python -m benchmarks.sqlite_writes --clients 12 --duration 20 --json sqlite_writes.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from benchmarks.asgi_vs_wsgi import free_port, start_server
+from benchmarks.common import BASE_DIR, _remove_database, setup_django, summarize, write_json
+
+MODES = {'default': 'False', 'production': 'True'}
+
+
+def post(port: int, path: str, token: str, body: Any = None) -> tuple:
+    # A connection per request: gunicorn's sync workers close them anyway
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('POST', path, body=json.dumps(body) if body is not None else None, headers={
+            'Authorization': f'Bearer {token}', 'Content-Type': 'application/json',
+        })
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def load(port: int, tokens: List[str], book_ids: List[int], duration: float) -> Dict[str, Any]:
+    durations: List[float] = []
+    outcomes: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def write(path: str, token: str, body: Any = None) -> tuple:
+        started = time.perf_counter()
+        try:
+            status, content = post(port, path, token, body)
+        except OSError as exc:
+            status, content = type(exc).__name__, b''
+        elapsed = time.perf_counter() - started
+        with lock:
+            outcomes[status] += 1
+            if status in (200, 201):
+                durations.append(elapsed)
+        return status, content
+
+    def client(token: str, seed: int) -> None:
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            status, content = write('/api/loans/', token, {'book': rng.choice(book_ids)})
+            if status == 201:
+                write(f"/api/return/{json.loads(content)['id']}/", token)
+
+    threads = [threading.Thread(target=client, args=(token, seed)) for seed, token in enumerate(tokens)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    failures = {str(status): count for status, count in outcomes.items() if status not in (200, 201)}
+    return {'writes_per_s': len(durations) / elapsed, 'writes': len(durations), 'failures': failures,
+            **summarize(durations or [0.0])}
+
+
+def consistent(database: str) -> bool:
+    with sqlite3.connect(database) as connection:
+        mismatched = connection.execute(
+            'SELECT COUNT(*) FROM library_book b WHERE b.available_copies + '
+            '(SELECT COUNT(*) FROM library_loan l WHERE l.book_id = b.id AND l.returned_at IS NULL) '
+            '!= b.total_copies'
+        ).fetchone()[0]
+    return mismatched == 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=12)
+    parser.add_argument('--books', type=int, default=20, help='Books borrowed from (fewer means hotter rows).')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per mode.')
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    seeded = setup_django()
+
+    from django.db import connection
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from library.models import Book, User
+
+    books = Book.objects.bulk_create(
+        Book(title=f'Write {i}', author='Author', isbn=f'{9700000000000 + i}', page_count=1,
+             total_copies=args.clients, available_copies=args.clients)
+        for i in range(args.books)
+    )
+    users = User.objects.bulk_create(User(username=f'writer{i}') for i in range(args.clients))
+    tokens = [str(RefreshToken.for_user(user).access_token) for user in users]
+    connection.close()
+
+    results = []
+    for mode, production in MODES.items():
+        database = f'{seeded}.{mode}'
+        shutil.copyfile(seeded, database)
+        with sqlite3.connect(database) as copy:
+            copy.execute('PRAGMA journal_mode=DELETE')
+        env = {**os.environ, 'LIBRARY_DATABASE_URL': f'sqlite:///{database}', 'SQLITE_PRODUCTION_MODE': production,
+               'REQUEST_LOG_LEVEL': 'WARNING', 'PYTHONPATH': str(BASE_DIR)}
+        port = free_port()
+        process = start_server('wsgi', port, env)
+        try:
+            row = {'mode': mode, 'clients': args.clients, 'books': args.books,
+                   **load(port, tokens, [book.pk for book in books], args.duration)}
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        row['consistent'] = consistent(database)
+        _remove_database(database)
+        results.append(row)
+        print(f"{mode:<10} {row['writes_per_s']:7.1f} writes/s p50={row['p50_ms']:7.2f}ms "
+              f"p99={row['p99_ms']:8.2f}ms failures={row['failures']} consistent={row['consistent']}", flush=True)
+
+    write_json(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
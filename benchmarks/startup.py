@@ -0,0 +1,98 @@
+"""
+Cold boot of a WSGI worker, with and without the warm-up.
+
+Each run starts a fresh interpreter that imports ``library_system.wsgi``, as
+a gunicorn worker does, and then serves one GET of ``--path`` in-process.
+Two times are reported for each mode:
+
+- ``boot``: from the interpreter running the first line to the
+  application being ready, which includes the warm-up when it is enabled;
+- ``first_request``: serving the first request after that.
+
+``process`` is the wall time of the whole run, as the parent sees it.
+
+- ``cold``: what a worker does by default;
+- ``warm-up``: ``LIBRARY_WARMUP=True``.
+
+Guard against regressions with an absolute budget, ``--max-boot-ms``, or
+with ``--baseline`` and the ``--json`` file of an earlier run. Either one
+makes the script exit with status 1 when the median cold boot is over.
+
+    python -m benchmarks.startup --runs 15 --json startup.json
+    python -m benchmarks.startup --runs 15 --baseline startup.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import BASE_DIR, seed_books, setup_django, summarize, write_json
+
+MODES = {'cold': 'False', 'warm-up': 'True'}
+
+BOOT = '''
+import json, time
+started = time.perf_counter()
+from library_system.wsgi import application
+booted = time.perf_counter()
+from library.startup import wsgi_get
+status = wsgi_get(application, {path!r})
+print(json.dumps({{'boot': booted - started, 'first_request': time.perf_counter() - booted, 'status': status}}))
+'''
+
+
+def boot(env: Dict[str, str], path: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', BOOT.format(path=path)], env=env, cwd=BASE_DIR,
+                            capture_output=True, text=True, check=True)
+    return {**json.loads(result.stdout.splitlines()[-1]), 'process': time.perf_counter() - started}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=15, help='Fresh interpreters per mode.')
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--path', default='/api/books/?search=river', help='The first request.')
+    parser.add_argument('--max-boot-ms', type=float, help='Fail if the median cold boot takes longer.')
+    parser.add_argument('--baseline', help='A --json file of an earlier run to compare the cold boot with.')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Fraction by which the cold boot may be slower than the baseline.')
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    database = setup_django()
+    seed_books(args.books)
+    from django.db import connection
+    connection.close()
+
+    results: List[Dict[str, Any]] = []
+    for mode, warmup in MODES.items():
+        env = {**os.environ, 'LIBRARY_DATABASE_URL': f'sqlite:///{database}', 'LIBRARY_WARMUP': warmup,
+               'REQUEST_LOG_LEVEL': 'WARNING', 'PYTHONPATH': str(BASE_DIR)}
+        runs = [boot(env, args.path) for _ in range(args.runs)]
+        row = {'mode': mode, 'path': args.path, 'statuses': sorted({run['status'] for run in runs})}
+        for timing in ('boot', 'first_request', 'process'):
+            row[timing] = summarize([run[timing] for run in runs])
+        results.append(row)
+        print(f"{mode:<8} boot p50={row['boot']['p50_ms']:7.1f}ms p95={row['boot']['p95_ms']:7.1f}ms  "
+              f"first request p50={row['first_request']['p50_ms']:6.1f}ms  "
+              f"process p50={row['process']['p50_ms']:7.1f}ms  statuses={row['statuses']}", flush=True)
+
+    write_json(args.json, results)
+
+    cold = results[0]['boot']['p50_ms']
+    budget = args.max_boot_ms
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)[0]['boot']['p50_ms']
+        budget = min(budget or float('inf'), baseline * (1 + args.tolerance))
+    if budget is not None and cold > budget:
+        print(f'Regression: the median cold boot took {cold:.1f}ms, over the {budget:.1f}ms budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
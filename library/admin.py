@@ -1,6 +1,71 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Book, Loan
+from django.db.models import Q
+from .facets import top_authors
+from .models import User, Book, Loan, LoanHistory
+from .pagination import EstimatedCountPaginator
+from .search import matching_book_ids, search_books, search_terms
+from .services import CopiesOnLoan, set_total_copies
+
+
+class AuthorListFilter(admin.SimpleListFilter):
+    """
+    Filter books by an exact author typed into a box, or by one of the
+    authors with the most books.
+
+    Those come from :func:`library.facets.top_authors`, cached apart from the
+    catalog version, so loading the changelist does not run
+    ``SELECT DISTINCT author`` over every book.
+    """
+    title = 'author'
+    parameter_name = 'author'
+    template = 'admin/library/author_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        # Everything but this filter and the page number, for the box's form
+        self.preserved_params = [
+            (name, value) for name, values in request.GET.lists() if name not in (self.parameter_name, 'p')
+            for value in values
+        ]
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        authors = top_authors()
+        return [(author['value'], f"{author['value']} ({author['count']})") for author in authors]
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(author=self.value())
+        return queryset
+
+
+class FullTextSearchMixin:
+    """
+    Answer the admin's search box from the books' full-text index instead of
+    ``LIKE '%term%'`` scans.
+    """
+    def get_search_results(self, request, queryset, search_term):
+        if not search_terms(search_term):
+            return queryset, False
+        return self.search(queryset, search_term.strip()), False
+
+    def search(self, queryset, term):
+        return search_books(queryset, term)
+
+
+class LoanSearchMixin(FullTextSearchMixin):
+    """
+    Search loans by the borrower's exact username or by the book, through
+    the indexes on ``user_id`` and ``book_id`` rather than joined ``LIKE``
+    scans.
+    """
+    def search(self, queryset, term):
+        users = User.objects.filter(username=term).values('pk')
+        return queryset.filter(Q(user__in=users) | Q(book__in=matching_book_ids(term, using=queryset.db)))
+
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -10,16 +75,71 @@ class UserAdmin(BaseUserAdmin):
     ordering = ('username',)
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
-    list_display = ('title', 'author', 'isbn', 'page_count', 'available')
-    list_filter = ('available', 'author')
+class BookAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ('title', 'author', 'isbn', 'page_count', 'available_copies', 'total_copies', 'available')
+    list_filter = ('available', AuthorListFilter)
     search_fields = ('title', 'author', 'isbn')
     ordering = ('title',)
+    readonly_fields = ('available_copies', 'available')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.available_copies = obj.total_copies
+        elif 'total_copies' in form.changed_data:
+            try:
+                set_total_copies(obj, obj.total_copies)
+            except CopiesOnLoan as exc:
+                obj.refresh_from_db(fields=Book.INVENTORY_FIELDS)
+                self.message_user(request, str(exc), messages.ERROR)
+        super().save_model(request, obj, form, change)
 
 @admin.register(Loan)
-class LoanAdmin(admin.ModelAdmin):
-    list_display = ('user', 'book', 'borrowed_at', 'returned_at', 'is_returned')
+class LoanAdmin(LoanSearchMixin, admin.ModelAdmin):
+    """
+    Read-only list of open and recent loans.
+
+    Loans change the books' copy counters, so they are only made and closed
+    through the API (see :mod:`library.services`).
+    """
+    list_display = ('user', 'book', 'borrowed_at', 'due_at', 'returned_at', 'is_returned')
+    list_select_related = ('user', 'book')
     list_filter = ('returned_at',)
     search_fields = ('user__username', 'book__title')
-    ordering = ('-borrowed_at',)
+    # Newest first like borrowed_at, but walking the primary key instead of sorting the table
+    ordering = ('-id',)
     readonly_fields = ('borrowed_at',)
+    autocomplete_fields = ('user', 'book')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(LoanHistory)
+class LoanHistoryAdmin(LoanSearchMixin, admin.ModelAdmin):
+    """
+    Read-only list of every loan, archived ones included.
+    """
+    list_display = ('id', 'user', 'book', 'borrowed_at', 'due_at', 'returned_at')
+    list_select_related = ('user', 'book')
+    search_fields = ('user__username', 'book__title')
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Iterator
+
+from .models import ArchivedLoan, Loan
+from .services import write_transaction
+
+
+ARCHIVE_BATCH_SIZE = 5000
+ARCHIVED_FIELDS = [field.attname for field in ArchivedLoan._meta.concrete_fields]
+
+
+def archive_loans(returned_before: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> Iterator[int]:
+    """
+    Move loans returned before a cutoff from ``Loan`` to ``ArchivedLoan``.
+
+    Loans are moved in primary key order, one transaction per batch: each
+    batch is copied and deleted atomically, so an interrupted run loses
+    nothing and the next run simply continues with the loans still in
+    ``Loan``. Open loans are never moved.
+
+    Args:
+        returned_before: Only loans returned before this moment are archived.
+        batch_size: Loans moved per transaction.
+
+    Yields:
+        int: The number of loans moved by each committed batch.
+    """
+    last_id = 0
+    while True:
+        with write_transaction():
+            rows = list(
+                Loan.objects.filter(pk__gt=last_id, returned_at__lt=returned_before)
+                .order_by('pk')
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return
+            ArchivedLoan.objects.bulk_create([ArchivedLoan(**row) for row in rows])
+            Loan.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        last_id = rows[-1]['id']
+        yield len(rows)
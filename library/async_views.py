@@ -0,0 +1,185 @@
+"""
+Native async versions of the hot read endpoints, served under ``/api/async/``.
+
+DRF views are sync, so under ASGI Django runs each of them in a worker
+thread. These plain Django async views answer the same queries with the
+async ORM and :meth:`CachedJWTAuthentication.aauthenticate` and return the
+same JSON as their DRF counterparts, so an ASGI deployment can route its
+read traffic here without blocking a thread per request.
+"""
+from typing import Any, Callable, Dict, List
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import CachedJWTAuthentication
+from .caching import BOOK_VERSION_KEY, CATALOG_VERSION_KEY, DETAILS_VERSION_KEY, acached_response
+from .facets import book_facets, facets_requested
+from .fieldsets import narrow_queryset, requested_fields
+from .filters import OPEN_LOAN_STATUSES, BookFilter, LoanFilter, LoanHistoryFilter
+from .models import Book, Loan, LoanHistory
+from .pagination import LibraryPagination
+from .renderers import json_response
+from .search import search_books
+from .serializers import BookSerializer, LoanHistorySerializer, LoanSerializer
+from .views import BookViewSet
+
+
+class InvalidPage(Exception):
+    """
+    Raised for a ``page`` that is not a number or lies past the last page.
+    """
+
+
+def _error(detail: Any, status_code: int, **headers: str) -> HttpResponse:
+    return json_response(detail if isinstance(detail, dict) else {'detail': detail}, status=status_code,
+                         headers=headers)
+
+
+def _ordering(request: Any) -> List[str]:
+    # Same rules as OrderingFilter: comma separated, unknown fields ignored
+    terms = [term.strip() for term in request.GET.get(api_settings.ORDERING_PARAM, '').split(',')]
+    return [term for term in terms if term.lstrip('-') in BookViewSet.ordering_fields]
+
+
+async def _paginate(request: Any, queryset: Any, serialize: Callable[[List[Any]], Any],
+                    view: Any = None) -> Dict[str, Any]:
+    """
+    ``?page=N`` pagination producing the same payload as ``PageNumberPagination``, or keyset
+    pagination with ``?pagination=cursor`` like :class:`LibraryPagination`.
+
+    ``view`` supplies the ordering keyset pages follow, as the DRF view would.
+    """
+    drf_request = Request(request)
+    if LibraryPagination().use_keyset(drf_request):
+        keyset = LibraryPagination.keyset_class()
+        rows = await keyset.apaginate_queryset(queryset, drf_request, view)
+        return keyset.get_paginated_data(serialize(rows))
+
+    page_size = api_settings.PAGE_SIZE
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        raise InvalidPage
+    count = await queryset.acount()
+    offset = (page - 1) * page_size
+    if page < 1 or (page > 1 and offset >= count):
+        raise InvalidPage
+    rows = [row async for row in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    previous = None
+    if page == 2:
+        previous = remove_query_param(url, 'page')
+    elif page > 2:
+        previous = replace_query_param(url, 'page', page - 1)
+    return {
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if offset + page_size < count else None,
+        'previous': previous,
+        'results': serialize(rows),
+    }
+
+
+@require_GET
+async def book_list(request: Any) -> HttpResponse:
+    """
+    Async ``GET /api/books/``: ``author``/``available`` filters, ``search``, ``ordering``, ``page``
+    or ``pagination=cursor``, ``facets`` and ``fields``.
+    """
+    try:
+        fields = requested_fields(request.GET, BookSerializer)
+    except ValidationError as exc:
+        return _error(exc.detail, status.HTTP_400_BAD_REQUEST)
+    filterset = BookFilter(request.GET, queryset=Book.objects.all().order_by('id'))
+    if not filterset.is_valid():
+        return _error(filterset.errors, status.HTTP_400_BAD_REQUEST)
+    queryset = filterset.qs
+    if request.GET.get(api_settings.SEARCH_PARAM):
+        queryset = search_books(queryset, request.GET[api_settings.SEARCH_PARAM])
+    ordering = _ordering(request)
+    if ordering:
+        queryset = queryset.order_by(*ordering)
+
+    async def build() -> Dict[str, Any]:
+        data = await _paginate(request, narrow_queryset(queryset, BookSerializer, fields),
+                               lambda rows: BookSerializer(rows, many=True, context={'fields': fields}).data,
+                               BookViewSet())
+        if facets_requested(request.GET):
+            data['facets'] = await sync_to_async(book_facets)(queryset, request.GET)
+        return data
+
+    try:
+        return await acached_response(request, [CATALOG_VERSION_KEY], build)
+    except InvalidPage:
+        return _error('Invalid page.', status.HTTP_404_NOT_FOUND)
+    except NotFound as exc:
+        return _error(exc.detail, exc.status_code)
+
+
+@require_GET
+async def book_detail(request: Any, pk: int) -> HttpResponse:
+    """
+    Async ``GET /api/books/<id>/``, with ``fields``.
+    """
+    try:
+        fields = requested_fields(request.GET, BookSerializer)
+    except ValidationError as exc:
+        return _error(exc.detail, status.HTTP_400_BAD_REQUEST)
+
+    async def build() -> Dict[str, Any]:
+        book = await narrow_queryset(Book.objects.all(), BookSerializer, fields).aget(pk=pk)
+        return BookSerializer(book, context={'fields': fields}).data
+
+    try:
+        return await acached_response(request, [DETAILS_VERSION_KEY, BOOK_VERSION_KEY.format(pk=pk)], build)
+    except Book.DoesNotExist:
+        return _error('No Book matches the given query.', status.HTTP_404_NOT_FOUND)
+
+
+@require_GET
+async def loan_list(request: Any) -> HttpResponse:
+    """
+    Async ``GET /api/loans/``: the caller's loans (everyone's for admins), ``status`` filter, ``page``
+    or ``pagination=cursor``, and ``fields``.
+    """
+    authentication = CachedJWTAuthentication()
+    challenge = {'WWW-Authenticate': authentication.authenticate_header(request)}
+    try:
+        authenticated = await authentication.aauthenticate(request)
+    except APIException as exc:
+        return _error(exc.detail, exc.status_code, **challenge)
+    if authenticated is None:
+        return _error('Authentication credentials were not provided.', status.HTTP_401_UNAUTHORIZED, **challenge)
+    user = authenticated[0]
+
+    # Same split as LoanViewSet: only open loans can be served from the loan table alone
+    if request.GET.get('status') in OPEN_LOAN_STATUSES:
+        queryset, filterset_class, serializer_class = Loan.objects.all(), LoanFilter, LoanSerializer
+    else:
+        queryset, filterset_class = LoanHistory.objects.all(), LoanHistoryFilter
+        serializer_class = LoanHistorySerializer
+    queryset = queryset.order_by('id')
+    if not user.is_staff:
+        queryset = queryset.filter(user=user)
+    filterset = filterset_class(request.GET, queryset=queryset)
+    if not filterset.is_valid():
+        return _error(filterset.errors, status.HTTP_400_BAD_REQUEST)
+    try:
+        fields = requested_fields(request.GET, serializer_class)
+    except ValidationError as exc:
+        return _error(exc.detail, status.HTTP_400_BAD_REQUEST)
+    try:
+        data = await _paginate(request, narrow_queryset(filterset.qs, serializer_class, fields),
+                               lambda rows: serializer_class(rows, many=True, context={'fields': fields}).data)
+    except InvalidPage:
+        return _error('Invalid page.', status.HTTP_404_NOT_FOUND)
+    except NotFound as exc:
+        return _error(exc.detail, exc.status_code)
+    return json_response(data)
@@ -0,0 +1,145 @@
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import routers
+from .caching import get_cache
+from .instrumentation import timed
+
+
+USER_KEY = 'library:auth:user-fields:{pk}'
+# What the API reads from request.user; the password hash is never cached
+USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser', 'is_admin')
+
+
+def invalidate_user(pk: Any) -> None:
+    """
+    Drop a user from the authentication cache, now and again once the
+    surrounding transaction commits.
+    """
+    key = USER_KEY.format(pk=pk)
+    get_cache().delete(key)
+    transaction.on_commit(lambda: get_cache().delete(key))
+
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that reports its time as ``auth`` in ``Server-Timing``.
+    """
+
+    def authenticate(self, request: Any) -> Optional[Tuple[Any, Any]]:
+        with timed('auth'):
+            return super().authenticate(request)
+
+
+class CachedJWTAuthentication(TimedJWTAuthentication):
+    """
+    JWT authentication that serves users from the cache instead of a ``SELECT`` per request.
+
+    Users are cached for ``settings.LIBRARY_AUTH_CACHE_TIMEOUT`` seconds and
+    dropped as soon as they are saved or deleted (see :mod:`library.signals`),
+    so a change to ``is_admin``, ``is_active`` or the password applies to the
+    next request. ``User.objects.update()`` bypasses that; call
+    :func:`invalidate_user` after it.
+
+    Only :data:`USER_FIELDS` are cached, plus a digest of the password when
+    ``CHECK_REVOKE_TOKEN`` is on; a cache hit is an unsaved ``User`` rebuilt
+    from them, good for permission checks and filtering by user.
+
+    With read replicas, a user who just wrote has the rest of the request
+    read from the primary (see :mod:`library.routers`), and a user the
+    replicas do not know yet, e.g. one who just registered, is looked up
+    on the primary.
+    """
+
+    def get_user(self, validated_token: Any) -> Any:
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        if routers.user_is_pinned(user_id):
+            routers.read_primary()
+
+        cache = get_cache()
+        key = USER_KEY.format(pk=user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = self.lookup_user(validated_token)
+            cache.set(key, self.cache_entry(user), timeout=getattr(settings, 'LIBRARY_AUTH_CACHE_TIMEOUT', 60))
+            return user
+        return self.check_user(self.cached_user(entry), validated_token, entry.get('password'))
+
+    def lookup_user(self, validated_token: Any) -> Any:
+        try:
+            return super().get_user(validated_token)
+        except AuthenticationFailed as exc:
+            if not routers.replicas() or exc.detail.get('code') != 'user_not_found':
+                raise
+        with routers.use_primary():
+            return super().get_user(validated_token)
+
+    async def aauthenticate(self, request: Any) -> Optional[Tuple[Any, Any]]:
+        """
+        Async counterpart of ``authenticate`` for plain Django async views.
+
+        Token validation is pure computation; only the user lookup awaits the
+        cache or the async ORM.
+        """
+        with timed('auth'):
+            header = self.get_header(request)
+            if header is None:
+                return None
+            raw_token = self.get_raw_token(header)
+            if raw_token is None:
+                return None
+            validated_token = self.get_validated_token(raw_token)
+            return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token: Any) -> Any:
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if await routers.auser_is_pinned(user_id):
+            routers.read_primary()
+
+        cache = get_cache()
+        key = USER_KEY.format(pk=user_id)
+        entry = await cache.aget(key)
+        if entry is None:
+            users = self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            user = await users.afirst()
+            if user is None and routers.replicas():
+                with routers.use_primary():
+                    user = await users.afirst()
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            self.check_user(user, validated_token)
+            await cache.aset(key, self.cache_entry(user), timeout=getattr(settings, 'LIBRARY_AUTH_CACHE_TIMEOUT', 60))
+            return user
+        return self.check_user(self.cached_user(entry), validated_token, entry.get('password'))
+
+    def cache_entry(self, user: Any) -> Dict[str, Any]:
+        entry = {field: getattr(user, field) for field in USER_FIELDS}
+        if api_settings.CHECK_REVOKE_TOKEN:
+            entry['password'] = get_md5_hash_password(user.password)
+        return entry
+
+    def cached_user(self, entry: Dict[str, Any]) -> Any:
+        return self.user_model(**{field: entry[field] for field in USER_FIELDS})
+
+    def check_user(self, user: Any, validated_token: Any, password: Optional[str] = None) -> Any:
+        # The same checks JWTAuthentication.get_user makes after its lookup;
+        # a cached user comes with the digest of its password instead of the hash
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if password is None and api_settings.CHECK_REVOKE_TOKEN:
+            password = get_md5_hash_password(user.password)
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
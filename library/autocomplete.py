@@ -0,0 +1,488 @@
+"""
+In-process prefix index answering the search box's typeahead requests.
+
+Every distinct title and author is stored once and keyed under each of its
+word starts ("harry potter" under "harry potter" and "potter"), in one
+sorted array searched with :mod:`bisect`. A lookup costs two binary searches
+plus the matching slice, with no database round trip.
+
+Each process keeps its own index. Saving or deleting a book updates it in
+place once the transaction commits. Other processes notice the change
+through ``AUTOCOMPLETE_VERSION_KEY`` in the shared cache, as do all
+processes after bulk writes (see :func:`invalidate`), and apply the books
+changed since their last look from the change feed (:mod:`library.changes`).
+Only the first lookup of a process waits for a full build, unless the
+worker ran :func:`warm_up` before taking traffic. Later full builds, after ``LIBRARY_AUTOCOMPLETE_MAX_AGE`` seconds or when too many books
+changed at once, run in a background thread while the old index keeps
+answering.
+"""
+import heapq
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+
+from .caching import _new_version, get_cache
+from .routers import fresh_reads
+
+
+AUTOCOMPLETE_VERSION_KEY = 'library:autocomplete:version'
+DEFAULT_SUGGESTIONS = 8
+MAX_SUGGESTIONS = 20
+# Prefixes matching more entries than this have their suggestions ranked ahead of time
+WIDE_PREFIX = 256
+# Memoized results of narrower prefixes
+MEMO_SIZE = 4096
+# Changes applied in place at most; a larger backlog is caught up by a full rebuild
+MAX_CHANGES_APPLIED = 2000
+
+_LAST = '\U0010ffff'
+
+
+def normalize(text: str) -> str:
+    """
+    Case-fold, strip accents and collapse whitespace, so "Émile  Zola" matches "emile z".
+    """
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over book titles and authors.
+
+    ``entries`` holds ``(key, text_id, offset)`` tuples in sorted order, where
+    ``key`` is the normalized text from one of its word starts (at
+    ``offset``). ``texts`` maps ids to ``(kind, text)`` and ``counts`` to the
+    number of books carrying that title or author, the ranking weight.
+
+    Prefixes matching more than ``WIDE_PREFIX`` entries (typically the first
+    one or two keystrokes) keep their ranked suggestions in ``wide``, so no
+    lookup scans more than ``WIDE_PREFIX`` entries. Other results are
+    memoized until the index changes.
+    """
+
+    def __init__(self) -> None:
+        self.entries: List[Tuple[str, int, int]] = []
+        self.texts: Dict[int, Tuple[str, str]] = {}
+        self.counts: Dict[int, int] = {}
+        self.text_ids: Dict[Tuple[str, str], int] = {}
+        self.books: Dict[int, Tuple[int, int]] = {}
+        self.wide: Dict[str, List[int]] = {}
+        self.memo: 'OrderedDict[str, List[int]]' = OrderedDict()
+        self.next_id = 0
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[int, str, str]]) -> 'PrefixIndex':
+        """
+        Build an index from ``(pk, title, author)`` rows, sorting once at the end.
+        """
+        index = cls()
+        for pk, title, author in rows:
+            index.books[pk] = (index._ref('title', title, sort=False), index._ref('author', author, sort=False))
+        index.entries.sort()
+        index._rank_wide(0, len(index.entries), 1)
+        return index
+
+    def _rank_wide(self, low: int, high: int, length: int) -> None:
+        # Rank every prefix of ``length`` characters in entries[low:high] that
+        # matches more than WIDE_PREFIX entries, then recurse into it.
+        position = low
+        while position < high:
+            key = self.entries[position][0]
+            if len(key) < length:
+                position += 1
+                continue
+            prefix = key[:length]
+            end = bisect_left(self.entries, (prefix + _LAST,), position, high)
+            if end - position > WIDE_PREFIX:
+                self.wide[prefix] = self._rank(position, end)
+                self._rank_wide(position, end, length + 1)
+            position = end
+
+    def _sort_key(self, text_id: int, starts_with: bool) -> Tuple[int, int, str]:
+        return (0 if starts_with else 1, -self.counts[text_id], self.texts[text_id][1])
+
+    def _rank(self, low: int, high: int) -> List[int]:
+        best: Dict[int, bool] = {}
+        for _, text_id, offset in self.entries[low:high]:
+            if offset == 0 or text_id not in best:
+                best[text_id] = offset == 0
+        ranked = heapq.nsmallest(MAX_SUGGESTIONS, best.items(), key=lambda item: self._sort_key(*item))
+        return [text_id for text_id, _ in ranked]
+
+    def _keys(self, text: str) -> List[Tuple[str, int]]:
+        normalized = normalize(text)
+        offsets = [0] + [i + 1 for i, char in enumerate(normalized) if char == ' ']
+        return [(normalized[offset:], offset) for offset in offsets]
+
+    def _wide_prefixes(self, text: str) -> set:
+        # The pre-ranked prefixes this text matches
+        return {key[:length] for key, _ in self._keys(text) for length in range(1, len(key) + 1)
+                if key[:length] in self.wide}
+
+    def _ref(self, kind: str, text: str, sort: bool = True) -> int:
+        text_id = self.text_ids.get((kind, text))
+        if text_id is None:
+            text_id = self.text_ids[(kind, text)] = self.next_id
+            self.next_id += 1
+            self.texts[text_id] = (kind, text)
+            self.counts[text_id] = 0
+            for key, offset in self._keys(text):
+                if sort:
+                    insort(self.entries, (key, text_id, offset))
+                else:
+                    self.entries.append((key, text_id, offset))
+        self.counts[text_id] += 1
+        if sort:
+            # Only this text's rank went up, so it can simply be merged in
+            for prefix in self._wide_prefixes(text):
+                ranked = [other for other in self.wide[prefix] if other != text_id] + [text_id]
+                ranked.sort(key=lambda other: self._sort_key(
+                    other, normalize(self.texts[other][1]).startswith(prefix),
+                ))
+                self.wide[prefix] = ranked[:MAX_SUGGESTIONS]
+        return text_id
+
+    def _unref(self, text_id: int) -> None:
+        kind, text = self.texts[text_id]
+        # This text's rank goes down: lists it is on are re-ranked on next use
+        for prefix in self._wide_prefixes(text):
+            if text_id in self.wide[prefix]:
+                del self.wide[prefix]
+        self.counts[text_id] -= 1
+        if self.counts[text_id]:
+            return
+        del self.texts[text_id], self.counts[text_id], self.text_ids[(kind, text)]
+        for key, offset in self._keys(text):
+            position = bisect_left(self.entries, (key, text_id, offset))
+            if position < len(self.entries) and self.entries[position] == (key, text_id, offset):
+                del self.entries[position]
+
+    def add_book(self, pk: int, title: str, author: str) -> None:
+        """
+        Index a new or changed book.
+        """
+        refs = self.books.get(pk)
+        if refs is not None and (self.texts[refs[0]][1], self.texts[refs[1]][1]) == (title, author):
+            return
+        self.remove_book(pk)
+        self.books[pk] = (self._ref('title', title), self._ref('author', author))
+        self.memo.clear()
+
+    def remove_book(self, pk: int) -> None:
+        refs = self.books.pop(pk, None)
+        if refs is not None:
+            for text_id in refs:
+                self._unref(text_id)
+            self.memo.clear()
+
+    def complete(self, prefix: str, limit: int = DEFAULT_SUGGESTIONS) -> List[Dict[str, Any]]:
+        """
+        Return up to ``limit`` titles and authors with a word starting with ``prefix``.
+
+        Texts that start with the prefix come before those matching at a
+        later word; then the ones shared by more books; then alphabetically.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        ranked = self.wide.get(prefix)
+        if ranked is None:
+            ranked = self.memo.get(prefix)
+            if ranked is not None:
+                self.memo.move_to_end(prefix)
+        if ranked is None:
+            low = bisect_left(self.entries, (prefix,))
+            high = bisect_left(self.entries, (prefix + _LAST,), low)
+            ranked = self._rank(low, high)
+            if high - low > WIDE_PREFIX:
+                self.wide[prefix] = ranked
+            else:
+                self.memo[prefix] = ranked
+                if len(self.memo) > MEMO_SIZE:
+                    self.memo.popitem(last=False)
+        return [
+            {'text': self.texts[text_id][1], 'kind': self.texts[text_id][0], 'books': self.counts[text_id]}
+            for text_id in ranked[:limit]
+        ]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Return the entry counts and an estimate of the bytes held by the index.
+
+        Counts the containers, tuples and strings it references once each
+        (titles and authors are shared by ``texts`` and ``text_ids``); small
+        integers interned by Python are not counted.
+        """
+        seen = set()
+        size = 0
+
+        def add(obj: Any) -> None:
+            nonlocal size
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                size += sys.getsizeof(obj)
+
+        for container in (self.entries, self.texts, self.counts, self.text_ids, self.books, self.wide):
+            add(container)
+        for prefix, ranked in self.wide.items():
+            add(prefix)
+            add(ranked)
+        for entry in self.entries:
+            add(entry)
+            add(entry[0])
+        for key in self.text_ids:
+            add(key)
+            add(key[1])
+        for value in self.texts.values():
+            add(value)
+        for refs in self.books.values():
+            add(refs)
+        return {'books': len(self.books), 'texts': len(self.texts), 'entries': len(self.entries), 'bytes': size}
+
+
+class _State:
+    index: Optional[PrefixIndex] = None
+    version: Optional[Any] = None
+    # The last change feed entry the index has caught up with
+    seq = 0
+    built_at = 0.0
+    rebuilding = False
+    builds = 0
+    build_ms = 0.0
+    changes_applied = 0
+    lookups = 0
+    lookup_ms = 0.0
+
+
+_state = _State()
+# Guards the index; held for lookups and in-memory updates, never for queries
+_lock = threading.Lock()
+# Makes the first lookups of a process wait for a single build
+_build_lock = threading.Lock()
+
+
+def _build(version: Any) -> Tuple[PrefixIndex, int]:
+    from .models import Book, Change
+
+    started = time.perf_counter()
+    with fresh_reads(version[1]):
+        # Noted first: changes made while the books are read are applied again later
+        seq = Change.objects.aggregate(seq=Max('pk'))['seq'] or 0
+        rows = Book.objects.values_list('pk', 'title', 'author').iterator(chunk_size=5000)
+        index = PrefixIndex.build(rows)
+    _state.builds += 1
+    _state.build_ms = (time.perf_counter() - started) * 1000
+    return index, seq
+
+
+def _changed_books(seq: int, version: Any) -> Optional[Tuple[int, Dict[int, Optional[Tuple[str, str]]]]]:
+    # The books changed after ``seq``, with their title and author (None once
+    # deleted), and the last ``seq`` read; None when there are too many for an
+    # in-place update
+    from .models import Book, Change
+
+    with fresh_reads(version[1]):
+        rows = list(Change.objects.filter(pk__gt=seq).order_by('pk')
+                    .values_list('pk', 'kind', 'object_id')[:MAX_CHANGES_APPLIED + 1])
+        if len(rows) > MAX_CHANGES_APPLIED:
+            return None
+        changed = {object_id for _, kind, object_id in rows if kind == Change.BOOK}
+        books = {pk: (title, author) for pk, title, author in
+                 Book.objects.filter(pk__in=changed).values_list('pk', 'title', 'author')} if changed else {}
+    return (rows[-1][0] if rows else seq), {pk: books.get(pk) for pk in changed}
+
+
+def _apply_changes(index: PrefixIndex, changes: Dict[int, Optional[Tuple[str, str]]]) -> None:
+    for pk, book in changes.items():
+        if book is None:
+            index.remove_book(pk)
+        else:
+            index.add_book(pk, *book)
+    _state.changes_applied += len(changes)
+
+
+def _new_index() -> Tuple[PrefixIndex, int, Any]:
+    # A full build, caught up with the changes made while it ran; no lock is held
+    version = _current_version()
+    index, seq = _build(version)
+    changes = _changed_books(seq, version)
+    if changes is not None:
+        seq, books = changes
+        _apply_changes(index, books)
+    return index, seq, version
+
+
+def _swap(index: PrefixIndex, seq: int, version: Any) -> None:
+    # Called with _lock held. Changes made since the version was read are
+    # caught up by the next lookup.
+    _state.index, _state.seq, _state.version = index, seq, version
+    _state.built_at = time.monotonic()
+
+
+def _rebuild() -> None:
+    """
+    Build a new index and swap it in, caught up with the changes made meanwhile.
+    """
+    try:
+        index, seq, version = _new_index()
+        with _lock:
+            _swap(index, seq, version)
+    finally:
+        _state.rebuilding = False
+
+
+def _rebuild_in_background() -> None:
+    # Called with _lock held; the current index keeps answering meanwhile
+    if _state.rebuilding:
+        return
+    _state.rebuilding = True
+
+    def run() -> None:
+        try:
+            _rebuild()
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name='autocomplete-rebuild', daemon=True).start()
+
+
+def _current_version() -> Any:
+    cache = get_cache()
+    version = cache.get(AUTOCOMPLETE_VERSION_KEY)
+    if version is None:
+        version = _new_version()
+        if not cache.add(AUTOCOMPLETE_VERSION_KEY, version, timeout=None):
+            version = cache.get(AUTOCOMPLETE_VERSION_KEY) or version
+    return version
+
+
+def warm_up() -> None:
+    """
+    Build this process's index unless it has one, e.g. before a worker takes traffic.
+
+    Concurrent callers wait for a single build. Lookups meanwhile are not
+    blocked by it, only those that have no index to answer from.
+    """
+    with _build_lock:
+        if _state.index is None:
+            index, seq, version = _new_index()
+            with _lock:
+                _swap(index, seq, version)
+
+
+def _catch_up(version: Any) -> None:
+    # Apply the changes made since this process's last look at the change feed.
+    # The queries run outside the lock, only the in-memory update inside it.
+    seq = _state.seq
+    changes = _changed_books(seq, version)
+    with _lock:
+        if _state.seq != seq or _state.index is None:
+            # Another request caught up, or the index was swapped, meanwhile
+            return
+        if changes is None:
+            _rebuild_in_background()
+        else:
+            _state.seq, books = changes
+            _apply_changes(_state.index, books)
+        _state.version = version
+
+
+def suggest(prefix: str, limit: int = DEFAULT_SUGGESTIONS) -> List[Dict[str, Any]]:
+    """
+    Return typeahead completions for ``prefix``.
+
+    The first lookup in a process builds the index, unless :func:`warm_up`
+    did. After that, books changed in other processes are applied in place,
+    and full rebuilds happen in the background.
+    """
+    version = _current_version()
+    if _state.index is None:
+        warm_up()
+    if _state.version != version:
+        _catch_up(version)
+    with _lock:
+        if time.monotonic() - _state.built_at > settings.LIBRARY_AUTOCOMPLETE_MAX_AGE:
+            _rebuild_in_background()
+        started = time.perf_counter()
+        found = _state.index.complete(prefix, limit)
+        _state.lookups += 1
+        _state.lookup_ms += (time.perf_counter() - started) * 1000
+    return found
+
+
+def invalidate() -> Any:
+    """
+    Make every process catch its index up with the change feed, e.g. after
+    ``bulk_create`` or ``queryset.update()`` on titles. Returns the new version.
+    """
+    version = _new_version()
+    get_cache().set(AUTOCOMPLETE_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def book_changed(pk: int, title: Optional[str] = None, author: Optional[str] = None) -> None:
+    """
+    Update this process's index for one saved (or, without a title, deleted) book
+    once the transaction commits, and tell other processes to catch theirs up.
+
+    Other processes are told now and again on commit, so an index they catch
+    up from pre-commit data in between does not outlive the change.
+    """
+    before = get_cache().get(AUTOCOMPLETE_VERSION_KEY)
+    told = invalidate()
+
+    def apply() -> None:
+        previous = get_cache().get(AUTOCOMPLETE_VERSION_KEY)
+        version = invalidate()
+        with _lock:
+            if _state.index is None:
+                return
+            if title is None:
+                _state.index.remove_book(pk)
+            else:
+                _state.index.add_book(pk, title, author)
+            # Unless another process changed books too, this index is now current;
+            # otherwise it is left to catch up
+            if _state.version == before and previous == told:
+                _state.version = version
+
+    transaction.on_commit(apply)
+
+
+def autocomplete_stats() -> Dict[str, Any]:
+    """
+    Return the size and lookup timings of this process's index.
+    """
+    with _lock:
+        if _state.index is None:
+            return {'built': False}
+        return {
+            'built': True,
+            **_state.index.memory_usage(),
+            'age_s': round(time.monotonic() - _state.built_at, 1),
+            'builds': _state.builds,
+            'last_build_ms': round(_state.build_ms, 3),
+            'rebuilding': _state.rebuilding,
+            'changes_applied': _state.changes_applied,
+            'lookups': _state.lookups,
+            'mean_lookup_ms': round(_state.lookup_ms / _state.lookups, 4) if _state.lookups else None,
+        }
+
+
+def reset() -> None:
+    """
+    Drop this process's index; the next lookup rebuilds it.
+    """
+    with _lock:
+        _state.index = None
+        _state.version = None
+        _state.seq = 0
@@ -0,0 +1,239 @@
+import hashlib
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import routers
+from .renderers import json_response
+
+
+CATALOG_VERSION_KEY = 'library:books:version'
+DETAILS_VERSION_KEY = 'library:books:details-version'
+BOOK_VERSION_KEY = 'library:books:{pk}:version'
+
+_stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the cache backing API responses (``settings.LIBRARY_CACHE_ALIAS``).
+
+    The default alias is local memory, which is per process; point the alias
+    at a shared backend such as Redis when running several workers so that
+    invalidations reach all of them. Responses are only cached when
+    ``settings.LIBRARY_RESPONSE_CACHE`` is on, by default only with Redis.
+    """
+    return caches[getattr(settings, 'LIBRARY_CACHE_ALIAS', 'default')]
+
+
+def _count(stat: str) -> None:
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def cache_stats() -> Dict[str, Any]:
+    """
+    Return this process's response cache counters and hit rate.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses'] + stats['not_modified']
+    stats['hit_rate'] = (stats['hits'] + stats['not_modified']) / lookups if lookups else None
+    return stats
+
+
+def _new_version() -> Tuple[str, float]:
+    # Random tokens (rather than counters) make a lost or evicted key harmless:
+    # a fresh token can never collide with entries written under an old one.
+    now = time.time()
+    return f'{int(now * 1000):x}.{uuid.uuid4().hex[:8]}', now
+
+
+def _versions(keys: List[str]) -> List[Tuple[str, float]]:
+    cache = get_cache()
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = _new_version()
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key) or version
+        versions.append(version)
+    return versions
+
+
+async def _aversions(keys: List[str]) -> List[Tuple[str, float]]:
+    cache = get_cache()
+    found = await cache.aget_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = _new_version()
+            if not await cache.aadd(key, version, timeout=None):
+                version = await cache.aget(key) or version
+        versions.append(version)
+    return versions
+
+
+def invalidate_books(pks: Optional[Iterable[int]] = None) -> None:
+    """
+    Invalidate cached book responses after books change.
+
+    Every list response is invalidated; detail responses only for ``pks``, or
+    for every book when ``pks`` is None (e.g. after a bulk import). Runs now
+    and again once the surrounding transaction commits, so a response cached
+    from pre-commit data in between cannot outlive the change.
+    """
+    pks = None if pks is None else list(pks)
+    _invalidate(pks)
+    transaction.on_commit(lambda: _invalidate(pks))
+
+
+def _invalidate(pks: Optional[List[int]]) -> None:
+    keys = [CATALOG_VERSION_KEY]
+    if pks is None:
+        keys.append(DETAILS_VERSION_KEY)
+    else:
+        keys.extend(BOOK_VERSION_KEY.format(pk=pk) for pk in pks)
+    get_cache().set_many({key: _new_version() for key in keys}, timeout=None)
+    _count('invalidations')
+
+
+def _normalized_query(params: Any) -> str:
+    items = sorted((key, sorted(values)) for key, values in params.lists())
+    return '&'.join(f'{key}={value}' for key, values in items for value in values)
+
+
+def _entry(request: Any, params: Any, fmt: str, versions: List[Tuple[str, float]]) -> Tuple[str, str, int]:
+    # Cache key, ETag and Last-Modified timestamp of a response
+    fingerprint = '|'.join([
+        request.get_host(), request.path, _normalized_query(params), fmt, *(token for token, _ in versions),
+    ])
+    digest = hashlib.sha1(fingerprint.encode()).hexdigest()
+    last_modified = int(max(modified for _, modified in versions))
+    return f'library:response:{digest}', f'"{digest[:32]}"', last_modified
+
+
+def _validators(etag: str, last_modified: int) -> Dict[str, str]:
+    return {'ETag': etag, 'Last-Modified': http_date(last_modified), 'Cache-Control': 'no-cache'}
+
+
+def cached_response(request: Any, version_keys: List[str], build: Callable[[], Response]) -> Response:
+    """
+    Serve a GET from the response cache, with ``ETag``/``Last-Modified`` and 304 support.
+
+    Entries are keyed on the host and path, the normalized query string, the
+    accepted renderer and the current tokens of ``version_keys``. Changing any of those
+    tokens (see :func:`invalidate_books`) orphans the old entries.
+
+    Args:
+        request: The DRF request.
+        version_keys: Cache keys of the version tokens the response depends on.
+        build: Produces the response on a miss; only 200 responses are stored.
+            It reads from the primary database if a token changed too recently
+            for the read replicas to be trusted.
+
+    With ``settings.LIBRARY_RESPONSE_CACHE`` off, every request just builds
+    its response, without validators.
+    """
+    if not settings.LIBRARY_RESPONSE_CACHE:
+        return build()
+    versions = _versions(version_keys)
+    key, etag, last_modified = _entry(request, request.query_params, request.accepted_renderer.format, versions)
+    headers = _validators(etag, last_modified)
+
+    if _not_modified(request, etag, last_modified):
+        _count('not_modified')
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = get_cache()
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return Response(data, headers={**headers, 'X-Cache': 'HIT'})
+
+    _count('misses')
+    with routers.fresh_reads(max(modified for _, modified in versions)):
+        response = build()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, response.data, timeout=getattr(settings, 'LIBRARY_RESPONSE_CACHE_TIMEOUT', 300))
+        for header, value in headers.items():
+            response[header] = value
+        response['X-Cache'] = 'MISS'
+    return response
+
+
+async def acached_response(request: Any, version_keys: List[str],
+                           build: Callable[[], Awaitable[Any]]) -> HttpResponse:
+    """
+    Async counterpart of :func:`cached_response` for plain Django views returning JSON.
+
+    Shares entries' version tokens with the DRF views, so the same
+    invalidations apply. ``build`` returns the data to serialize on a miss.
+    """
+    if not settings.LIBRARY_RESPONSE_CACHE:
+        return json_response(await build())
+    versions = await _aversions(version_keys)
+    key, etag, last_modified = _entry(request, request.GET, 'json', versions)
+    headers = _validators(etag, last_modified)
+
+    if _not_modified(request, etag, last_modified):
+        _count('not_modified')
+        return HttpResponseNotModified(headers=headers)
+
+    cache = get_cache()
+    data = await cache.aget(key)
+    if data is not None:
+        _count('hits')
+        headers['X-Cache'] = 'HIT'
+    else:
+        _count('misses')
+        with routers.fresh_reads(max(modified for _, modified in versions)):
+            data = await build()
+        await cache.aset(key, data, timeout=getattr(settings, 'LIBRARY_RESPONSE_CACHE_TIMEOUT', 300))
+        headers['X-Cache'] = 'MISS'
+    return json_response(data, headers=headers)
+
+
+def _not_modified(request: Any, etag: str, last_modified: int) -> bool:
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return etag in candidates or '*' in candidates
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+class CachedRetrieveListMixin:
+    """
+    Serve ``list`` and ``retrieve`` of a book view set from the response cache.
+
+    Lists depend on the whole catalog; a detail response only on its own book.
+    """
+
+    def list(self, request: Any, *args: Any, **kwargs: Any) -> Response:
+        return cached_response(
+            request, [CATALOG_VERSION_KEY],
+            lambda: super(CachedRetrieveListMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request: Any, *args: Any, **kwargs: Any) -> Response:
+        pk = str(kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+        if pk.isdigit():
+            pk = str(int(pk))
+        return cached_response(
+            request, [DETAILS_VERSION_KEY, BOOK_VERSION_KEY.format(pk=pk)],
+            lambda: super(CachedRetrieveListMixin, self).retrieve(request, *args, **kwargs),
+        )
@@ -0,0 +1,107 @@
+"""
+The change feed: a sequence number for every write to a book or a loan.
+
+Triggers on ``library_book``, ``library_loan`` and ``library_archivedloan``
+(created by migration ``0008_change_feed``) append a :class:`Change` row for
+each insert, update and delete, in the transaction making it. Mirrors
+poll :func:`changes_since` with the last sequence number they have seen and
+download only what changed after it, so syncing costs follow the number of
+writes rather than the size of the tables.
+
+Moving a loan to the archive deletes it from ``library_loan`` but keeps it
+in the history, so those deletes are not recorded; updates and deletes of
+archived loans are.
+"""
+from datetime import timedelta
+from typing import Any, Dict, Iterator, Tuple
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Book, Change, LoanHistory
+from .serializers import CHANGES_PAGE_SIZE, BookSerializer, LoanHistorySerializer
+from .services import write_transaction
+
+
+COMPACT_BATCH_SIZE = 5000
+
+
+def changes_since(since: int, limit: int = CHANGES_PAGE_SIZE, context: Any = None) -> Dict[str, Any]:
+    """
+    Return a page of the objects changed after sequence number ``since``.
+
+    Reads at most ``limit`` changes in sequence order. An object changed
+    several times in the page is listed once, at its last change, with its
+    current state; ``deleted`` objects have no ``data``. Pass the returned
+    ``next`` as ``since`` to continue; ``has_more`` says whether to do so now.
+
+    Changes are held back for ``LIBRARY_CHANGES_SETTLE_SECONDS`` after being
+    recorded, 5 by default on PostgreSQL: concurrent transactions there can
+    commit sequence numbers out of order, and waiting keeps a reader from
+    moving its cursor past a change that is not visible yet. SQLite runs one
+    write transaction at a time, so it needs no delay.
+
+    Args:
+        since: The last sequence number the reader has seen; 0 for all of them.
+        limit: Changes read per page.
+        context: Serializer context for the objects' data.
+
+    Returns:
+        dict: ``{'next', 'has_more', 'results'}``, each result being
+        ``{'seq', 'type', 'id', 'deleted', 'data'}``.
+    """
+    changes = Change.objects.filter(pk__gt=since).order_by('pk')
+    settle = settings.LIBRARY_CHANGES_SETTLE_SECONDS
+    if settle:
+        changes = changes.filter(changed_at__lte=timezone.now() - timedelta(seconds=settle))
+    rows = list(changes.values_list('pk', 'kind', 'object_id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest: Dict[Tuple[str, int], int] = {}
+    for seq, kind, object_id in rows:
+        latest.pop((kind, object_id), None)
+        latest[(kind, object_id)] = seq
+
+    data = {}
+    for kind, queryset, serializer_class in ((Change.BOOK, Book.objects.all(), BookSerializer),
+                                             (Change.LOAN, LoanHistory.objects.all(), LoanHistorySerializer)):
+        ids = [object_id for changed_kind, object_id in latest if changed_kind == kind]
+        if ids:
+            objects = list(queryset.filter(pk__in=ids))
+            serialized = serializer_class(objects, many=True, context=context or {}).data
+            data.update({(kind, obj.pk): item for obj, item in zip(objects, serialized)})
+
+    results = []
+    for (kind, object_id), seq in sorted(latest.items(), key=lambda item: item[1]):
+        item = data.get((kind, object_id))
+        results.append({'seq': seq, 'type': kind, 'id': object_id, 'deleted': item is None, 'data': item})
+    return {'next': rows[-1][0] if rows else since, 'has_more': has_more, 'results': results}
+
+
+def compact_changes(batch_size: int = COMPACT_BATCH_SIZE) -> Iterator[int]:
+    """
+    Delete changes superseded by a later change of the same object.
+
+    A reader behind the deleted change still gets the later one, which
+    carries the object's current state, so nothing is lost to anyone. Each
+    object keeps its last change, deletions included, so reading from 0
+    still returns every object. Works in sequence order, one transaction per
+    batch, like :func:`library.archive.archive_loans`.
+
+    Yields:
+        int: The number of changes deleted by each committed batch.
+    """
+    superseded = Change.objects.filter(Exists(Change.objects.filter(
+        kind=OuterRef('kind'), object_id=OuterRef('object_id'), pk__gt=OuterRef('pk'),
+    )))
+    last_id = 0
+    while True:
+        with write_transaction():
+            ids = list(superseded.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return
+            Change.objects.filter(pk__in=ids).delete()
+        last_id = ids[-1]
+        yield len(ids)
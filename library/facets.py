@@ -0,0 +1,111 @@
+"""
+Facet counts for the book list: how many matching books each top author has
+and how many are on the shelf or on loan.
+
+All of them come from one grouped aggregate over the filtered queryset: it
+groups by author, counts the books (and those available) per group, and
+sums those counts over every group with a window function, so a ``LIMIT``
+on the top authors does not truncate the availability totals. Results are
+cached per normalized filter (page and ordering do not change them) and
+catalog version.
+
+The admin's author filter lists :func:`top_authors` instead, which outlives
+catalog versions.
+"""
+import hashlib
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db.models import Count, Func, IntegerField, Q, QuerySet, Window
+from rest_framework.settings import api_settings
+
+from .caching import CATALOG_VERSION_KEY, _normalized_query, _versions, get_cache
+from .filters import BookFilter
+from .models import Book
+from .routers import fresh_reads
+
+
+FACETS_PARAM = 'facets'
+# Authors listed in the author facet, most books first
+AUTHOR_FACET_SIZE = 10
+TOP_AUTHORS_KEY = 'library:facets:top-authors'
+
+
+class _Total(Func):
+    # SUM over an aggregate, for use in Window(); Sum() rejects aggregate arguments
+    function = 'SUM'
+    window_compatible = True
+    output_field = IntegerField()
+
+
+def facets_requested(params: Any) -> bool:
+    return params.get(FACETS_PARAM, '').lower() in ('1', 'true')
+
+
+def _filter_params(params: Any) -> Any:
+    # Only the parameters that narrow the result set
+    kept = params.copy()
+    for key in params:
+        if key not in BookFilter.base_filters and key != api_settings.SEARCH_PARAM:
+            del kept[key]
+    return kept
+
+
+def count_facets(queryset: QuerySet) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Return the ``author`` and ``available`` facets of a Book queryset in one query.
+    """
+    on_shelf = Count('id', filter=Q(available=True))
+    rows = list(
+        queryset.order_by().values('author').annotate(
+            books=Count('id'), total=Window(_Total(Count('id'))), total_available=Window(_Total(on_shelf)),
+        ).order_by('-books', 'author')[:AUTHOR_FACET_SIZE]
+    )
+    total = rows[0]['total'] if rows else 0
+    available = rows[0]['total_available'] if rows else 0
+    return {
+        'author': [{'value': row['author'], 'count': row['books']} for row in rows],
+        'available': [{'value': True, 'count': available}, {'value': False, 'count': total - available}],
+    }
+
+
+def book_facets(queryset: QuerySet, params: Any) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Return :func:`count_facets` of the filtered book list, from the cache when possible.
+
+    Args:
+        queryset: The book list after filtering and searching.
+        params: The request's query parameters the queryset was filtered with.
+    """
+    if not settings.LIBRARY_RESPONSE_CACHE:
+        return count_facets(queryset)
+    (token, changed_at), = _versions([CATALOG_VERSION_KEY])
+    digest = hashlib.sha1(f'{_normalized_query(_filter_params(params))}|{token}'.encode()).hexdigest()
+    key = f'library:facets:{digest}'
+    cache = get_cache()
+    facets = cache.get(key)
+    if facets is None:
+        with fresh_reads(changed_at):
+            facets = count_facets(queryset)
+        cache.set(key, facets, timeout=getattr(settings, 'LIBRARY_RESPONSE_CACHE_TIMEOUT', 300))
+    return facets
+
+
+def top_authors() -> List[Dict[str, Any]]:
+    """
+    Return the ``AUTHOR_FACET_SIZE`` authors with the most books in the catalog.
+
+    Cached for ``LIBRARY_TOP_AUTHORS_TIMEOUT`` whatever the catalog version:
+    every borrow and return bumps that version without changing who wrote
+    what, and a ranking an hour old is good enough for a list of shortcuts.
+    On a miss the books are counted from ``book_author_idx`` alone, which
+    covers the grouping, without reading the table.
+    """
+    cache = get_cache()
+    authors = cache.get(TOP_AUTHORS_KEY)
+    if authors is None:
+        rows = (Book.objects.order_by().values('author').annotate(books=Count('id'))
+                .order_by('-books', 'author')[:AUTHOR_FACET_SIZE])
+        authors = [{'value': row['author'], 'count': row['books']} for row in rows]
+        cache.set(TOP_AUTHORS_KEY, authors, timeout=settings.LIBRARY_TOP_AUTHORS_TIMEOUT)
+    return authors
@@ -0,0 +1,55 @@
+from django.db.models import Value
+from django.utils import timezone
+from django_filters import rest_framework as django_filters
+
+from .models import Book, Loan, LoanHistory
+
+
+# Statuses covering open loans only, which the loan table answers without the archive
+OPEN_LOAN_STATUSES = ('active', 'overdue')
+
+
+class BookFilter(django_filters.FilterSet):
+    """
+    Filters shared by the book list and the book export: exact ``author`` and ``available``.
+    """
+    available = django_filters.BooleanFilter(method='filter_available')
+
+    class Meta:
+        model = Book
+        fields = ['author', 'available']
+
+    def filter_available(self, queryset, name, value):
+        # ``available=True`` compiles to a bare ``WHERE available``, which SQLite
+        # cannot answer from book_available_idx; an explicit comparison can.
+        return queryset.filter(available=Value(value))
+
+
+class LoanFilter(django_filters.FilterSet):
+    """
+    Filters for loans: ``status`` (``active``, ``overdue`` or ``returned``) and
+    a ``borrowed_at`` date range (``borrowed_after`` inclusive,
+    ``borrowed_before`` exclusive). Accepts dates or ISO 8601 datetimes.
+    """
+    status = django_filters.ChoiceFilter(
+        choices=[('active', 'Active'), ('overdue', 'Overdue'), ('returned', 'Returned')], method='filter_status',
+    )
+    borrowed_after = django_filters.DateTimeFilter(field_name='borrowed_at', lookup_expr='gte')
+    borrowed_before = django_filters.DateTimeFilter(field_name='borrowed_at', lookup_expr='lt')
+
+    class Meta:
+        model = Loan
+        fields = ['status', 'borrowed_after', 'borrowed_before']
+
+    def filter_status(self, queryset, name, value):
+        if value == 'overdue':
+            return queryset.filter(returned_at__isnull=True, due_at__lt=timezone.now())
+        return queryset.filter(returned_at__isnull=value == 'active')
+
+
+class LoanHistoryFilter(LoanFilter):
+    """
+    ``LoanFilter`` for the loan history view, archived loans included.
+    """
+    class Meta(LoanFilter.Meta):
+        model = LoanHistory
@@ -0,0 +1,238 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+logger = logging.getLogger('library.requests')
+
+# Upper bounds (ms) of the latency histogram buckets; the last one catches the rest.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+# How the last bucket's bound is reported: JSON has no infinity
+OVERFLOW_BOUND = '+Inf'
+
+_current: ContextVar[Optional['RequestTimings']] = ContextVar('library_request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Timings of one request, filled in by the middleware and the timed DRF classes.
+    """
+    __slots__ = ('started', 'view_started', 'db_queries', 'db_ms', 'auth_ms', 'serialize_ms')
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.view_started: Optional[float] = None
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.auth_ms = 0.0
+        self.serialize_ms = 0.0
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """
+    Return the timings of the request being served, or None outside a request.
+    """
+    return _current.get()
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """
+    Add the time spent in the block to ``<phase>_ms`` of the current request.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _current.get()
+        if timings is not None:
+            setattr(timings, f'{phase}_ms', getattr(timings, f'{phase}_ms') + (time.perf_counter() - started) * 1000)
+
+
+@receiver(connection_created)
+def install_query_timer(sender: Any, connection: Any, **kwargs: Any) -> None:
+    """
+    Time every query on every connection. Installed once per connection rather
+    than per request, so queries the async ORM runs in worker threads are
+    counted as well (the request's timings follow it there as context).
+    """
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _record_query(execute: Callable, sql: str, params: Any, many: bool, context: Dict[str, Any]) -> Any:
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_queries += 1
+        timings.db_ms += (time.perf_counter() - started) * 1000
+
+
+class _Histogram:
+    __slots__ = ('count', 'sum', 'buckets')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sum = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(BUCKETS_MS):
+            if value <= bound:
+                self.buckets[index] += 1
+                break
+
+    def quantile(self, q: float) -> Union[float, str, None]:
+        # Upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(BUCKETS_MS[:-1], self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return OVERFLOW_BOUND
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum_ms': round(self.sum, 3),
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'buckets': {str(bound): count for bound, count in zip(BUCKETS_MS[:-1], self.buckets)}
+            | {OVERFLOW_BOUND: self.buckets[-1]},
+        }
+
+
+class _RouteStats:
+    __slots__ = ('total', 'db', 'db_queries')
+
+    def __init__(self) -> None:
+        self.total = _Histogram()
+        self.db = _Histogram()
+        self.db_queries = 0
+
+
+_routes: Dict[str, _RouteStats] = {}
+_routes_lock = threading.Lock()
+
+
+def _observe(route: str, total_ms: float, timings: RequestTimings) -> None:
+    with _routes_lock:
+        stats = _routes.get(route)
+        if stats is None:
+            stats = _routes[route] = _RouteStats()
+        stats.total.observe(total_ms)
+        stats.db.observe(timings.db_ms)
+        stats.db_queries += timings.db_queries
+
+
+def route_stats() -> Dict[str, Any]:
+    """
+    Return this process's per-route latency and database time histograms.
+    """
+    with _routes_lock:
+        return {
+            route: {
+                'latency': stats.total.snapshot(),
+                'db': stats.db.snapshot(),
+                'db_queries_per_request': stats.db_queries / stats.total.count,
+            }
+            for route, stats in sorted(_routes.items())
+        }
+
+
+def reset_route_stats() -> None:
+    with _routes_lock:
+        _routes.clear()
+
+
+class InstrumentationMiddleware:
+    """
+    Time every request and report it in ``Server-Timing``, a log line and the route histograms.
+
+    Records the SQL query count and time (see :func:`install_query_timer`),
+    the time spent authenticating and rendering (see
+    :class:`library.authentication.TimedJWTAuthentication` and
+    :class:`library.renderers.TimedJSONRenderer`), the view time (everything
+    from the view being called until its response is rendered, minus
+    rendering) and the total. Works under WSGI and ASGI; put it first in
+    ``MIDDLEWARE``.
+
+    The body of a streaming response is produced after the middleware returns,
+    so its queries are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: Any) -> Any:
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, response, timings)
+        return response
+
+    async def __acall__(self, request: Any) -> Any:
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, response, timings)
+        return response
+
+    def process_view(self, request: Any, view_func: Callable, view_args: Any, view_kwargs: Any) -> None:
+        timings = _current.get()
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+
+    def report(self, request: Any, response: Any, timings: RequestTimings) -> None:
+        finished = time.perf_counter()
+        total_ms = (finished - timings.started) * 1000
+        view_ms = (finished - timings.view_started) * 1000 - timings.serialize_ms if timings.view_started else 0.0
+        match = getattr(request, 'resolver_match', None)
+        route = f"{request.method} {match.view_name if match else 'unresolved'}"
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db_ms:.2f};desc="{timings.db_queries} queries"',
+            f'auth;dur={timings.auth_ms:.2f}',
+            f'view;dur={view_ms:.2f}',
+            f'serialize;dur={timings.serialize_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ])
+        _observe(route, total_ms, timings)
+        logger.info(
+            'route="%s" path="%s" status=%s total_ms=%.2f db_queries=%d db_ms=%.2f auth_ms=%.2f view_ms=%.2f '
+            'serialize_ms=%.2f',
+            route, request.path, response.status_code, total_ms, timings.db_queries, timings.db_ms,
+            timings.auth_ms, view_ms, timings.serialize_ms,
+            extra={'route': route, 'status_code': response.status_code, 'total_ms': total_ms,
+                   'db_queries': timings.db_queries, 'db_ms': timings.db_ms, 'auth_ms': timings.auth_ms,
+                   'view_ms': view_ms, 'serialize_ms': timings.serialize_ms},
+        )
@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from library.archive import ARCHIVE_BATCH_SIZE, archive_loans
+
+
+class Command(BaseCommand):
+    help = 'Move loans returned long ago from the loan table to the archive, in resumable batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=settings.LIBRARY_LOAN_ARCHIVE_DAYS,
+                            help='Archive loans returned more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help='Loans moved per transaction.')
+        parser.add_argument('--max-batches', type=int,
+                            help='Stop after this many batches; the next run picks up where this one stopped.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        if options['older_than'] < 0:
+            raise CommandError('--older-than cannot be negative.')
+
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        started = time.perf_counter()
+        archived = batches = 0
+        for moved in archive_loans(cutoff, options['batch_size']):
+            archived += moved
+            batches += 1
+            elapsed = time.perf_counter() - started
+            self.stderr.write(f'{archived} archived ({archived / elapsed:.0f} rows/s)')
+            if batches == options['max_batches']:
+                break
+
+        elapsed = time.perf_counter() - started
+        rate = archived / elapsed if elapsed else archived
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} loans returned before {cutoff:%Y-%m-%d} in {elapsed:.1f}s ({rate:.0f} rows/s)'
+        ))
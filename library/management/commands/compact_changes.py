@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.changes import COMPACT_BATCH_SIZE, compact_changes
+
+
+class Command(BaseCommand):
+    help = 'Delete change feed entries superseded by a later change of the same book or loan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=COMPACT_BATCH_SIZE,
+                            help='Changes deleted per transaction.')
+        parser.add_argument('--max-batches', type=int,
+                            help='Stop after this many batches; the next run picks up where this one stopped.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        started = time.perf_counter()
+        deleted = batches = 0
+        for removed in compact_changes(options['batch_size']):
+            deleted += removed
+            batches += 1
+            if batches == options['max_batches']:
+                break
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} superseded changes in {elapsed:.1f}s'))
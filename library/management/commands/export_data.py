@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library.exports import BOOK_EXPORT_FIELDS, EXPORT_CONTENT_TYPES, LOAN_EXPORT_FIELDS, export_rows
+from library.filters import BookFilter, LoanHistoryFilter
+from library.models import Book, LoanHistory
+
+
+EXPORTS = {
+    'books': (Book, BookFilter, BOOK_EXPORT_FIELDS),
+    'loans': (LoanHistory, LoanHistoryFilter, LOAN_EXPORT_FIELDS),
+}
+
+
+class Command(BaseCommand):
+    help = 'Stream the catalog or loan history as CSV or JSON lines (same filters as /api/export/)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(EXPORTS))
+        parser.add_argument('--output', choices=sorted(EXPORT_CONTENT_TYPES), default='csv', help='Export format.')
+        parser.add_argument('--file', help='Write to this file instead of stdout.')
+        parser.add_argument('--author', help='Books only: exact author.')
+        parser.add_argument('--available', choices=['true', 'false'], help='Books only: availability.')
+        parser.add_argument('--borrowed-after', help='Loans only: borrowed at or after this date/datetime.')
+        parser.add_argument('--borrowed-before', help='Loans only: borrowed before this date/datetime.')
+
+    def handle(self, *args, **options):
+        model, filterset_class, fields = EXPORTS[options['table']]
+        data = {
+            name: options[name] for name in filterset_class.base_filters
+            if options.get(name) is not None
+        }
+        filterset = filterset_class(data, queryset=model.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(dict(filterset.errors))
+
+        chunks = export_rows(filterset.qs, fields, options['output'])
+        if not options['file']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['file'], 'w', newline='', encoding='utf-8') as target:
+            for chunk in chunks:
+                target.write(chunk)
@@ -0,0 +1,119 @@
+import csv
+import json
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from library import autocomplete
+from library.caching import invalidate_books
+from library.models import Book
+from library.serializers import BookImportSerializer
+from library.services import write_transaction
+
+
+UPDATE_FIELDS = ['title', 'author', 'page_count']
+
+
+class Command(BaseCommand):
+    help = 'Stream books from a CSV or JSONL feed into the catalog, upserting on ISBN'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed to import, or '-' to read from stdin.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Feed format. Defaults to the file extension (csv for stdin).')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows written per transaction.')
+        parser.add_argument('--rejects', help='Write rejected rows and their errors to this JSONL file.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        source = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        rejects = open(options['rejects'], 'w', encoding='utf-8') if options['rejects'] else None
+        try:
+            imported, rejected, elapsed = self.import_feed(source, fmt, batch_size, rejects)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if rejects:
+                rejects.close()
+
+        rate = imported / elapsed if elapsed else imported
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} books ({rejected} rejected) in {elapsed:.1f}s ({rate:.0f} rows/s)'
+        ))
+
+    def import_feed(self, source: TextIO, fmt: str, batch_size: int,
+                    rejects: Optional[TextIO]) -> Tuple[int, int, float]:
+        """
+        Validate and upsert the feed batch by batch, holding at most one batch in memory.
+        """
+        # One serializer instance is reused so its fields are only built once.
+        serializer = BookImportSerializer()
+        started = time.perf_counter()
+        imported = rejected = 0
+        batch: Dict[str, Book] = {}
+
+        for line, row, error in read_rows(source, fmt):
+            if error is None:
+                try:
+                    data = serializer.run_validation(row)
+                except ValidationError as exc:
+                    error = exc.detail
+            if error is not None:
+                rejected += 1
+                if rejects:
+                    rejects.write(json.dumps({'line': line, 'row': row, 'errors': error}) + '\n')
+                continue
+
+            # The last row wins when a batch repeats an ISBN.
+            batch[data['isbn']] = Book(**data)
+            if len(batch) >= batch_size:
+                imported += self.write_batch(batch)
+                batch = {}
+                elapsed = time.perf_counter() - started
+                self.stderr.write(f'{imported} imported, {rejected} rejected ({imported / elapsed:.0f} rows/s)')
+
+        if batch:
+            imported += self.write_batch(batch)
+        return imported, rejected, time.perf_counter() - started
+
+    def write_batch(self, batch: Dict[str, Book]) -> int:
+        with write_transaction():
+            Book.objects.bulk_create(
+                batch.values(), update_conflicts=True, unique_fields=['isbn'], update_fields=UPDATE_FIELDS,
+            )
+            invalidate_books()
+            autocomplete.invalidate()
+        return len(batch)
+
+
+def read_rows(source: TextIO, fmt: str) -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """
+    Yield ``(line_number, row, error)`` triples from a CSV or JSONL stream.
+
+    ``error`` is set when a line cannot be parsed at all.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for line_number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, line.rstrip('\n'), f'Invalid JSON: {exc}'
+            continue
+        if not isinstance(row, dict):
+            yield line_number, row, 'Expected a JSON object.'
+            continue
+        yield line_number, row, None
@@ -0,0 +1,66 @@
+import json
+import time
+from typing import Any, Dict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from library.models import User
+from library.overdue import SCAN_CHUNK_SIZE, scan_overdue
+
+
+class Command(BaseCommand):
+    help = 'Flag overdue loans in keyset-ordered chunks and print a JSON summary line per borrower'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=SCAN_CHUNK_SIZE, help='Loans read per query.')
+        parser.add_argument('--include-flagged', action='store_true',
+                            help='Also report loans flagged by an earlier scan.')
+        parser.add_argument('--dry-run', action='store_true', help='Report without flagging anything.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        now = timezone.now()
+        started = time.perf_counter()
+        # One entry per borrower, however many loans they have overdue. Loans
+        # arrive in due date order, so the first one seen is the oldest.
+        borrowers: Dict[int, Dict[str, Any]] = {}
+        scanned = 0
+        for chunk in scan_overdue(now, options['chunk_size'], flag=not options['dry_run'],
+                                  include_flagged=options['include_flagged']):
+            scanned += len(chunk)
+            for _, user_id, due_at in chunk:
+                summary = borrowers.get(user_id)
+                if summary is None:
+                    borrowers[user_id] = {'overdue_loans': 1, 'oldest_due_at': due_at}
+                else:
+                    summary['overdue_loans'] += 1
+            elapsed = time.perf_counter() - started
+            self.stderr.write(f'{scanned} overdue loans scanned ({scanned / elapsed:.0f} rows/s)')
+
+        self.write_summaries(borrowers, now)
+        elapsed = time.perf_counter() - started
+        action = 'Found' if options['dry_run'] else 'Flagged'
+        self.stderr.write(self.style.SUCCESS(
+            f'{action} {scanned} overdue loans of {len(borrowers)} borrowers in {elapsed:.1f}s'
+        ))
+
+    def write_summaries(self, borrowers: Dict[int, Dict[str, Any]], now: Any) -> None:
+        user_ids = sorted(borrowers)
+        for start in range(0, len(user_ids), SCAN_CHUNK_SIZE):
+            batch = user_ids[start:start + SCAN_CHUNK_SIZE]
+            users = {pk: (username, email) for pk, username, email in
+                     User.objects.filter(pk__in=batch).values_list('pk', 'username', 'email')}
+            for user_id in batch:
+                summary = borrowers[user_id]
+                username, email = users.get(user_id, (None, None))
+                self.stdout.write(json.dumps({
+                    'user': user_id,
+                    'username': username,
+                    'email': email,
+                    'overdue_loans': summary['overdue_loans'],
+                    'oldest_due_at': summary['oldest_due_at'].isoformat(),
+                    'days_overdue': (now - summary['oldest_due_at']).days,
+                }))
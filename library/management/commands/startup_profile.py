@@ -0,0 +1,82 @@
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library.startup import PHASE_MARKER
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)')
+
+
+def profile(warmup: bool = False, path: str = '/api/books/') -> Tuple[Dict[str, Any], List[Tuple[str, str, float]]]:
+    """
+    Boot the project in a fresh ``python -X importtime`` interpreter.
+
+    Returns the phase timings reported by :func:`library.startup.profile_boot`
+    and, per module imported, the innermost phase it was imported in and its
+    own import time in ms.
+    """
+    code = f'from library.startup import profile_boot; profile_boot(warmup={warmup!r}, path={path!r})'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, cwd=settings.BASE_DIR)
+    if result.returncode:
+        raise CommandError(f'Booting failed:\n{result.stderr[-2000:]}')
+    stack = ['interpreter']
+    imports = []
+    for line in result.stderr.splitlines():
+        if line.startswith(PHASE_MARKER):
+            event, _, name = line[len(PHASE_MARKER):].strip().partition(' ')
+            if event == 'begin':
+                stack.append(name)
+            else:
+                stack.pop()
+            continue
+        match = IMPORT_LINE.match(line)
+        if match:
+            imports.append((stack[-1], match[2], int(match[1]) / 1000))
+    return json.loads(result.stdout.splitlines()[-1]), imports
+
+
+class Command(BaseCommand):
+    help = ('Boot the project as a WSGI worker does, in a fresh interpreter, and report where the time '
+            'goes: per phase, per app and per imported package')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--warmup', action='store_true', help='Run the LIBRARY_WARMUP warm-up before the request.')
+        parser.add_argument('--path', default='/api/books/', help='Path of the first request.')
+        parser.add_argument('--top', type=int, default=15, help='Packages to list by import time.')
+        parser.add_argument('--json', action='store_true', help='Print the raw timings as JSON instead.')
+
+    def handle(self, *args, **options):
+        report, imports = profile(options['warmup'], options['path'])
+        imports_ms: Dict[str, float] = defaultdict(float)
+        packages: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+        for phase, module, ms in imports:
+            imports_ms[phase] += ms
+            package = packages[module.partition('.')[0]]
+            package[0] += ms
+            package[1] += 1
+
+        if options['json']:
+            report['packages'] = {name: {'ms': ms, 'modules': count} for name, (ms, count) in packages.items()}
+            self.stdout.write(json.dumps(report))
+            return
+
+        self.stdout.write(f'{"Phase":<44} {"ms":>9} {"imports ms":>11}')
+        self.stdout.write(f'{"interpreter":<44} {"":>9} {imports_ms["interpreter"]:>11.1f}')
+        for row in report['phases']:
+            label = '  ' * row['depth'] + row['phase']
+            self.stdout.write(f'{label:<44} {row["ms"]:>9.1f} {imports_ms[row["phase"]]:>11.1f}')
+        self.stdout.write(f'Ready to serve after {report["boot_ms"]:.0f}ms; the first request returned '
+                          f'{report["status"]}.')
+        self.stdout.write('"imports ms" leaves out the phases nested below.')
+
+        self.stdout.write(f'\n{"Package":<32} {"imports ms":>11} {"modules":>8}')
+        ranked = sorted(packages.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (ms, count) in ranked[:options['top']]:
+            self.stdout.write(f'{name:<32} {ms:>11.1f} {count:>8}')
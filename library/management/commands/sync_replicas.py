@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Copy the primary SQLite database to the SQLite read replicas, standing in for replication '
+            'in local setups')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float,
+                            help='Keep copying every this many seconds (the simulated replication lag) '
+                                 'until interrupted.')
+
+    def handle(self, *args, **options):
+        aliases = settings.LIBRARY_READ_REPLICAS
+        if not aliases:
+            raise CommandError('No read replicas configured; set DATABASE_REPLICA_URLS.')
+        for alias in [DEFAULT_DB_ALIAS, *aliases]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias} is not SQLite; use the database\'s own replication.')
+        if options['every'] is not None and options['every'] <= 0:
+            raise CommandError('--every must be positive.')
+
+        while True:
+            started = time.perf_counter()
+            for alias in aliases:
+                self.copy(alias)
+            self.stderr.write(f'Copied the primary to {", ".join(aliases)} '
+                              f'in {(time.perf_counter() - started) * 1000:.0f}ms')
+            if options['every'] is None:
+                break
+            time.sleep(options['every'])
+
+    def copy(self, alias: str) -> None:
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        # Close the replica's own connection first; the backup replaces the file's contents
+        connections[alias].close()
+        target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
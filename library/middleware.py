@@ -0,0 +1,93 @@
+from typing import Any, Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from rest_framework.permissions import SAFE_METHODS
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import routers
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also runs natively under ASGI.
+
+    WhiteNoise's middleware is sync-only, and a single sync-only middleware
+    makes Django run every view under it through a thread, async views
+    included. Static files are looked up in WhiteNoise's in-memory index and
+    only their (rare) serving is pushed to a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable, *args: Any, **kwargs: Any) -> None:
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: Any) -> Any:
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request: Any) -> Any:
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Keep requests that write, and users who just wrote, on the primary database.
+
+    A safe request reads from one replica throughout, and a request with an
+    unsafe method from the primary. Once the latter succeeds, its user is
+    pinned to the primary for ``LIBRARY_REPLICA_STICKY_SECONDS`` (see
+    :mod:`library.routers`); their next requests find that out when they
+    authenticate. Put it before any
+    middleware that queries the database.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: Any) -> Any:
+        if self.is_async:
+            return self.__acall__(request)
+        token = routers.read_primary(request.method not in SAFE_METHODS)
+        replica = routers.choose_replica()
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.reset_replica(replica)
+            routers.reset_primary(token)
+        self.pin_writer(request, response)
+        return response
+
+    async def __acall__(self, request: Any) -> Any:
+        token = routers.read_primary(request.method not in SAFE_METHODS)
+        replica = routers.choose_replica()
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.reset_replica(replica)
+            routers.reset_primary(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            await sync_to_async(self.pin_writer)(request, response)
+        return response
+
+    def pin_writer(self, request: Any, response: Any) -> None:
+        # DRF copies the user it authenticated (e.g. from a JWT) onto the Django request
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            routers.pin_user(user.pk)
@@ -0,0 +1,81 @@
+from django.db import migrations, models
+
+
+FTS_TABLE = 'library_book_fts'
+
+# The search triggers of 0002_book_search_index, as they were then
+SQLITE_FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON library_book BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, author, isbn)
+        VALUES (new.id, new.title, new.author, new.isbn);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON library_book BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, author, isbn ON library_book BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn);
+        INSERT INTO {FTS_TABLE}(rowid, title, author, isbn)
+        VALUES (new.id, new.title, new.author, new.isbn);
+    END
+    """,
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    # Only SQLite drops a table's triggers when rebuilding it
+    if schema_editor.connection.vendor == 'sqlite':
+        for trigger in SQLITE_FTS_TRIGGERS:
+            schema_editor.execute(trigger)
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def unavailable_books_have_no_copies(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    Book.objects.filter(available=False).update(available_copies=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_book_indexes'),
+    ]
+
+    # SQLite rebuilds library_book for these operations, dropping the search
+    # triggers; they are reinstalled last (and first, when unapplying).
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='book',
+            name='total_copies',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='available_copies',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(unavailable_books_have_no_copies, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.CheckConstraint(
+                condition=models.Q(available_copies__lte=models.F('total_copies')),
+                name='book_copies_lte_total',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.CheckConstraint(
+                condition=models.Q(('available', True), ('available_copies__gt', 0))
+                | models.Q(('available', False), ('available_copies', 0)),
+                name='book_available_matches_copies',
+            ),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
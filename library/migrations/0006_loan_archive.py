@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+LOAN_HISTORY_VIEW = """
+CREATE VIEW library_loan_history AS
+    SELECT id, user_id, book_id, borrowed_at, returned_at FROM library_loan
+    UNION ALL
+    SELECT id, user_id, book_id, borrowed_at, returned_at FROM library_archivedloan
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0005_book_copies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('borrowed_at', models.DateTimeField()),
+                ('returned_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'loan history',
+                'db_table': 'library_loan_history',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedLoan',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('borrowed_at', models.DateTimeField()),
+                ('returned_at', models.DateTimeField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='library.book')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='archivedloan_user_idx')],
+            },
+        ),
+        migrations.RunSQL(LOAN_HISTORY_VIEW, 'DROP VIEW library_loan_history'),
+    ]
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+# LIBRARY_LOAN_PERIOD_DAYS when this migration was written; the setting may change later,
+# the loans this migration gave a due date may not
+LOAN_PERIOD_DAYS = 14
+
+
+OLD_LOAN_HISTORY_VIEW = """
+CREATE VIEW library_loan_history AS
+    SELECT id, user_id, book_id, borrowed_at, returned_at FROM library_loan
+    UNION ALL
+    SELECT id, user_id, book_id, borrowed_at, returned_at FROM library_archivedloan
+"""
+
+LOAN_HISTORY_VIEW = """
+CREATE VIEW library_loan_history AS
+    SELECT id, user_id, book_id, borrowed_at, due_at, returned_at, overdue_flagged_at FROM library_loan
+    UNION ALL
+    SELECT id, user_id, book_id, borrowed_at, due_at, returned_at, overdue_flagged_at FROM library_archivedloan
+"""
+
+
+def loans_are_due_a_period_after_borrowing(apps, schema_editor):
+    period = timedelta(days=LOAN_PERIOD_DAYS)
+    for name in ('Loan', 'ArchivedLoan'):
+        apps.get_model('library', name).objects.update(due_at=F('borrowed_at') + period)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0006_loan_archive'),
+    ]
+
+    # The history view is dropped while SQLite rebuilds the loan tables
+    # underneath it, and recreated with the new columns at the end.
+    operations = [
+        migrations.RunSQL('DROP VIEW library_loan_history', OLD_LOAN_HISTORY_VIEW),
+        migrations.AddField(
+            model_name='loan',
+            name='due_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='overdue_flagged_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedloan',
+            name='due_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='archivedloan',
+            name='overdue_flagged_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanhistory',
+            name='due_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='loanhistory',
+            name='overdue_flagged_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(loans_are_due_a_period_after_borrowing, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('returned_at__isnull', True)), fields=['due_at', 'id'],
+                               name='loan_open_due_idx'),
+        ),
+        migrations.RunSQL(LOAN_HISTORY_VIEW, 'DROP VIEW library_loan_history'),
+    ]
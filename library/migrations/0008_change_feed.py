@@ -0,0 +1,107 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# The triggers feeding library_change (see library/changes.py). The DDL lives
+# here so this migration does not depend on the app's modules. SQLite drops a
+# table's triggers whenever Django rebuilds it, so a later migration altering
+# one of these tables has to create its triggers again.
+CHANGE_TABLE = 'library_change'
+
+# Deleting a loan that was just copied to the archive moves it, and moving a
+# loan into the archive does not change it
+ARCHIVED = 'EXISTS (SELECT 1 FROM library_archivedloan WHERE id = {row}.id)'
+
+# (table, kind, {event: condition for recording it, or None})
+WATCHED = [
+    ('library_book', 'book', {'INSERT': None, 'UPDATE': None, 'DELETE': None}),
+    ('library_loan', 'loan', {'INSERT': None, 'UPDATE': None, 'DELETE': f'NOT {ARCHIVED}'}),
+    ('library_archivedloan', 'loan', {'UPDATE': None, 'DELETE': None}),
+]
+
+SUFFIXES = {'INSERT': 'ai', 'UPDATE': 'au', 'DELETE': 'ad'}
+
+POSTGRES_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION {CHANGE_TABLE}_record() RETURNS trigger AS $$
+DECLARE
+    changed_id bigint := CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END;
+BEGIN
+    IF TG_OP = 'DELETE' AND TG_TABLE_NAME = 'library_loan'
+            AND EXISTS (SELECT 1 FROM library_archivedloan WHERE id = changed_id) THEN
+        RETURN NULL;
+    END IF;
+    INSERT INTO {CHANGE_TABLE} (kind, object_id, changed_at) VALUES (TG_ARGV[0], changed_id, clock_timestamp());
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def install_change_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for table, kind, events in WATCHED:
+            for event, condition in events.items():
+                row = 'old' if event == 'DELETE' else 'new'
+                when = f'WHEN {condition.format(row=row)} ' if condition else ''
+                schema_editor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_change_{SUFFIXES[event]} AFTER {event} ON {table} {when}BEGIN
+                    INSERT INTO {CHANGE_TABLE}(kind, object_id, changed_at)
+                    VALUES ('{kind}', {row}.id, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+                END
+                """)
+    elif vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_FUNCTION)
+        for table, kind, events in WATCHED:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_change ON {table}")
+            schema_editor.execute(
+                f"CREATE TRIGGER {table}_change AFTER {' OR '.join(events)} ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION {CHANGE_TABLE}_record('{kind}')"
+            )
+
+
+def uninstall_change_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for table, _, events in WATCHED:
+            for event in events:
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_change_{SUFFIXES[event]}")
+    elif vendor == 'postgresql':
+        for table, _, _ in WATCHED:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_change ON {table}")
+        schema_editor.execute(f"DROP FUNCTION IF EXISTS {CHANGE_TABLE}_record()")
+
+
+def record_existing_rows(apps, schema_editor):
+    # Reading the feed from 0 returns every book and loan, including those
+    # written before the triggers existed
+    now = schema_editor.connection.ops.adapt_datetimefield_value(timezone.now())
+    for kind, source in (('book', 'library_book'), ('loan', 'library_loan_history')):
+        schema_editor.execute(
+            f'INSERT INTO {CHANGE_TABLE} (kind, object_id, changed_at) SELECT %s, id, %s FROM {source} ORDER BY id',
+            [kind, now],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0007_loan_due_dates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('book', 'Book'), ('loan', 'Loan')], max_length=4)),
+                ('object_id', models.BigIntegerField()),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'object_id', 'id'], name='change_object_idx')],
+            },
+        ),
+        migrations.RunPython(record_existing_rows, migrations.RunPython.noop),
+        migrations.RunPython(install_change_triggers, uninstall_change_triggers),
+    ]
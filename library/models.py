@@ -1,8 +1,11 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
-from typing import Optional
+from typing import Any, Optional
 
 
 class User(AbstractUser):
@@ -33,15 +36,68 @@ class Book(models.Model):
         author (str): The author of the book.
         isbn (str): The unique ISBN number of the book.
         page_count (int): The total number of pages in the book.
-        available (bool): Availability status of the book for borrowing.
+        total_copies (int): Number of copies the library owns.
+        available_copies (int): Copies on the shelf, i.e. not out on loan.
+        available (bool): Whether at least one copy can be borrowed. Derived
+            from ``available_copies`` and stored so it can be indexed.
+
+    The copy counters are only changed by the conditional updates in
+    :mod:`library.services`; ``save()`` on an existing book leaves them alone
+    so a stale instance cannot overwrite a concurrent borrow or return.
     """
 
     title: models.CharField = models.CharField(max_length=255)
     author: models.CharField = models.CharField(max_length=255)
     isbn: models.CharField = models.CharField(max_length=13, unique=True)
     page_count: models.PositiveIntegerField = models.PositiveIntegerField()
+    total_copies: models.PositiveIntegerField = models.PositiveIntegerField(default=1)
+    available_copies: models.PositiveIntegerField = models.PositiveIntegerField(default=1)
     available: models.BooleanField = models.BooleanField(default=True)
 
+    INVENTORY_FIELDS = ('total_copies', 'available_copies', 'available')
+
+    class Meta:
+        # One index per filter/ordering of the API and the admin. Each ends
+        # in ``id`` so filtered lists come back in the default order and
+        # keyset pages can seek on ``(field, id)`` without sorting.
+        indexes = [
+            models.Index(fields=['author', 'id'], name='book_author_idx'),
+            models.Index(fields=['available', 'id'], name='book_available_idx'),
+            models.Index(fields=['title', 'id'], name='book_title_idx'),
+            models.Index(fields=['page_count', 'id'], name='book_page_count_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(available_copies__lte=models.F('total_copies')),
+                name='book_copies_lte_total',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(available=True, available_copies__gt=0)
+                | models.Q(available=False, available_copies=0),
+                name='book_available_matches_copies',
+            ),
+        ]
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Save the book, keeping ``available`` in line with ``available_copies``.
+
+        A new book created with ``available=False`` starts with no copies on
+        the shelf. For existing books the inventory fields are left out of the
+        update unless named in ``update_fields``.
+        """
+        if self._state.adding:
+            if not self.available:
+                self.available_copies = 0
+            self.available = self.available_copies > 0
+        elif kwargs.get('update_fields') is None:
+            skipped = set(self.INVENTORY_FIELDS) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         """
         Returns the string representation of the book, which is its title.
@@ -52,6 +108,13 @@ class Book(models.Model):
         return f"{self.title} by {self.author}"
 
 
+def due_date(borrowed_at: datetime) -> datetime:
+    """
+    Return when a loan made at ``borrowed_at`` is due, ``LIBRARY_LOAN_PERIOD_DAYS`` later.
+    """
+    return borrowed_at + timedelta(days=settings.LIBRARY_LOAN_PERIOD_DAYS)
+
+
 class Loan(models.Model):
     """
     Model representing a loan of a book to a user.
@@ -60,13 +123,36 @@ class Loan(models.Model):
         user (User): The user who borrowed the book.
         book (Book): The book that was borrowed.
         borrowed_at (datetime): Timestamp when the book was borrowed.
+        due_at (datetime): Timestamp when the book is due back; ``due_date(borrowed_at)`` unless given.
         returned_at (Optional[datetime]): Timestamp when the book was returned; None if not returned.
+        overdue_flagged_at (Optional[datetime]): When ``manage.py scan_overdue`` found the loan overdue.
     """
 
-    user: models.ForeignKey = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Indexed through loan_user_returned_idx, which leads with the user
+    user: models.ForeignKey = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     book: models.ForeignKey = models.ForeignKey(Book, on_delete=models.CASCADE)
     borrowed_at: models.DateTimeField = models.DateTimeField(default=timezone.now)
+    # Set on save rather than through a default: a default callable would tie the migrations to this module
+    due_at: models.DateTimeField = models.DateTimeField()
     returned_at: Optional[models.DateTimeField] = models.DateTimeField(null=True, blank=True)
+    overdue_flagged_at: Optional[models.DateTimeField] = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # A user's loans, optionally only the open (or returned) ones
+            models.Index(fields=['user', 'returned_at'], name='loan_user_returned_idx'),
+            # The open loan of a book
+            models.Index(fields=['book'], condition=models.Q(returned_at__isnull=True),
+                         name='loan_open_book_idx'),
+            # Open loans by due date, walked in (due_at, id) order by the overdue scan
+            models.Index(fields=['due_at', 'id'], condition=models.Q(returned_at__isnull=True),
+                         name='loan_open_due_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.due_at is None:
+            self.due_at = due_date(self.borrowed_at)
+        super().save(*args, **kwargs)
 
     def is_returned(self) -> bool:
         """
@@ -83,3 +169,89 @@ class Loan(models.Model):
     def clean(self):
         if not self.book.available:
             raise ValidationError("Cannot loan a book that is not available.")
+
+
+class ArchivedLoan(models.Model):
+    """
+    A returned loan moved out of ``Loan`` by ``manage.py archive_loans``.
+
+    Keeps the loan's id, so ids are unique across both tables. Read loans
+    through :class:`LoanHistory` rather than from here directly.
+    """
+
+    id: models.BigIntegerField = models.BigIntegerField(primary_key=True)
+    # Indexed through archivedloan_user_idx, which leads with the user
+    user: models.ForeignKey = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    book: models.ForeignKey = models.ForeignKey(Book, on_delete=models.CASCADE)
+    borrowed_at: models.DateTimeField = models.DateTimeField()
+    due_at: models.DateTimeField = models.DateTimeField()
+    returned_at: models.DateTimeField = models.DateTimeField()
+    overdue_flagged_at: Optional[models.DateTimeField] = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='archivedloan_user_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"Archived loan of book {self.book_id} by user {self.user_id}"
+
+
+class LoanHistory(models.Model):
+    """
+    Every loan, open or returned, hot or archived: the ``library_loan_history``
+    view over ``Loan`` and ``ArchivedLoan``. Read-only.
+
+    History reads (loan lists, exports, the admin history) go through this
+    view; open-loan reads and all writes use ``Loan``, which only holds open
+    and recently returned loans.
+    """
+
+    user: models.ForeignKey = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                                                related_name='+')
+    book: models.ForeignKey = models.ForeignKey(Book, on_delete=models.DO_NOTHING, db_constraint=False,
+                                                related_name='+')
+    borrowed_at: models.DateTimeField = models.DateTimeField()
+    due_at: models.DateTimeField = models.DateTimeField()
+    returned_at: Optional[models.DateTimeField] = models.DateTimeField(null=True, blank=True)
+    overdue_flagged_at: Optional[models.DateTimeField] = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        managed = False
+        db_table = 'library_loan_history'
+        verbose_name_plural = 'loan history'
+
+    def is_returned(self) -> bool:
+        return self.returned_at is not None
+
+    def __str__(self) -> str:
+        return f"Loan of book {self.book_id} by user {self.user_id}"
+
+
+class Change(models.Model):
+    """
+    A write to a book or a loan, numbered in the order it was recorded.
+
+    Rows are appended by database triggers (see :mod:`library.changes`), so
+    every write path feeds ``/api/changes/``: the API, the admin, bulk
+    updates and management commands. A row only names what changed; the
+    feed reads the current state, or reports a deletion if there is none.
+    """
+
+    BOOK = 'book'
+    LOAN = 'loan'
+    KINDS = [(BOOK, 'Book'), (LOAN, 'Loan')]
+
+    id: models.BigAutoField = models.BigAutoField(primary_key=True)
+    kind: models.CharField = models.CharField(max_length=4, choices=KINDS)
+    object_id: models.BigIntegerField = models.BigIntegerField()
+    changed_at: models.DateTimeField = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Finds the changes superseded by a later one of the same object
+            models.Index(fields=['kind', 'object_id', 'id'], name='change_object_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"Change {self.pk} of {self.kind} {self.object_id}"
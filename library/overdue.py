@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Iterator, List, Tuple
+
+from django.db.models import Q
+
+from .models import Loan
+from .services import write_transaction
+
+
+SCAN_CHUNK_SIZE = 5000
+
+OverdueLoan = Tuple[int, int, datetime]
+
+
+def scan_overdue(now: datetime, chunk_size: int = SCAN_CHUNK_SIZE, flag: bool = True,
+                 include_flagged: bool = False) -> Iterator[List[OverdueLoan]]:
+    """
+    Walk the open loans that were due before ``now``, one chunk at a time.
+
+    Chunks are read in ``(due_at, id)`` order from ``loan_open_due_idx``,
+    seeking past the last loan of the previous chunk instead of using an
+    offset, so every chunk costs the same and only one is held in memory.
+
+    Args:
+        now: Loans due before this moment are overdue.
+        chunk_size: Loans read (and flagged) per query.
+        flag: Set ``overdue_flagged_at`` to ``now`` on every loan found,
+            committing once per chunk.
+        include_flagged: Also return loans flagged by an earlier scan.
+
+    Yields:
+        list: ``(loan_id, user_id, due_at)`` tuples of each chunk.
+    """
+    overdue = Loan.objects.filter(returned_at__isnull=True, due_at__lt=now)
+    if not include_flagged:
+        overdue = overdue.filter(overdue_flagged_at__isnull=True)
+    overdue = overdue.order_by('due_at', 'id').values_list('pk', 'user_id', 'due_at')
+
+    last = None
+    while True:
+        chunk = overdue
+        if last is not None:
+            _, _, due_at = last
+            chunk = chunk.filter(due_at__gte=due_at).filter(
+                Q(due_at__gt=due_at) | Q(due_at=due_at, pk__gt=last[0])
+            )
+        with write_transaction():
+            rows = list(chunk[:chunk_size])
+            if not rows:
+                return
+            if flag:
+                Loan.objects.filter(pk__in=[row[0] for row in rows]).update(overdue_flagged_at=now)
+        last = rows[-1]
+        yield rows
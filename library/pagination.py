@@ -0,0 +1,307 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q, QuerySet
+from django.template import loader
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Return the planner's row estimate for a queryset without counting it.
+
+    PostgreSQL reports the estimate for any query via ``EXPLAIN``. SQLite only
+    keeps whole-table statistics (``sqlite_stat1``, filled by ``ANALYZE``), so
+    it can only estimate unfiltered querysets. Returns None when no estimate
+    is available.
+    """
+    connection = connections[queryset.db]
+    query = queryset.order_by().query
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            sql, params = query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        if connection.vendor == 'sqlite' and not query.where:
+            try:
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+                    [queryset.model._meta.db_table],
+                )
+            except DatabaseError:
+                # sqlite_stat1 only exists once ANALYZE has been run.
+                return None
+            row = cursor.fetchone()
+            if row:
+                return int(row[0].split()[0])
+    return None
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination with opaque cursors.
+
+    Pages are fetched with ``WHERE (field, id) > (last_value, last_id)`` instead
+    of ``OFFSET``, so page 5000 costs the same as page 1, and no ``COUNT(*)``
+    is run. The ordering follows the view's ``OrderingFilter`` (falling back
+    to ``id``) with ``id`` appended as a tie-breaker, so non-unique fields such
+    as ``title`` still page deterministically. Pass ``?count=estimate`` to get
+    the planner's row estimate instead of an exact count.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    default_ordering = 'id'
+    invalid_cursor_message = _('Invalid cursor')
+    template = 'rest_framework/pagination/previous_and_next.html'
+
+    def paginate_queryset(self, queryset: QuerySet, request: Any, view: Any = None) -> List[Any]:
+        rows = self.seek(queryset, request, view)
+        if request.query_params.get(self.count_query_param) == 'estimate':
+            self.estimated_count = estimate_count(queryset)
+        return self.take(list(rows))
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Any, view: Any = None) -> List[Any]:
+        """
+        Async counterpart of :meth:`paginate_queryset`, for :mod:`library.async_views`.
+        """
+        rows = self.seek(queryset, request, view)
+        if request.query_params.get(self.count_query_param) == 'estimate':
+            self.estimated_count = await sync_to_async(estimate_count)(queryset)
+        return self.take([row async for row in rows])
+
+    def seek(self, queryset: QuerySet, request: Any, view: Any = None) -> QuerySet:
+        """
+        Return the rows of the requested page, plus one to tell whether another follows.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+        self.model_field = queryset.model._meta.get_field(self.field)
+        self.attname = self.model_field.attname
+        self.estimated_count = None
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor.get('r'))
+        queryset = queryset.order_by(*self._order_by(self.descending != self.reverse))
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self._seek(self.cursor['v'], self.cursor['id'], self.descending != self.reverse),
+            )
+        return queryset[:self.page_size + 1]
+
+    def take(self, results: List[Any]) -> List[Any]:
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+    def get_page_size(self, request: Any) -> int:
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True,
+                                 cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, request: Any, queryset: QuerySet, view: Any) -> Tuple[str, bool]:
+        """
+        Return the ``(field, descending)`` pair pages are keyed on.
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        field = (ordering or [self.default_ordering])[0]
+        descending = field.startswith('-')
+        field = field.lstrip('-')
+        try:
+            model_field = queryset.model._meta.get_field(field)
+        except FieldDoesNotExist:
+            return self.default_ordering, False
+        if model_field.null or model_field.many_to_many or model_field.one_to_many:
+            return self.default_ordering, False
+        return model_field.name, descending
+
+    def _order_by(self, descending: bool) -> Tuple[str, ...]:
+        prefix = '-' if descending else ''
+        if self.field == 'id':
+            return (f'{prefix}id',)
+        return (f'{prefix}{self.attname}', f'{prefix}id')
+
+    def _seek(self, value: Any, pk: int, descending: bool) -> Q:
+        op = 'lt' if descending else 'gt'
+        if self.field == 'id':
+            return Q(**{f'id__{op}': pk})
+        return Q(**{f'{self.attname}__{op}': value}) | Q(**{self.attname: value, f'id__{op}': pk})
+
+    def encode_cursor(self, instance: Any, reverse: bool) -> str:
+        value = getattr(instance, self.attname)
+        if isinstance(value, date):
+            value = value.isoformat()
+        token = {'o': self.field, 'd': self.descending, 'v': value, 'id': instance.pk}
+        if reverse:
+            token['r'] = 1
+        payload = json.dumps(token, separators=(',', ':')).encode()
+        encoded = urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request: Any) -> Optional[dict]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            token = json.loads(urlsafe_b64decode(padded.encode('ascii')))
+            valid = (
+                isinstance(token, dict) and isinstance(token.get('id'), int) and 'v' in token
+                and token.get('o') == self.field and token.get('d') == self.descending
+            )
+            if valid:
+                # The value goes into the seek filter: it must be one the field can hold
+                token['v'] = self.model_field.to_python(token['v'])
+                valid = token['v'] is not None
+        except (TypeError, ValueError, ValidationError):
+            valid = False
+        if not valid:
+            # A cursor minted for another ordering would silently skip rows.
+            raise NotFound(self.invalid_cursor_message)
+        return token
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_data(self, data: Any) -> Dict[str, Any]:
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.request.query_params.get(self.count_query_param) == 'estimate':
+            payload = {'estimated_count': self.estimated_count, **payload}
+        return payload
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'estimated_count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def to_html(self) -> str:
+        template = loader.get_template(self.template)
+        return template.render({'previous_url': self.get_previous_link(), 'next_url': self.get_next_link()})
+
+
+class LibraryPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset mode.
+
+    Requests carry on using ``?page=N`` by default. Passing ``?pagination=cursor``
+    (or following a ``cursor`` link) switches to :class:`KeysetPagination`.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+    keyset = None
+
+    def use_keyset(self, request: Any) -> bool:
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.keyset_class.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset: QuerySet, request: Any, view: Any = None) -> Optional[List[Any]]:
+        if not self.use_keyset(request):
+            self.keyset = None
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = self.keyset_class()
+        page = self.keyset.paginate_queryset(queryset, request, view)
+        self.display_page_controls = self.keyset.display_page_controls
+        return page
+
+    def get_paginated_response(self, data: Any) -> Response:
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self) -> str:
+        if self.keyset is not None:
+            return self.keyset.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view: Any) -> List[dict]:
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to "cursor" to use keyset pagination.',
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+            {
+                'name': self.keyset_class.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor from a previous keyset page.',
+                'schema': {'type': 'string'},
+            },
+        ]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for the admin's changelists that never counts more than
+    ``exact_count_limit`` rows.
+
+    Up to that many matching rows the count is exact. Past it, the
+    planner's estimate is used instead (see :func:`estimate_count`), or the
+    limit itself when no estimate is available, so a changelist over
+    millions of rows does not scan them all just to number its pages.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list.order_by()
+        counted = queryset[:self.exact_count_limit + 1].count()
+        if counted <= self.exact_count_limit:
+            return counted
+        return max(estimate_count(queryset) or 0, counted)
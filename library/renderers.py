@@ -0,0 +1,57 @@
+from typing import Any, Dict, Mapping, Optional
+
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # optional, see TimedJSONRenderer
+    orjson = None
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    JSON renderer that reports its time as ``serialize`` in ``Server-Timing``.
+
+    Encodes with orjson when it is installed, several times faster than the
+    standard library on long lists. The output is the same compact JSON:
+    values orjson does not handle the same way (dates, decimals, lazy
+    strings, ...) go through DRF's encoder, and indented output (e.g.
+    ``Accept: application/json; indent=4``) always does.
+    """
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None,
+               renderer_context: Optional[Mapping[str, Any]] = None) -> bytes:
+        with timed('serialize'):
+            if orjson is not None and data is not None and self._orjson_compatible(
+                accepted_media_type, renderer_context or {},
+            ):
+                try:
+                    return self._render_orjson(data)
+                except TypeError:
+                    pass
+            return super().render(data, accepted_media_type, renderer_context)
+
+    def _orjson_compatible(self, accepted_media_type: Optional[str], renderer_context: Mapping[str, Any]) -> bool:
+        # orjson only writes compact, non-ASCII-escaped JSON
+        return self.compact and not self.ensure_ascii and self.get_indent(accepted_media_type, renderer_context) is None
+
+    def _render_orjson(self, data: Any) -> bytes:
+        rendered = orjson.dumps(
+            data, default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Same escaping as JSONRenderer, for embedding in <script> tags
+        if b'\xe2\x80\xa8' in rendered or b'\xe2\x80\xa9' in rendered:
+            rendered = rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return rendered
+
+
+def json_response(data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+    """
+    Render ``data`` like the API's JSON renderer for views that do not go through DRF.
+    """
+    return HttpResponse(TimedJSONRenderer().render(data), status=status, headers=headers,
+                        content_type='application/json')
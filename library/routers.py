@@ -0,0 +1,183 @@
+"""
+Read replica routing.
+
+Reads go to one of ``settings.LIBRARY_READ_REPLICAS`` and writes to the
+primary (``default``). Each request reads from a single replica, picked at
+random when it starts, so its queries see one consistent state. A read
+stays on the primary when any of these hold:
+
+- it runs inside a transaction on the primary (``select_for_update`` and
+  friends must see the rows they lock);
+- it is part of a request with an unsafe method (see
+  :class:`library.middleware.ReplicaRoutingMiddleware`);
+- the requesting user wrote something, e.g. borrowed or returned a book,
+  less than ``settings.LIBRARY_REPLICA_STICKY_SECONDS`` ago, so they read
+  their own writes while the replicas catch up;
+- it is wrapped in :func:`use_primary`.
+
+Without replicas configured the router leaves every query on ``default``.
+With them, the cache must be shared between the workers (see
+:func:`check_shared_cache`): a user's next request may reach another one.
+"""
+import random
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, ContextManager, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+STICKY_KEY = 'library:replica:sticky:{pk}'
+
+_use_primary: ContextVar[bool] = ContextVar('library_use_primary', default=False)
+_replica: ContextVar[Optional[str]] = ContextVar('library_replica', default=None)
+
+
+def replicas() -> List[str]:
+    return getattr(settings, 'LIBRARY_READ_REPLICAS', [])
+
+
+def check_shared_cache() -> None:
+    """
+    Refuse read replicas with a cache local to each process.
+
+    Users who wrote are pinned to the primary through the cache; in local
+    memory only the worker that served the write would know, and the user's
+    next request on another worker would read from a lagging replica.
+
+    Raises:
+        ImproperlyConfigured: Replicas are configured and the cache is local memory or a dummy.
+    """
+    from .caching import get_cache
+
+    if replicas() and isinstance(get_cache(), (DummyCache, LocMemCache)):
+        raise ImproperlyConfigured(
+            'DATABASE_REPLICA_URLS needs a cache shared by every worker to keep writers on the primary; '
+            'set REDIS_URL.'
+        )
+
+
+def _sticky_seconds() -> int:
+    return getattr(settings, 'LIBRARY_REPLICA_STICKY_SECONDS', 5)
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    """
+    Send the reads made inside the block to the primary.
+    """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def read_primary(value: bool = True) -> Any:
+    """
+    Send the rest of the current context's reads to the primary (or not).
+
+    Returns a token for ``reset_primary``; the routing middleware resets it
+    when the request ends.
+    """
+    return _use_primary.set(value)
+
+
+def reset_primary(token: Any) -> None:
+    _use_primary.reset(token)
+
+
+def choose_replica() -> Any:
+    """
+    Pick the replica serving the rest of the current context's reads.
+
+    Returns a token for ``reset_replica``; the routing middleware picks one
+    per request and resets it when the request ends.
+    """
+    aliases = replicas()
+    return _replica.set(random.choice(aliases) if aliases else None)
+
+
+def reset_replica(token: Any) -> None:
+    _replica.reset(token)
+
+
+def pin_user(pk: Any) -> None:
+    """
+    Serve the user's reads from the primary for the next ``LIBRARY_REPLICA_STICKY_SECONDS``.
+    """
+    if replicas():
+        from .caching import get_cache
+
+        get_cache().set(STICKY_KEY.format(pk=pk), True, timeout=_sticky_seconds())
+
+
+def user_is_pinned(pk: Any) -> bool:
+    if not replicas():
+        return False
+    from .caching import get_cache
+
+    return bool(get_cache().get(STICKY_KEY.format(pk=pk)))
+
+
+async def auser_is_pinned(pk: Any) -> bool:
+    if not replicas():
+        return False
+    from .caching import get_cache
+
+    return bool(await get_cache().aget(STICKY_KEY.format(pk=pk)))
+
+
+def fresh_reads(changed_at: Optional[float]) -> ContextManager[None]:
+    """
+    Read from the primary if data changed (at ``changed_at``, a Unix time)
+    too recently for the replicas to be sure to have it.
+
+    For building cache entries: one built from a lagging replica would
+    otherwise be served until the next change.
+    """
+    if replicas() and changed_at is not None and time.time() - changed_at < _sticky_seconds():
+        return use_primary()
+    return nullcontext()
+
+
+class ReplicaRouter:
+    """
+    Database router sending reads to the replicas and writes to the primary.
+    """
+
+    def db_for_read(self, model: Any, **hints: Any) -> Optional[str]:
+        aliases = replicas()
+        if not aliases or _use_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in aliases:
+            # Follow relations on the replica the instance was read from
+            return instance._state.db
+        alias = _replica.get()
+        if alias not in aliases:
+            # Outside a request, e.g. in a management command: keep to one replica too
+            alias = random.choice(aliases)
+            _replica.set(alias)
+        return alias
+
+    def db_for_write(self, model: Any, **hints: Any) -> Optional[str]:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Any, obj2: Any, **hints: Any) -> Optional[bool]:
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None,
+                      **hints: Any) -> Optional[bool]:
+        # Replicas get their schema from the primary
+        if db in replicas():
+            return False
+        return None
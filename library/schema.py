@@ -0,0 +1,174 @@
+"""
+The OpenAPI document, generated once and served as a static artifact.
+
+drf_yasg builds the schema by walking every view and serializer, and
+importing it costs API workers about 100ms at startup. Instead the document
+is written to ``settings.LIBRARY_OPENAPI_DIR`` by ``manage.py
+generate_openapi`` (or by the first request for it) and served from there.
+The file is named after a fingerprint of the URL configuration and the
+source of the packages its API views come from, so a deploy that changes
+either one gets a new document without anyone having to regenerate it.
+
+Views declare their schema overrides with :func:`swagger_auto_schema` and
+:class:`openapi` from this module. Both only record the overrides, and
+drf_yasg is imported only when the document has to be generated.
+"""
+import hashlib
+import os
+from functools import lru_cache
+from importlib import import_module
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+from django.conf import settings
+from django.urls import URLPattern, URLResolver, get_resolver
+
+
+TITLE = 'Library API'
+DEFAULT_VERSION = 'v1'
+DESCRIPTION = 'API for Library Management System'
+
+# (view method, overrides) waiting to be handed to drf_yasg
+_pending: List[Tuple[Callable, Dict[str, Any]]] = []
+
+
+class LazyParameter:
+    """
+    Arguments for a ``drf_yasg.openapi.Parameter``, created when the schema is generated.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.args = args
+        self.kwargs = kwargs
+
+    def resolve(self) -> Any:
+        from drf_yasg import openapi as yasg_openapi
+
+        return yasg_openapi.Parameter(*self.args, **self.kwargs)
+
+
+class openapi:
+    """
+    The parts of ``drf_yasg.openapi`` the views use, without importing it.
+    """
+    IN_QUERY = 'query'
+    TYPE_STRING = 'string'
+    TYPE_INTEGER = 'integer'
+    TYPE_BOOLEAN = 'boolean'
+    Parameter = LazyParameter
+
+
+def swagger_auto_schema(**overrides: Any) -> Callable[[Callable], Callable]:
+    """
+    Record ``drf_yasg.utils.swagger_auto_schema`` overrides for a view method.
+
+    They are applied when the schema is generated. Like drf_yasg's decorator,
+    it goes above ``@action``.
+    """
+    def decorator(view_method: Callable) -> Callable:
+        _pending.append((view_method, overrides))
+        return view_method
+    return decorator
+
+
+def _apply_overrides() -> None:
+    from drf_yasg.utils import swagger_auto_schema as apply
+
+    while _pending:
+        view_method, overrides = _pending.pop(0)
+        if 'manual_parameters' in overrides:
+            overrides = {**overrides, 'manual_parameters': [
+                parameter.resolve() if isinstance(parameter, LazyParameter) else parameter
+                for parameter in overrides['manual_parameters']
+            ]}
+        apply(**overrides)(view_method)
+
+
+def _api_routes(patterns: List[Any], prefix: str = '') -> Iterator[Tuple[str, Any]]:
+    # (route, callback) of every DRF view in the URL configuration
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from _api_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern) and hasattr(pattern.callback, 'cls'):
+            yield route, pattern.callback
+
+
+@lru_cache(maxsize=None)
+def urlconf_fingerprint() -> str:
+    """
+    Fingerprint the inputs of the schema: the API routes, the views behind
+    them and the source files of the packages defining those views.
+
+    Files are compared by size and modification time, not read.
+    """
+    digest = hashlib.sha1(f"{version('drf-yasg')}|{settings.ROOT_URLCONF}".encode())
+    # The project package holds the settings, which shape the schema too
+    packages = {settings.ROOT_URLCONF.partition('.')[0]}
+    for route, callback in _api_routes(get_resolver().url_patterns):
+        view = callback.cls
+        actions = sorted(getattr(callback, 'actions', None) or {})
+        digest.update(f'{route} {view.__module__}.{view.__qualname__} {actions}\n'.encode())
+        packages.add(view.__module__.partition('.')[0])
+    for package in sorted(packages):
+        for source in sorted(Path(import_module(package).__file__).parent.rglob('*.py')):
+            stat = source.stat()
+            digest.update(f'{source} {stat.st_size} {stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()[:16]
+
+
+def artifact_path() -> Path:
+    return Path(settings.LIBRARY_OPENAPI_DIR) / f'openapi-{urlconf_fingerprint()}.json'
+
+
+def generate() -> bytes:
+    """
+    Generate the OpenAPI document with drf_yasg, as JSON.
+    """
+    _apply_overrides()
+    from drf_yasg import openapi as yasg_openapi
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    generator = OpenAPISchemaGenerator(
+        yasg_openapi.Info(title=TITLE, default_version=DEFAULT_VERSION, description=DESCRIPTION),
+    )
+    return OpenAPICodecJson(validators=[]).encode(generator.get_schema(request=None, public=True))
+
+
+def write_artifact() -> Path:
+    """
+    Generate the document into :func:`artifact_path` and delete the ones
+    left by earlier URL configurations.
+    """
+    path = artifact_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written aside and moved into place, so other workers never read half a file
+    partial = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    partial.write_bytes(generate())
+    os.replace(partial, path)
+    for stale in path.parent.glob('openapi-*.json'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
+
+
+class Document(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: int
+
+
+@lru_cache(maxsize=None)
+def document() -> Document:
+    """
+    Return the OpenAPI document, generating it if no worker has yet for the
+    current URL configuration.
+    """
+    path = artifact_path()
+    try:
+        body = path.read_bytes()
+    except FileNotFoundError:
+        body = write_artifact().read_bytes()
+    return Document(body, f'"{hashlib.sha1(body).hexdigest()[:32]}"', int(path.stat().st_mtime))
@@ -1,7 +1,105 @@
 from rest_framework import serializers
-from .models import Book, Loan, User
+from rest_framework import ISO_8601
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+from .models import Book, Loan, LoanHistory, User
+from .services import CopiesOnLoan, set_total_copies
 from django.contrib.auth.password_validation import validate_password
-from typing import Any, Dict
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+BULK_MAX_ITEMS = 100
+CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 5000
+
+# Serializer fields whose output is the model value itself
+_PASSTHROUGH_FIELDS = (serializers.CharField, serializers.EmailField, serializers.IntegerField,
+                       serializers.BooleanField)
+
+
+def _datetime_converter(field: serializers.DateTimeField) -> Callable[[Any], Any]:
+    # DateTimeField.to_representation looks the current timezone up for every
+    # value; resolve it once per list for the default ISO 8601 output instead.
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value: Any) -> Any:
+        if not isinstance(value, datetime) or value.utcoffset() is None:
+            return field.to_representation(value)
+        text = value.astimezone(field_timezone).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+    return convert
+
+
+class FastListSerializer(serializers.ListSerializer):
+    """
+    List serializer for read-only output of plain model fields.
+
+    Reads each row's attributes directly instead of going through every
+    field's ``get_attribute``/``to_representation`` pair: text, integer and
+    boolean values are passed through, foreign keys are read from their
+    ``<name>_id`` column (what ``PrimaryKeyRelatedField`` outputs), datetimes
+    are converted to the request's timezone once looked up, and only other
+    fields are converted by their serializer field. Falls
+    back to DRF's per-field path when a field is anything else.
+    """
+
+    def _readers(self) -> Optional[List[Tuple[str, str, Optional[Callable[[Any], Any]]]]]:
+        model = self.child.Meta.model
+        readers = []
+        for field in self.child._readable_fields:
+            if '.' in field.source or field.source == '*':
+                return None
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if isinstance(field, PrimaryKeyRelatedField):
+                if field.pk_field is not None:
+                    return None
+                readers.append((field.field_name, model_field.attname, None))
+            elif type(field) in _PASSTHROUGH_FIELDS:
+                readers.append((field.field_name, model_field.attname, None))
+            elif type(field) is serializers.DateTimeField:
+                readers.append((field.field_name, model_field.attname, _datetime_converter(field)))
+            elif isinstance(field, serializers.RelatedField) or not model_field.concrete:
+                return None
+            else:
+                readers.append((field.field_name, model_field.attname, field.to_representation))
+        return readers
+
+    def to_representation(self, data: Any) -> List[Dict[str, Any]]:
+        readers = self._readers()
+        if readers is None:
+            return super().to_representation(data)
+        rows = data.all() if isinstance(data, models.manager.BaseManager) else data
+        output = []
+        for row in rows:
+            item = {}
+            for name, attname, convert in readers:
+                value = getattr(row, attname)
+                item[name] = value if convert is None or value is None else convert(value)
+            output.append(item)
+        return output
+
+
+class SparseFieldsMixin:
+    """
+    Output only the field names in ``context['fields']`` (see ``library.fieldsets``), when given.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        names = self.context.get('fields')
+        if names:
+            for name in set(self.fields) - set(names):
+                self.fields.pop(name)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -46,25 +144,98 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Book model.
 
-    Serializes all fields of the Book model.
+    Serializes all fields of the Book model (or those in ``?fields=``). ``available`` and
+    ``available_copies`` follow borrows and returns; a new book starts with
+    all of its ``total_copies`` on the shelf.
     """
     class Meta:
         model = Book
         fields = '__all__'
+        read_only_fields = ['available_copies', 'available']
+        list_serializer_class = FastListSerializer
+
+    def create(self, validated_data: Dict[str, Any]) -> Book:
+        validated_data['available_copies'] = validated_data.get('total_copies', 1)
+        return super().create(validated_data)
+
+    def update(self, instance: Book, validated_data: Dict[str, Any]) -> Book:
+        if 'total_copies' in validated_data:
+            try:
+                set_total_copies(instance, validated_data.pop('total_copies'))
+            except CopiesOnLoan as exc:
+                raise serializers.ValidationError({'total_copies': [str(exc)]})
+        return super().update(instance, validated_data)
+
+
+class BookImportSerializer(serializers.ModelSerializer):
+    """
+    Serializer validating catalog feed rows for the ``import_books`` command.
+
+    Applies the same field rules as BookSerializer, except that ISBN uniqueness
+    is not checked per row: imports upsert on ISBN instead.
+    """
+    class Meta:
+        model = Book
+        fields = ('title', 'author', 'isbn', 'page_count')
+        extra_kwargs = {'isbn': {'validators': []}}
 
 
-class LoanSerializer(serializers.ModelSerializer):
+class LoanSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Loan model.
 
-    Serializes all fields of the Loan model.
+    Serializes all fields of the Loan model (or those in ``?fields=``).
     """
     class Meta:
         model = Loan
         fields = '__all__'
-        read_only_fields = ['user', 'borrowed_at', 'returned_at']
+        read_only_fields = ['user', 'borrowed_at', 'due_at', 'returned_at', 'overdue_flagged_at']
+        list_serializer_class = FastListSerializer
 
+
+class LoanHistorySerializer(LoanSerializer):
+    """
+    Serializer for loan history rows; same output as LoanSerializer.
+    """
+    class Meta(LoanSerializer.Meta):
+        model = LoanHistory
+
+
+class BulkBorrowSerializer(serializers.Serializer):
+    """
+    Serializer for borrowing several books at once.
+
+    Accepts a list of book ids, e.g. everything scanned at a self-checkout kiosk.
+    """
+    books = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=BULK_MAX_ITEMS,
+        help_text="Ids of the books to borrow."
+    )
+
+
+class BulkReturnSerializer(serializers.Serializer):
+    """
+    Serializer for returning several loans at once.
+    """
+    loans = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=BULK_MAX_ITEMS,
+        help_text="Ids of the loans to return."
+    )
+
+
+class ChangeFeedSerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of the change feed.
+    """
+    since = serializers.IntegerField(min_value=0, default=0,
+                                     help_text="Last sequence number already seen; 0 for every change.")
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_CHANGES_PAGE_SIZE, default=CHANGES_PAGE_SIZE,
+                                     help_text="Changes read per page.")
@@ -0,0 +1,268 @@
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .caching import invalidate_books
+from .models import Book, Loan, User, due_date
+
+
+BOOK_NOT_AVAILABLE = "Book is not available for borrowing."
+LOAN_NOT_FOUND = "Loan not found or already returned"
+BOOK_NOT_FOUND = "Book not found."
+DUPLICATE_ITEM = "Duplicate item in request."
+COPIES_ON_LOAN = "Cannot have fewer copies than are out on loan."
+
+
+class BookNotAvailable(Exception):
+    """
+    Raised when a borrow loses the race for a book or the book is already out.
+    """
+
+
+class LoanNotFound(Exception):
+    """
+    Raised when a loan does not exist, belongs to someone else or is already returned.
+    """
+
+
+class ConcurrentUpdate(Exception):
+    """
+    Raised when rows changed between locking and updating them; the batch is rolled back.
+    """
+
+
+class CopiesOnLoan(Exception):
+    """
+    Raised when lowering ``total_copies`` below the number of copies out on loan.
+    """
+
+
+@contextmanager
+def write_transaction(using: str = DEFAULT_DB_ALIAS) -> Iterator[None]:
+    """
+    ``transaction.atomic()`` for a transaction that reads before it writes.
+
+    In SQLite production mode the outermost one begins with ``BEGIN
+    IMMEDIATE``, taking the write lock up front. Under a plain ``BEGIN`` the
+    upgrade from reading to writing fails on the spot, without waiting out the
+    busy timeout, when another process holds the lock. Read-only transactions
+    keep the plain ``BEGIN`` and never queue for the lock.
+    """
+    connection = connections[using]
+    if (not settings.SQLITE_PRODUCTION_MODE or connection.vendor != 'sqlite'
+            or connection.in_atomic_block):
+        with transaction.atomic(using=using):
+            yield
+        return
+    # transaction_mode is read from the settings when connecting
+    connection.ensure_connection()
+    mode = connection.transaction_mode
+    connection.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            connection.transaction_mode = mode
+            yield
+    finally:
+        connection.transaction_mode = mode
+
+
+def _loan_dates() -> Dict[str, Any]:
+    borrowed_at = timezone.now()
+    return {'borrowed_at': borrowed_at, 'due_at': due_date(borrowed_at)}
+
+
+def _lend_copy() -> Dict[str, Any]:
+    # Update values taking one copy off the shelf; ``available`` is computed
+    # from the pre-update count, so the last copy flips it to False.
+    return {
+        'available_copies': F('available_copies') - 1,
+        'available': Case(When(available_copies__gt=1, then=Value(True)), default=Value(False)),
+    }
+
+
+def set_total_copies(book: Book, total: int) -> None:
+    """
+    Change how many copies of a book the library owns.
+
+    Copies on the shelf move by the same amount, in one conditional update
+    that fails rather than let ``available_copies`` go below zero.
+
+    Args:
+        book: The book; its inventory fields are refreshed afterwards.
+        total: The new number of copies.
+
+    Raises:
+        CopiesOnLoan: If more than ``total`` copies are out on loan.
+    """
+    removed = F('total_copies') - total
+    with write_transaction():
+        changed = Book.objects.filter(pk=book.pk, available_copies__gte=removed).update(
+            total_copies=total,
+            available_copies=F('available_copies') - removed,
+            available=Case(When(available_copies__gt=removed, then=Value(True)), default=Value(False)),
+        )
+        if not changed:
+            raise CopiesOnLoan(COPIES_ON_LOAN)
+        invalidate_books([book.pk])
+    book.refresh_from_db(fields=Book.INVENTORY_FIELDS)
+
+
+def borrow_book(user: User, book: Book) -> Loan:
+    """
+    Lend a book to a user.
+
+    The availability check and taking a copy off the shelf are a single
+    conditional ``UPDATE ... WHERE available_copies > 0``, so concurrent
+    borrows can never lend more copies than there are, and the loan is
+    written in the same transaction, due ``LIBRARY_LOAN_PERIOD_DAYS`` later.
+
+    Args:
+        user: The borrower.
+        book: The book to borrow. Its in-memory inventory fields are not trusted.
+
+    Returns:
+        Loan: The newly created loan.
+
+    Raises:
+        BookNotAvailable: If the book is not available.
+    """
+    with write_transaction():
+        claimed = Book.objects.filter(pk=book.pk, available_copies__gt=0).update(**_lend_copy())
+        if not claimed:
+            raise BookNotAvailable(BOOK_NOT_AVAILABLE)
+        invalidate_books([book.pk])
+        return Loan.objects.create(user=user, book=book, **_loan_dates())
+
+
+def return_book(user: User, loan_id: int) -> None:
+    """
+    Mark a user's open loan as returned and put the copy back on the shelf.
+
+    Closing the loan is a conditional ``UPDATE ... WHERE returned_at IS NULL``,
+    so a loan can only be returned once even under concurrent requests.
+    The book id is looked up first so only that book's cached responses are
+    invalidated.
+
+    Args:
+        user: The user returning the book; must own the loan.
+        loan_id: Primary key of the loan.
+
+    Raises:
+        LoanNotFound: If there is no open loan with this id for this user.
+    """
+    with write_transaction():
+        open_loan = Loan.objects.filter(pk=loan_id, user=user, returned_at__isnull=True)
+        book_id = open_loan.values_list('book_id', flat=True).first()
+        if book_id is None or not open_loan.update(returned_at=timezone.now()):
+            raise LoanNotFound(LOAN_NOT_FOUND)
+        Book.objects.filter(pk=book_id, available_copies__lt=F('total_copies')).update(
+            available_copies=F('available_copies') + 1, available=True,
+        )
+        invalidate_books([book_id])
+
+
+def borrow_books(user: User, book_ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """
+    Lend several books to a user in one transaction with a fixed number of queries.
+
+    Applies the same rule as :func:`borrow_book` to every book: one copy of
+    each available book is lent. Books that are missing, have no copy on the
+    shelf or are repeated in the request are reported as failures without
+    affecting the others.
+
+    Args:
+        user: The borrower.
+        book_ids: Primary keys of the books, in request order.
+
+    Returns:
+        list: One ``{'book', 'status', 'loan' | 'error'}`` result per requested id.
+
+    Raises:
+        ConcurrentUpdate: If a locked book changed before it could be claimed.
+    """
+    book_ids = list(book_ids)
+    with write_transaction():
+        available = dict(
+            Book.objects.select_for_update().filter(pk__in=book_ids).values_list('pk', 'available_copies')
+        )
+        to_claim = [pk for pk in dict.fromkeys(book_ids) if available.get(pk)]
+        loans = {}
+        if to_claim:
+            claimed = Book.objects.filter(pk__in=to_claim, available_copies__gt=0).update(**_lend_copy())
+            if claimed != len(to_claim):
+                raise ConcurrentUpdate("Books changed while borrowing, please retry.")
+            dates = _loan_dates()
+            created = Loan.objects.bulk_create([Loan(user=user, book_id=pk, **dates) for pk in to_claim])
+            loans = {loan.book_id: loan.pk for loan in created}
+            invalidate_books(to_claim)
+
+    results, seen = [], set()
+    for pk in book_ids:
+        if pk in seen:
+            results.append({'book': pk, 'status': 'failed', 'error': DUPLICATE_ITEM})
+        elif pk in loans:
+            results.append({'book': pk, 'status': 'borrowed', 'loan': loans[pk]})
+        else:
+            error = BOOK_NOT_FOUND if pk not in available else BOOK_NOT_AVAILABLE
+            results.append({'book': pk, 'status': 'failed', 'error': error})
+        seen.add(pk)
+    return results
+
+
+def return_books(user: User, loan_ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """
+    Return several of a user's loans in one transaction with a fixed number of queries.
+
+    Applies the same rule as :func:`return_book` to every loan: only the
+    caller's open loans are closed; the rest are reported as failures.
+
+    Args:
+        user: The user returning the books; must own the loans.
+        loan_ids: Primary keys of the loans, in request order.
+
+    Returns:
+        list: One ``{'loan', 'status', 'error'?}`` result per requested id.
+
+    Raises:
+        ConcurrentUpdate: If a locked loan changed before it could be closed.
+    """
+    loan_ids = list(loan_ids)
+    with write_transaction():
+        open_loans = dict(
+            Loan.objects.select_for_update()
+            .filter(pk__in=loan_ids, user=user, returned_at__isnull=True)
+            .values_list('pk', 'book_id')
+        )
+        if open_loans:
+            closed = Loan.objects.filter(pk__in=list(open_loans), returned_at__isnull=True).update(
+                returned_at=timezone.now()
+            )
+            if closed != len(open_loans):
+                raise ConcurrentUpdate("Loans changed while returning, please retry.")
+            returned = Counter(open_loans.values())
+            # Capped like return_book, so inconsistent counters cannot break the check constraint
+            Book.objects.filter(pk__in=list(returned), available_copies__lt=F('total_copies')).update(
+                available_copies=Least(F('available_copies') + Case(
+                    *(When(pk=pk, then=Value(count)) for pk, count in returned.items() if count > 1),
+                    default=Value(1),
+                ), F('total_copies')),
+                available=True,
+            )
+            invalidate_books(list(returned))
+
+    results, seen = [], set()
+    for pk in loan_ids:
+        if pk in seen:
+            results.append({'loan': pk, 'status': 'failed', 'error': DUPLICATE_ITEM})
+        elif pk in open_loans:
+            results.append({'loan': pk, 'status': 'returned'})
+        else:
+            results.append({'loan': pk, 'status': 'failed', 'error': LOAN_NOT_FOUND})
+        seen.add(pk)
+    return results
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import autocomplete
+from .authentication import invalidate_user
+from .caching import invalidate_books
+from .models import Book, User
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender, instance: Book, **kwargs) -> None:
+    """
+    Drop cached book responses whenever a book is saved or deleted (API, admin or shell).
+
+    ``queryset.update()`` and ``bulk_create()`` bypass these signals; code using
+    them calls :func:`library.caching.invalidate_books` itself.
+    """
+    invalidate_books([instance.pk])
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance: Book, **kwargs) -> None:
+    """
+    Index a saved book's title and author for typeahead.
+    """
+    autocomplete.book_changed(instance.pk, instance.title, instance.author)
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance: Book, **kwargs) -> None:
+    autocomplete.book_changed(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance: User, **kwargs) -> None:
+    """
+    Drop a user from the authentication cache whenever it is saved or deleted,
+    so role, activation and password changes apply to the next request.
+    """
+    invalidate_user(instance.pk)
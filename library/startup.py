@@ -0,0 +1,183 @@
+"""
+Worker boot: a phase-by-phase profile of it and an optional warm-up.
+
+:func:`profile_boot` boots the project the way ``library_system.wsgi`` does,
+in a fresh interpreter started by ``manage.py startup_profile``. It times
+each phase and writes markers to stderr where phases begin and end, so the
+``-X importtime`` lines between them can be put down to the phase.
+
+:func:`warm_up` does the work a worker would otherwise do on its first
+requests. ``library_system.wsgi`` calls it when ``LIBRARY_WARMUP`` is set,
+so each gunicorn worker runs it before it accepts connections.
+
+Django is imported inside the functions: this module is imported before
+Django is set up, and importing it must not change what gets measured.
+"""
+import gc
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+
+PHASE_MARKER = 'startup-phase:'
+
+
+class _Phases:
+    """
+    Timings of nested boot phases, in the order they started.
+    """
+
+    def __init__(self) -> None:
+        self.rows: List[Dict[str, Any]] = []
+        self.depth = 0
+
+    def run(self, name: str, step: Callable[[], Any]) -> Any:
+        row = {'phase': name, 'depth': self.depth}
+        self.rows.append(row)
+        print(f'{PHASE_MARKER} begin {name}', file=sys.stderr, flush=True)
+        self.depth += 1
+        started = time.perf_counter()
+        try:
+            return step()
+        finally:
+            row['ms'] = (time.perf_counter() - started) * 1000
+            self.depth -= 1
+            print(f'{PHASE_MARKER} end', file=sys.stderr, flush=True)
+
+
+def _time_app_configs(phases: _Phases) -> None:
+    # Time each app's models import and ready() inside django.setup()
+    from django.apps.config import AppConfig
+
+    create = AppConfig.create.__func__
+
+    def timed_create(cls: type, entry: str) -> AppConfig:
+        app_config = create(cls, entry)
+        for step in ('import_models', 'ready'):
+            method = getattr(app_config, step)
+            name = f'{step} {app_config.label}'
+            setattr(app_config, step, lambda name=name, method=method: phases.run(name, method))
+        return app_config
+
+    AppConfig.create = classmethod(timed_create)
+
+
+def wsgi_get(application: Callable, path: str) -> int:
+    """
+    Send a GET of ``path`` through a WSGI application in-process and return the status code.
+    """
+    from wsgiref.util import setup_testing_defaults
+
+    path, _, query = path.partition('?')
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return int(statuses[0].split()[0])
+
+
+def profile_boot(warmup: bool = False, path: str = '/api/books/') -> None:
+    """
+    Boot like a WSGI worker, then serve one GET of ``path``, and print the
+    phase timings to stdout as JSON.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_system.settings')
+    phases = _Phases()
+    started = time.perf_counter()
+
+    def settings_module() -> None:
+        from django.conf import settings
+
+        settings.INSTALLED_APPS
+
+    phases.run('settings', settings_module)
+    phases.run('import django', lambda: __import__('django.core.handlers.wsgi'))
+    _time_app_configs(phases)
+
+    import django
+
+    phases.run('django.setup', django.setup)
+    from django.core.handlers.wsgi import WSGIHandler
+
+    application = phases.run('middleware', WSGIHandler)
+
+    def urlconf() -> None:
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+
+    phases.run('urlconf', urlconf)
+    if warmup:
+        phases.run('warm-up', warm_up)
+    boot_ms = (time.perf_counter() - started) * 1000
+    status = phases.run(f'first request {path}', lambda: wsgi_get(application, path))
+    print(json.dumps({'phases': phases.rows, 'boot_ms': boot_ms, 'status': status, 'warmup': warmup}))
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Prime the URL resolver, REST framework's settings, the serializers, the
+    database connections and the typeahead index, then collect and freeze the
+    heap. Returns each step's duration in ms.
+
+    The index takes time in proportion to the catalog to build; done here, no
+    search box request waits for it.
+
+    Connections opened here are closed before the process forks. This covers
+    ``gunicorn --preload``, where the arbiter runs this and then forks the workers.
+    """
+    from django.conf import settings
+    from django.db import connections
+    from django.urls import get_resolver, reverse
+    from rest_framework.settings import api_settings
+
+    from . import autocomplete
+    from .fieldsets import readable_fields
+    from .schema import _api_routes
+
+    timings: Dict[str, float] = {}
+
+    def step(name: str, work: Callable[[], Any]) -> None:
+        started = time.perf_counter()
+        work()
+        timings[name] = (time.perf_counter() - started) * 1000
+
+    def rest_framework_settings() -> None:
+        # The classes named in REST_FRAMEWORK are imported on first access otherwise
+        for name in api_settings.import_strings:
+            if name.startswith('DEFAULT_') and name != 'DEFAULT_SCHEMA_CLASS':
+                getattr(api_settings, name)
+
+    def serializers() -> None:
+        for _, callback in _api_routes(get_resolver().url_patterns):
+            serializer_class = getattr(callback.cls, 'serializer_class', None)
+            if serializer_class is not None:
+                readable_fields(serializer_class)
+
+    def databases() -> None:
+        for alias in settings.DATABASES:
+            connections[alias].ensure_connection()
+        os.register_at_fork(before=connections.close_all)
+
+    # reverse() fills the resolver's lookup tables
+    step('resolver', lambda: reverse('book-list'))
+    step('rest_framework', rest_framework_settings)
+    step('serializers', serializers)
+    step('databases', databases)
+    step('autocomplete', autocomplete.warm_up)
+
+    def garbage() -> None:
+        # Collect the warm-up's garbage now, not in a pause during the first
+        # requests, and have later collections skip everything loaded so far
+        gc.collect()
+        gc.freeze()
+
+    step('gc', garbage)
+    return timings
@@ -0,0 +1,12 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def clear_caches(settings):
+    # One process: local memory caches as well as a shared backend would
+    settings.LIBRARY_RESPONSE_CACHE = True
+    settings.LIBRARY_AUTH_CACHE_TIMEOUT = 60
+    for cache in caches.all():
+        cache.clear()
+    yield
@@ -0,0 +1,42 @@
+import re
+
+import pytest
+from django.db import connection
+
+
+# "SCAN t" on its own reads the table in rowid order; "SCAN t USING [COVERING]
+# INDEX" walks an index in order and "SCAN t VIRTUAL TABLE" is the full-text index.
+TABLE_SCAN = re.compile(r'\bSCAN (\w+)(?! USING (?:COVERING )?INDEX| VIRTUAL TABLE)\b')
+
+
+def _require_sqlite() -> None:
+    if connection.vendor != 'sqlite':
+        pytest.skip("query plan assertions are written against SQLite")
+
+
+def query_plan(queryset) -> str:
+    """Return the database's plan for a queryset (SQLite ``EXPLAIN QUERY PLAN``)."""
+    _require_sqlite()
+    return queryset.explain()
+
+
+def assert_uses_index(queryset, index_name: str) -> None:
+    """Fail unless the planner answers the queryset through ``index_name``."""
+    plan = query_plan(queryset)
+    assert f"INDEX {index_name}" in plan, plan
+
+
+def full_scans(sql: str) -> list:
+    """
+    Return the tables a raw SELECT would read in full.
+
+    An unfiltered rowid-order walk that feeds a ``LIMIT`` without sorting
+    (``ORDER BY id LIMIT n``) stops after a page of rows and is not counted.
+    """
+    _require_sqlite()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        plan = [row[-1] for row in cursor.fetchall()]
+    if ' WHERE ' not in sql and ' LIMIT ' in sql and not any('TEMP B-TREE' in line for line in plan):
+        return []
+    return [match.group(1) for line in plan for match in [TABLE_SCAN.search(line)] if match]
@@ -0,0 +1,97 @@
+import pytest
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from library.models import User, Book, Loan
+
+
+def _sync_url(url):
+    return url.replace("/api/async/", "/api/")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query", [
+    "", "?page=2", "?author=Tolkien&available=true", "?search=ring", "?ordering=-page_count,title",
+    "?search=ring&facets=true", "?fields=id,title&ordering=title",
+    "?pagination=cursor&ordering=-page_count&page_size=4", "?pagination=cursor&count=estimate",
+])
+def test_async_book_list_matches_the_drf_view(query):
+    for i in range(15):
+        Book.objects.create(title=f"Ring {i}" if i % 3 else f"Other {i}", author="Tolkien" if i % 2 else "Lewis",
+                            isbn=f"{2100000000000 + i}", page_count=100 + i % 4, available=i % 5 != 0)
+    client = APIClient()
+
+    expected = client.get(f"/api/books/{query}")
+    response = client.get(f"/api/async/books/{query}")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/json"
+    data = response.json()
+    for link in ("next", "previous"):
+        data[link] = data[link] and _sync_url(data[link])
+    assert data == expected.json()
+
+
+@pytest.mark.django_db
+def test_async_book_detail_is_cached_and_invalidated():
+    book = Book.objects.create(title="Async", author="Author", isbn="2100000000100", page_count=10)
+    client = APIClient()
+
+    first = client.get(f"/api/async/books/{book.id}/")
+    assert first.json() == client.get(f"/api/books/{book.id}/").json()
+    assert client.get(f"/api/async/books/{book.id}/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+
+    book.title = "Renamed"
+    book.save()
+    assert client.get(f"/api/async/books/{book.id}/").json()["title"] == "Renamed"
+    assert client.get("/api/async/books/999999/").status_code == 404
+    assert client.get("/api/async/books/?page=9").status_code == 404
+
+
+@pytest.mark.django_db
+def test_async_loan_list_authenticates_and_scopes():
+    owner = User.objects.create_user(username="owner", password="pass123")
+    other = User.objects.create_user(username="other", password="pass123")
+    book = Book.objects.create(title="Loaned", author="Author", isbn="2100000000200", page_count=10)
+    mine = Loan.objects.create(user=owner, book=book)
+    Loan.objects.create(user=other, book=book)
+    client = APIClient()
+
+    assert client.get("/api/async/loans/").status_code == 401
+    client.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+    assert client.get("/api/async/loans/").status_code == 401
+
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(owner).access_token}")
+    response = client.get("/api/async/loans/?status=active")
+    assert [loan["id"] for loan in response.json()["results"]] == [mine.id]
+    assert response.json() == client.get("/api/loans/?status=active").json()
+    assert "db;" in response["Server-Timing"]
+
+    # The user is now in the authentication cache; saving it evicts it
+    owner.is_active = False
+    owner.save()
+    assert client.get("/api/async/loans/").status_code == 401
+
+
+@pytest.mark.django_db
+def test_async_views_follow_keyset_cursors_like_the_drf_views():
+    owner = User.objects.create_user(username="pager", password="pass123")
+    for i in range(7):
+        book = Book.objects.create(title=f"Paged {i}", author="Author", isbn=f"{2100000000300 + i}",
+                                   page_count=10 + i % 3)
+        Loan.objects.create(user=owner, book=book)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(owner).access_token}")
+
+    for path in ("/api/async/books/?pagination=cursor&ordering=page_count&page_size=3",
+                 "/api/async/loans/?pagination=cursor&page_size=3"):
+        url, pages = path, 0
+        while url:
+            data = client.get(url).json()
+            expected = client.get(_sync_url(url)).json()
+            url = data["next"]
+            for link in ("next", "previous"):
+                data[link] = data[link] and _sync_url(data[link])
+            assert data == expected
+            pages += 1
+        assert pages == 3
+    assert client.get("/api/async/books/?cursor=not-a-cursor").status_code == 404
+    assert client.get("/api/async/loans/?cursor=not-a-cursor").status_code == 404
@@ -1,5 +1,10 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from library.authentication import USER_KEY
+from library.caching import get_cache
 from library.models import User
 
 @pytest.mark.django_db
@@ -84,3 +89,32 @@ def test_register_missing_fields():
     }, format='json')
     assert response.status_code == 400
     assert "username" in response.data
+
+
+@pytest.mark.django_db
+def test_authenticated_user_is_cached_until_saved():
+    user = User.objects.create_user(username="cached", password="pass123", is_admin=True)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+
+    def user_lookups():
+        with CaptureQueriesContext(connection) as queries:
+            status_code = client.get("/api/metrics/").status_code
+        return status_code, sum(1 for q in queries.captured_queries if 'FROM "library_user"' in q["sql"])
+
+    assert user_lookups() == (200, 1)
+    assert user_lookups() == (200, 0)
+    # Only what the API needs is cached, never the password hash
+    assert get_cache().get(USER_KEY.format(pk=user.pk)) == {
+        "id": user.pk, "username": "cached", "is_active": True, "is_staff": True, "is_superuser": True,
+        "is_admin": True,
+    }
+
+    # Losing admin rights applies to the very next request
+    user.is_admin = False
+    user.save()
+    assert user_lookups() == (403, 1)
+
+    user.is_active = False
+    user.save()
+    assert user_lookups()[0] == 401
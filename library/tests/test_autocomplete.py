@@ -0,0 +1,147 @@
+import random
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from library import autocomplete
+from library.autocomplete import PrefixIndex
+from library.models import Book
+
+WORDS = ["harry", "hobbit", "ring", "rings", "return", "king", "kings", "lord", "the", "émile", "zola"]
+
+
+def _suggestions(index, prefix, limit=5):
+    return [(s["text"], s["kind"], s["books"]) for s in index.complete(prefix, limit)]
+
+
+def test_prefix_index_ranks_leading_matches_then_book_counts():
+    index = PrefixIndex.build([
+        (1, "The Return of the King", "J. R. R. Tolkien"),
+        (2, "Kings of Summer", "Émile Zola"),
+        (3, "The Hobbit", "J. R. R. Tolkien"),
+        (4, "Kingdom", "Ann King"),
+    ])
+    assert _suggestions(index, "king") == [
+        ("Kingdom", "title", 1), ("Kings of Summer", "title", 1),
+        ("Ann King", "author", 1), ("The Return of the King", "title", 1),
+    ]
+    assert _suggestions(index, "J. R") == [("J. R. R. Tolkien", "author", 2)]
+    assert _suggestions(index, "emile z") == [("Émile Zola", "author", 1)]
+    assert _suggestions(index, "hob", limit=1) == [("The Hobbit", "title", 1)]
+    assert index.complete("xyz") == [] and index.complete("  ") == []
+    assert index.memory_usage()["books"] == 4
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_updates_match_a_rebuilt_index(monkeypatch, seed):
+    # A tiny threshold makes most prefixes "wide", exercising the pre-ranked lists
+    monkeypatch.setattr(autocomplete, "WIDE_PREFIX", 1)
+    rng = random.Random(seed)
+    books = {}
+    index = PrefixIndex.build([])
+    for step in range(200):
+        pk = rng.randint(1, 30)
+        if pk in books and rng.random() < 0.4:
+            del books[pk]
+            index.remove_book(pk)
+        else:
+            books[pk] = (" ".join(rng.sample(WORDS, 2)).title(), rng.choice(["Ann Lee", "Bo Li", "Cy Lo"]))
+            index.add_book(pk, *books[pk])
+        if step % 7 == 0:
+            rebuilt = PrefixIndex.build((pk, title, author) for pk, (title, author) in books.items())
+            for prefix in ["h", "r", "ri", "kin", "the", "l", "b", "e", "zo", "lo", "t"]:
+                assert _suggestions(index, prefix) == _suggestions(rebuilt, prefix), (step, prefix)
+
+
+@pytest.mark.django_db
+def test_autocomplete_endpoint_follows_book_changes(django_capture_on_commit_callbacks):
+    autocomplete.reset()
+    book = Book.objects.create(title="Harry Potter", author="J. K. Rowling", isbn="2300000000001", page_count=300)
+    client = APIClient()
+
+    response = client.get("/api/books/autocomplete/", {"q": "pot"})
+    assert response.status_code == 200
+    assert response.data == {"query": "pot", "results": [{"text": "Harry Potter", "kind": "title", "books": 1}]}
+    with CaptureQueriesContext(connection) as queries:
+        client.get("/api/books/autocomplete/", {"q": "har", "limit": "oops"})
+    assert len(queries) == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        book.title = "Hard Times"
+        book.save()
+    with CaptureQueriesContext(connection) as queries:
+        results = client.get("/api/books/autocomplete/", {"q": "har"}).data["results"]
+    assert len(queries) == 0  # updated in place, not rebuilt
+    assert [r["text"] for r in results] == ["Hard Times"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        book.delete()
+    assert client.get("/api/books/autocomplete/", {"q": "har"}).data["results"] == []
+
+
+class _RecordedThread:
+    started = []
+
+    def __init__(self, target, **kwargs):
+        self.target = target
+
+    def start(self):
+        self.started.append(self.target)
+
+
+@pytest.mark.django_db
+def test_other_processes_catch_up_from_the_change_feed_and_rebuild_in_the_background(monkeypatch, settings):
+    autocomplete.reset()
+    Book.objects.create(title="Harry Potter", author="J. K. Rowling", isbn="2300000000002", page_count=300)
+    assert [s["text"] for s in autocomplete.suggest("har")] == ["Harry Potter"]
+    builds = autocomplete.autocomplete_stats()["builds"]
+
+    # Writes another process made, which bypass the signals
+    Book.objects.bulk_create([Book(title="Hard Times", author="Charles Dickens", isbn="2300000000003",
+                                   page_count=200)])
+    Book.objects.filter(title="Harry Potter").update(title="Harriet")
+    autocomplete.invalidate()
+    with CaptureQueriesContext(connection) as queries:
+        assert [s["text"] for s in autocomplete.suggest("har")] == ["Hard Times", "Harriet"]
+    assert len(queries) == 2  # the new changes and their books, not the whole catalog
+    assert autocomplete.autocomplete_stats()["builds"] == builds
+
+    # A stale index, or too many changes at once, is rebuilt off the request path
+    _RecordedThread.started = []
+    monkeypatch.setattr(autocomplete.threading, "Thread", _RecordedThread)
+    monkeypatch.setattr(autocomplete, "MAX_CHANGES_APPLIED", 1)
+    Book.objects.filter(title="Harriet").update(title="Harriet Again")
+    Book.objects.filter(title="Hard Times").update(title="Hard Cash")
+    autocomplete.invalidate()
+    assert [s["text"] for s in autocomplete.suggest("har")] == ["Hard Times", "Harriet"]
+    settings.LIBRARY_AUTOCOMPLETE_MAX_AGE = 0
+    autocomplete.suggest("har")
+    assert len(_RecordedThread.started) == 1 and autocomplete.autocomplete_stats()["rebuilding"]
+
+    autocomplete._rebuild()
+    stats = autocomplete.autocomplete_stats()
+    assert stats["builds"] == builds + 1 and not stats["rebuilding"]
+    assert [s["text"] for s in autocomplete.suggest("har")] == ["Hard Cash", "Harriet Again"]
+
+
+@pytest.mark.django_db
+def test_builds_and_change_feed_queries_never_hold_the_lookup_lock(monkeypatch):
+    autocomplete.reset()
+    Book.objects.create(title="Harry Potter", author="J. K. Rowling", isbn="2300000000004", page_count=300)
+    held = []
+    for name in ("_build", "_changed_books"):
+        original = getattr(autocomplete, name)
+
+        def recorded(*args, original=original):
+            held.append(autocomplete._lock.locked())
+            return original(*args)
+
+        monkeypatch.setattr(autocomplete, name, recorded)
+
+    autocomplete.suggest("har")
+    Book.objects.filter(title="Harry Potter").update(title="Harriet")
+    autocomplete.invalidate()
+    assert [s["text"] for s in autocomplete.suggest("har")] == ["Harriet"]
+    autocomplete._rebuild()
+    assert len(held) == 5 and not any(held)
@@ -0,0 +1,98 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from library.models import User, Book, Loan
+
+
+def _books(count, available=True):
+    return [
+        Book.objects.create(title=f"Bulk {i}", author="Author", isbn=f"{1200000000000 + i}",
+                            page_count=100, available=available)
+        for i in range(count)
+    ]
+
+
+def _statements(queries):
+    return [q["sql"] for q in queries.captured_queries if "SAVEPOINT" not in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_bulk_borrow_reports_per_item_results():
+    user = User.objects.create_user(username="kiosk", password="pass123")
+    free = _books(2)
+    taken = Book.objects.create(title="Taken", author="Author", isbn="1299999999999", page_count=10,
+                                available=False)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    ids = [free[0].id, taken.id, 999999, free[1].id, free[0].id]
+    response = client.post("/api/loans/bulk/", {"books": ids}, format='json')
+    assert response.status_code == 200
+    assert response.data["borrowed"] == 2
+    assert response.data["failed"] == 3
+    statuses = [(r["book"], r["status"], r.get("error")) for r in response.data["results"]]
+    assert statuses == [
+        (free[0].id, "borrowed", None),
+        (taken.id, "failed", "Book is not available for borrowing."),
+        (999999, "failed", "Book not found."),
+        (free[1].id, "borrowed", None),
+        (free[0].id, "failed", "Duplicate item in request."),
+    ]
+    assert Loan.objects.filter(user=user, book__in=free).count() == 2
+    assert not Book.objects.filter(pk__in=[b.id for b in free], available=True).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_return_only_closes_own_open_loans():
+    owner = User.objects.create_user(username="owner", password="pass123")
+    other = User.objects.create_user(username="other", password="pass123")
+    books = _books(3)
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    loans = [r["loan"] for r in client.post("/api/loans/bulk/", {"books": [b.id for b in books]},
+                                            format='json').data["results"]]
+
+    client.force_authenticate(user=other)
+    response = client.post("/api/return/bulk/", {"loans": loans}, format='json')
+    assert response.data["returned"] == 0
+
+    client.force_authenticate(user=owner)
+    response = client.post("/api/return/bulk/", {"loans": loans[:2]}, format='json')
+    assert response.status_code == 200
+    assert response.data["returned"] == 2
+    assert Book.objects.filter(available=True).count() == 2
+
+    response = client.post("/api/return/bulk/", {"loans": loans}, format='json')
+    assert [r["status"] for r in response.data["results"]] == ["failed", "failed", "returned"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("count", [1, 20])
+def test_bulk_endpoints_use_a_fixed_number_of_queries(count):
+    user = User.objects.create_user(username="fixed", password="pass123")
+    books = _books(count)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post("/api/loans/bulk/", {"books": [b.id for b in books]}, format='json')
+    assert len(_statements(queries)) == 3
+
+    loans = [r["loan"] for r in response.data["results"]]
+    with CaptureQueriesContext(connection) as queries:
+        client.post("/api/return/bulk/", {"loans": loans}, format='json')
+    assert len(_statements(queries)) == 3
+
+
+@pytest.mark.django_db
+def test_bulk_endpoints_validate_input():
+    user = User.objects.create_user(username="validator", password="pass123")
+    client = APIClient()
+
+    assert client.post("/api/loans/bulk/", {"books": [1]}, format='json').status_code in [401, 403]
+
+    client.force_authenticate(user=user)
+    assert client.post("/api/loans/bulk/", {"books": []}, format='json').status_code == 400
+    assert client.post("/api/loans/bulk/", {"books": list(range(1, 102))}, format='json').status_code == 400
+    assert client.post("/api/return/bulk/", {"loans": ["x"]}, format='json').status_code == 400
@@ -0,0 +1,91 @@
+import pytest
+from rest_framework.test import APIClient
+from library.models import User, Book
+
+
+@pytest.fixture
+def book():
+    return Book.objects.create(title="Cached", author="Author", isbn="1600000000001", page_count=100)
+
+
+@pytest.mark.django_db
+def test_book_list_is_served_from_cache_until_a_book_changes(book):
+    client = APIClient()
+    first = client.get("/api/books/?page=1&ordering=title")
+    assert first["X-Cache"] == "MISS"
+    # Parameter order does not matter
+    second = client.get("/api/books/?ordering=title&page=1")
+    assert second["X-Cache"] == "HIT"
+    assert second.data == first.data
+
+    admin = User.objects.create_user(username="admin", password="pass123", is_admin=True)
+    client.force_authenticate(user=admin)
+    client.patch(f"/api/books/{book.id}/", {"title": "Renamed"}, format='json')
+    client.force_authenticate(user=None)
+
+    third = client.get("/api/books/?page=1&ordering=title")
+    assert third["X-Cache"] == "MISS"
+    assert third.data["results"][0]["title"] == "Renamed"
+
+
+@pytest.mark.django_db
+def test_etag_and_last_modified_revalidation(book):
+    client = APIClient()
+    response = client.get(f"/api/books/{book.id}/")
+    etag = response["ETag"]
+
+    assert client.get(f"/api/books/{book.id}/", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert client.get(f"/api/books/{book.id}/",
+                      HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code == 304
+
+    Book.objects.get(pk=book.pk).save()
+    assert client.get(f"/api/books/{book.id}/", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_borrow_and_return_invalidate_only_the_affected_book(book):
+    other = Book.objects.create(title="Other", author="Author", isbn="1600000000002", page_count=10)
+    user = User.objects.create_user(username="reader", password="pass123")
+    client = APIClient()
+    client.get(f"/api/books/{book.id}/")
+    client.get(f"/api/books/{other.id}/")
+
+    client.force_authenticate(user=user)
+    loan_id = client.post("/api/loans/", {"book": book.id}, format='json').data["id"]
+    detail = client.get(f"/api/books/{book.id}/")
+    assert detail["X-Cache"] == "MISS" and detail.data["available"] is False
+    assert client.get(f"/api/books/{other.id}/")["X-Cache"] == "HIT"
+
+    client.post(f"/api/return/{loan_id}/", format='json')
+    assert client.get(f"/api/books/{book.id}/").data["available"] is True
+
+
+@pytest.mark.django_db
+def test_metrics_report_cache_hit_rate(book):
+    client = APIClient()
+    client.get("/api/books/")
+    client.get("/api/books/")
+    assert client.get("/api/metrics/").status_code in [401, 403]
+
+    client.force_authenticate(user=User.objects.create_user(username="ops", password="pass123", is_admin=True))
+    stats = client.get("/api/metrics/").data["response_cache"]
+    assert stats["hits"] >= 1 and stats["misses"] >= 1
+    assert 0 < stats["hit_rate"] < 1
+
+
+@pytest.mark.django_db
+def test_without_a_shared_cache_responses_are_built_every_time(book, settings):
+    # Another worker's borrow could not invalidate this process's local memory
+    settings.LIBRARY_RESPONSE_CACHE = False
+    client = APIClient()
+    first = client.get(f"/api/books/{book.id}/")
+    assert "X-Cache" not in first and "ETag" not in first
+    client.get("/api/books/?facets=true")
+    client.get("/api/async/books/")
+
+    Book.objects.filter(pk=book.pk).update(available_copies=0, available=False)  # no invalidation
+    assert client.get(f"/api/books/{book.id}/").data["available"] is False
+    listed = client.get("/api/books/?facets=true")
+    assert listed.data["results"][0]["available"] is False
+    assert listed.data["facets"]["available"] == [{"value": True, "count": 0}, {"value": False, "count": 1}]
+    assert client.get("/api/async/books/").json()["results"][0]["available"] is False
@@ -0,0 +1,102 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from library.archive import archive_loans
+from library.models import Book, Change, Loan, User
+
+
+def _feed(client, since=0, limit=None):
+    params = {"since": since} if limit is None else {"since": since, "limit": limit}
+    response = client.get("/api/changes/", params)
+    assert response.status_code == 200, response.data
+    return response.data
+
+
+def _sync(client, since=0, limit=2):
+    # What a mirror does: follow the cursor until has_more is false
+    latest = {}
+    while True:
+        page = _feed(client, since, limit)
+        latest.update({(change["type"], change["id"]): change for change in page["results"]})
+        since = page["next"]
+        if not page["has_more"]:
+            return latest, since
+
+
+@pytest.mark.django_db
+def test_change_feed_follows_borrows_returns_edits_and_deletes():
+    admin = User.objects.create_user(username="feed_admin", password="pass123", is_admin=True)
+    reader = User.objects.create_user(username="feed_reader", password="pass123")
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    kept, dropped = Book.objects.bulk_create([
+        Book(title="Kept", author="Author", isbn="1600000000001", page_count=10),
+        Book(title="Dropped", author="Author", isbn="1600000000002", page_count=10),
+    ])
+    _, cursor = _sync(client)
+
+    reader_client = APIClient()
+    reader_client.force_authenticate(user=reader)
+    loan_id = reader_client.post("/api/loans/", {"book": kept.pk}, format="json").data["id"]
+    assert reader_client.post(f"/api/return/{loan_id}/").status_code == 200
+    kept.title = "Kept, second edition"
+    kept.save()
+    dropped_id = dropped.pk
+    dropped.delete()
+
+    changed, cursor = _sync(client, cursor)
+    assert changed[("book", kept.pk)]["data"]["title"] == "Kept, second edition"
+    assert changed[("book", kept.pk)]["data"]["available"] is True
+    assert changed[("loan", loan_id)]["data"]["returned_at"] is not None
+    assert changed[("book", dropped_id)]["deleted"] and changed[("book", dropped_id)]["data"] is None
+    assert len(changed) == 3
+    assert _feed(client, cursor) == {"next": cursor, "has_more": False, "results": []}
+
+    # Archiving moves the loan without changing it
+    list(archive_loans(timezone.now() + timedelta(days=1)))
+    assert _feed(client, cursor)["results"] == []
+    # Deleting the book deletes its archived loans too
+    kept_id = kept.pk
+    kept.delete()
+    changed, _ = _sync(client, cursor)
+    assert {key for key, change in changed.items() if change["deleted"]} == {("book", kept_id), ("loan", loan_id)}
+
+
+@pytest.mark.django_db
+def test_change_feed_is_admin_only_and_validates_the_cursor():
+    reader = User.objects.create_user(username="feed_reader", password="pass123")
+    client = APIClient()
+    client.force_authenticate(user=reader)
+    assert client.get("/api/changes/").status_code == 403
+
+    client.force_authenticate(user=User.objects.create_user(username="feed_admin", password="x", is_admin=True))
+    assert client.get("/api/changes/", {"since": "yesterday"}).status_code == 400
+    assert client.get("/api/changes/", {"limit": 0}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_compact_changes_keeps_the_last_change_of_every_object():
+    admin = User.objects.create_user(username="feed_admin", password="pass123", is_admin=True)
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    books = [Book.objects.create(title=f"Edited {i}", author="Author", isbn=f"{1600000000010 + i}", page_count=1)
+             for i in range(3)]
+    for book in books:
+        for edition in range(3):
+            book.page_count = edition + 2
+            book.save()
+    deleted_id = books[0].pk
+    books[0].delete()
+    before, _ = _sync(client)
+
+    out = StringIO()
+    call_command("compact_changes", "--batch-size", "2", stdout=out)
+    assert "Deleted 10 superseded changes" in out.getvalue()
+    assert Change.objects.filter(kind=Change.BOOK).count() == 3
+    assert _sync(client) == (before, Change.objects.latest("pk").pk)
+    assert before[("book", deleted_id)]["deleted"]
+    assert before[("book", books[1].pk)]["data"]["page_count"] == 4
@@ -0,0 +1,124 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from library.models import ArchivedLoan, Book, Loan, User
+
+
+def _run(*args):
+    out, err = StringIO(), StringIO()
+    call_command(*args, stdout=out, stderr=err)
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+def test_import_books_from_csv_upserts_and_rejects(tmp_path):
+    Book.objects.create(title="Old Title", author="Old Author", isbn="1300000000001", page_count=10,
+                        available=False)
+    feed = tmp_path / "feed.csv"
+    feed.write_text(
+        "title,author,isbn,page_count\n"
+        "New Title,New Author,1300000000001,200\n"
+        "Fresh Book,Someone,1300000000002,150\n"
+        "Bad Pages,Someone,1300000000003,lots\n"
+        ",No Title,1300000000004,10\n"
+    )
+    rejects = tmp_path / "rejects.jsonl"
+
+    output = _run("import_books", str(feed), "--batch-size", "1", "--rejects", str(rejects))
+    assert "Imported 2 books (2 rejected)" in output
+    assert "rows/s" in output
+
+    updated = Book.objects.get(isbn="1300000000001")
+    assert (updated.title, updated.author, updated.page_count) == ("New Title", "New Author", 200)
+    assert updated.available is False  # circulation state is left alone
+    assert Book.objects.filter(isbn="1300000000002", available=True).exists()
+    assert not Book.objects.filter(isbn__in=["1300000000003", "1300000000004"]).exists()
+
+    rejected = [json.loads(line) for line in rejects.read_text().splitlines()]
+    assert [r["line"] for r in rejected] == [4, 5]
+    assert "page_count" in rejected[0]["errors"]
+    assert "title" in rejected[1]["errors"]
+
+
+@pytest.mark.django_db
+def test_import_books_from_jsonl_keeps_last_duplicate(tmp_path):
+    feed = tmp_path / "feed.jsonl"
+    feed.write_text(
+        json.dumps({"title": "First", "author": "A", "isbn": "1400000000001", "page_count": 1}) + "\n"
+        + "not json\n"
+        + "\n"
+        + json.dumps({"title": "Second", "author": "A", "isbn": "1400000000001", "page_count": 2}) + "\n"
+    )
+
+    output = _run("import_books", str(feed))
+    assert "Imported 1 books (1 rejected)" in output
+    assert Book.objects.get(isbn="1400000000001").title == "Second"
+
+
+@pytest.mark.django_db
+def test_export_data_streams_filtered_books_as_csv():
+    Book.objects.create(title="Kept", author="Tolkien", isbn="1500000000001", page_count=10)
+    Book.objects.create(title="Other", author="Rowling", isbn="1500000000002", page_count=10)
+
+    lines = _run("export_data", "books", "--author", "Tolkien").splitlines()
+    assert lines[0] == "id,title,author,isbn,page_count,total_copies,available_copies,available"
+    assert len(lines) == 2 and ",Kept,Tolkien," in lines[1]
+
+
+@pytest.mark.django_db
+def test_archive_loans_moves_old_returned_loans_in_resumable_batches():
+    user = User.objects.create_user(username="archived", password="pass123")
+    book = Book.objects.create(title="Archive", author="Author", isbn="1300000000009", page_count=10)
+    now = timezone.now()
+    old = [Loan.objects.create(user=user, book=book, borrowed_at=now - timedelta(days=400 + i),
+                               returned_at=now - timedelta(days=390 + i)) for i in range(3)]
+    recent = Loan.objects.create(user=user, book=book, borrowed_at=now - timedelta(days=20),
+                                 returned_at=now - timedelta(days=10))
+    active = Loan.objects.create(user=user, book=book, borrowed_at=now - timedelta(days=500))
+
+    output = _run("archive_loans", "--older-than", "365", "--batch-size", "2", "--max-batches", "1")
+    assert "Archived 2 loans" in output
+    output = _run("archive_loans", "--older-than", "365", "--batch-size", "2")
+    assert "Archived 1 loans" in output
+
+    assert sorted(Loan.objects.values_list("pk", flat=True)) == [recent.pk, active.pk]
+    assert sorted(ArchivedLoan.objects.values_list("pk", flat=True)) == sorted(loan.pk for loan in old)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.get("/api/loans/")
+    assert [loan["id"] for loan in response.data["results"]] == sorted(loan.pk for loan in old + [recent, active])
+    assert response.data["results"][0]["returned_at"] is not None
+    assert client.get(f"/api/loans/{old[0].pk}/").status_code == 200
+    assert [loan["id"] for loan in client.get("/api/loans/?status=active").data["results"]] == [active.pk]
+    assert client.post(f"/api/return/{old[0].pk}/").status_code == 404
+
+    exported = _run("export_data", "loans", "--output", "jsonl").splitlines()
+    assert len(exported) == 5
+
+
+@pytest.mark.django_db
+def test_scan_overdue_flags_loans_and_summarizes_per_borrower():
+    users = [User.objects.create_user(username=f"borrower{i}", password="pass123") for i in range(3)]
+    book = Book.objects.create(title="Overdue", author="Author", isbn="1300000000010", page_count=10)
+    now = timezone.now()
+    for user, days in [(users[0], 10), (users[0], 3), (users[1], 1)]:
+        Loan.objects.create(user=user, book=book, due_at=now - timedelta(days=days))
+    Loan.objects.create(user=users[2], book=book, due_at=now + timedelta(days=3))
+    Loan.objects.create(user=users[2], book=book, due_at=now - timedelta(days=5), returned_at=now)
+
+    summaries = [json.loads(line) for line in _run("scan_overdue", "--dry-run", "--chunk-size", "1").splitlines()]
+    assert [(s["username"], s["overdue_loans"], s["days_overdue"]) for s in summaries] == [
+        ("borrower0", 2, 10), ("borrower1", 1, 1),
+    ]
+    assert not Loan.objects.filter(overdue_flagged_at__isnull=False).exists()
+
+    assert len(_run("scan_overdue", "--chunk-size", "2").splitlines()) == 2
+    assert Loan.objects.filter(overdue_flagged_at__isnull=False).count() == 3
+    assert _run("scan_overdue") == ""
+    assert len(_run("scan_overdue", "--include-flagged", "--dry-run").splitlines()) == 2
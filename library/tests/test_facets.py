@@ -0,0 +1,36 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from library.models import Book
+
+
+@pytest.mark.django_db
+def test_facets_count_the_filtered_books_and_are_cached_across_pages():
+    for i in range(15):
+        Book.objects.create(title=f"Facet {i}", author="Wolfe" if i < 7 else "Banks" if i < 11 else "Le Guin",
+                            isbn=f"{2200000000000 + i}", page_count=100, available=i % 4 != 0)
+    Book.objects.create(title="Unrelated", author="Wolfe", isbn="2200000000100", page_count=100)
+    client = APIClient()
+    query = {"search": "facet", "facets": "true"}
+
+    response = client.get("/api/books/", query)
+    assert response.data["facets"] == {
+        "author": [{"value": "Wolfe", "count": 7}, {"value": "Banks", "count": 4}, {"value": "Le Guin", "count": 4}],
+        "available": [{"value": True, "count": 11}, {"value": False, "count": 4}],
+    }
+    assert "facets" not in client.get("/api/books/", {"search": "facet"}).data
+
+    # Other pages and orderings reuse the counts
+    with CaptureQueriesContext(connection) as queries:
+        page = client.get("/api/books/", {**query, "page": 2, "ordering": "title"})
+    assert page.data["facets"] == response.data["facets"]
+    assert not any("GROUP BY" in captured["sql"] for captured in queries.captured_queries)
+
+    Book.objects.filter(author="Banks").order_by("pk").first().delete()
+    facets = client.get("/api/books/", query).data["facets"]
+    assert facets["author"][1] == {"value": "Le Guin", "count": 4}
+    assert facets["available"] == [{"value": True, "count": 10}, {"value": False, "count": 4}]
+
+    facets = client.get("/api/books/", {**query, "available": "true"}).data["facets"]
+    assert facets["available"] == [{"value": True, "count": 10}, {"value": False, "count": 0}]
@@ -0,0 +1,68 @@
+import logging
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from library.instrumentation import RequestTimings, _observe, reset_route_stats
+from library.models import User, Book
+
+
+def _timings(response):
+    entries = {}
+    for entry in response["Server-Timing"].split(", "):
+        name, *params = entry.split(";")
+        entries[name] = dict(param.split("=", 1) for param in params)
+    return entries
+
+
+@pytest.mark.django_db
+def test_server_timing_reports_queries_and_phases(caplog):
+    User.objects.create_user(username="timed", password="pass123")
+    Book.objects.create(title="Timed", author="Author", isbn="2000000000001", page_count=10)
+    client = APIClient()
+    token = client.post("/api/auth/login/", {"username": "timed", "password": "pass123"},
+                        format='json').data["access"]
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    with caplog.at_level(logging.INFO, logger="library.requests"):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/api/loans/")
+    timings = _timings(response)
+    assert set(timings) == {"db", "auth", "view", "serialize", "total"}
+    assert timings["db"]["desc"] == f'"{len(queries)} queries"'
+    assert float(timings["auth"]["dur"]) > 0
+    assert float(timings["total"]["dur"]) >= float(timings["view"]["dur"])
+
+    record = caplog.records[-1]
+    assert record.route == "GET loan-list"
+    assert record.db_queries == len(queries)
+
+
+@pytest.mark.django_db
+def test_metrics_expose_route_histograms():
+    reset_route_stats()
+    admin = User.objects.create_user(username="ops", password="pass123", is_admin=True)
+    client = APIClient()
+    for _ in range(3):
+        client.get("/api/books/")
+    client.force_authenticate(user=admin)
+
+    routes = client.get("/api/metrics/").data["routes"]
+    books = routes["GET book-list"]
+    assert books["latency"]["count"] == 3
+    assert sum(books["latency"]["buckets"].values()) == 3
+    assert books["latency"]["p50_ms"] is not None
+
+
+@pytest.mark.django_db
+def test_metrics_survive_requests_slower_than_the_last_bucket():
+    reset_route_stats()
+    _observe("GET slow", 6000.0, RequestTimings())
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(username="ops", password="pass123", is_admin=True))
+
+    response = client.get("/api/metrics/")
+    assert response.status_code == 200
+    latency = response.json()["routes"]["GET slow"]["latency"]
+    assert latency["p99_ms"] == "+Inf" and latency["buckets"]["+Inf"] == 1
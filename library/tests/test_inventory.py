@@ -0,0 +1,141 @@
+import pytest
+from django.db import IntegrityError
+from django.test import Client
+from rest_framework.test import APIClient
+from library.models import User, Book, Loan
+from library.services import BookNotAvailable, borrow_book, borrow_books, return_book, return_books
+
+
+def _inventory(book):
+    book.refresh_from_db()
+    return book.available_copies, book.total_copies, book.available
+
+
+@pytest.mark.django_db
+def test_copies_are_lent_until_the_shelf_is_empty():
+    readers = [User.objects.create_user(username=f"reader{i}", password="pass123") for i in range(3)]
+    book = Book.objects.create(title="Bestseller", author="Author", isbn="2200000000001", page_count=300,
+                               total_copies=2, available_copies=2)
+
+    first = borrow_book(readers[0], book)
+    assert _inventory(book) == (1, 2, True)
+    borrow_book(readers[1], book)
+    assert _inventory(book) == (0, 2, False)
+    with pytest.raises(BookNotAvailable):
+        borrow_book(readers[2], book)
+    assert _inventory(book) == (0, 2, False)
+
+    return_book(readers[0], first.pk)
+    assert _inventory(book) == (1, 2, True)
+
+
+@pytest.mark.django_db
+def test_bulk_return_puts_back_every_copy_of_a_book():
+    reader = User.objects.create_user(username="kiosk", password="pass123")
+    book = Book.objects.create(title="Class Set", author="Author", isbn="2200000000002", page_count=80,
+                               total_copies=3, available_copies=3)
+    other = Book.objects.create(title="Single", author="Author", isbn="2200000000003", page_count=80)
+    loans = [borrow_book(reader, book).pk, borrow_book(reader, book).pk]
+    loans += [r["loan"] for r in borrow_books(reader, [other.pk])]
+    assert _inventory(book) == (1, 3, True)
+    assert _inventory(other) == (0, 1, False)
+
+    return_books(reader, loans)
+    assert _inventory(book) == (3, 3, True)
+    assert _inventory(other) == (1, 1, True)
+
+
+@pytest.mark.django_db
+def test_bulk_return_never_shelves_more_copies_than_owned():
+    reader = User.objects.create_user(username="restocked", password="pass123")
+    book = Book.objects.create(title="Recount", author="Author", isbn="2200000000007", page_count=10,
+                               total_copies=2, available_copies=2)
+    loans = [borrow_book(reader, book).pk, borrow_book(reader, book).pk]
+    # A recount put one copy back on the shelf by hand
+    Book.objects.filter(pk=book.pk).update(available_copies=1, available=True)
+
+    results = return_books(reader, loans)
+    assert [result["status"] for result in results] == ["returned", "returned"]
+    assert _inventory(book) == (2, 2, True)
+
+
+@pytest.mark.django_db
+def test_loans_cannot_be_edited_or_deleted_through_the_api():
+    reader = User.objects.create_user(username="deleter", password="pass123")
+    book = Book.objects.create(title="Kept Out", author="Author", isbn="2200000000008", page_count=10)
+    loan = borrow_book(reader, book)
+    client = APIClient()
+    client.force_authenticate(user=reader)
+
+    response = client.delete(f"/api/loans/{loan.pk}/")
+    assert response.status_code == 405 and "/api/return/" in response.data["detail"]
+    assert client.patch(f"/api/loans/{loan.pk}/", {"returned_at": None}, format="json").status_code == 405
+    assert client.put(f"/api/loans/{loan.pk}/", {"book": book.pk}, format="json").status_code == 405
+    assert _inventory(book) == (0, 1, False)
+    assert client.post(f"/api/return/{loan.pk}/").status_code == 200
+    assert _inventory(book) == (1, 1, True)
+
+
+@pytest.mark.django_db
+def test_admin_cannot_add_change_or_delete_loans():
+    admin = User.objects.create_user(username="loan_admin", password="pass123", is_admin=True)
+    book = Book.objects.create(title="Admin Shelf", author="Author", isbn="2200000000015", page_count=10)
+    loan = borrow_book(admin, book)
+    client = Client()
+    client.force_login(admin)
+
+    assert client.get(f"/admin/library/loan/{loan.pk}/change/").status_code == 200  # viewing still works
+    assert client.get("/admin/library/loan/add/").status_code == 403
+    assert client.post(f"/admin/library/loan/{loan.pk}/delete/", {"post": "yes"}).status_code == 403
+    assert client.post(f"/admin/library/loan/{loan.pk}/change/", {"returned_at": ""}).status_code == 403
+    assert Loan.objects.filter(pk=loan.pk).exists() and _inventory(book) == (0, 1, False)
+
+
+@pytest.mark.django_db
+def test_stale_instance_does_not_overwrite_counters():
+    reader = User.objects.create_user(username="stale", password="pass123")
+    book = Book.objects.create(title="Stale", author="Author", isbn="2200000000004", page_count=10)
+    stale = Book.objects.get(pk=book.pk)
+    borrow_book(reader, book)
+
+    stale.title = "Renamed"
+    stale.save()
+    assert _inventory(book) == (0, 1, False)
+    assert book.title == "Renamed"
+
+
+@pytest.mark.django_db
+def test_counters_cannot_leave_their_bounds():
+    book = Book.objects.create(title="Bounds", author="Author", isbn="2200000000005", page_count=10)
+    with pytest.raises(IntegrityError):
+        Book.objects.filter(pk=book.pk).update(available_copies=2)
+
+
+@pytest.mark.django_db
+def test_api_manages_total_copies():
+    admin = User.objects.create_user(username="librarian", password="pass123", is_admin=True)
+    reader = User.objects.create_user(username="borrower", password="pass123")
+    client = APIClient()
+    client.force_authenticate(user=admin)
+
+    response = client.post("/api/books/", {"title": "Stocked", "author": "Author", "isbn": "2200000000006",
+                                           "page_count": 120, "total_copies": 3, "available_copies": 0},
+                           format='json')
+    assert response.status_code == 201
+    assert (response.data["available_copies"], response.data["available"]) == (3, True)
+    book = Book.objects.get(pk=response.data["id"])
+    borrow_book(reader, book)
+    borrow_book(reader, book)
+
+    response = client.patch(f"/api/books/{book.pk}/", {"total_copies": 1}, format='json')
+    assert response.status_code == 400
+    assert _inventory(book) == (1, 3, True)
+
+    response = client.patch(f"/api/books/{book.pk}/", {"total_copies": 2}, format='json')
+    assert response.status_code == 200
+    assert (response.data["available_copies"], response.data["available"]) == (0, False)
+
+    response = client.patch(f"/api/books/{book.pk}/", {"total_copies": 5, "title": "Restocked"}, format='json')
+    assert (response.data["available_copies"], response.data["total_copies"]) == (3, 5)
+    assert _inventory(book) == (3, 5, True)
+    assert book.title == "Restocked"
@@ -1,6 +1,16 @@
+from datetime import timedelta
+
 import pytest
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APIClient
-from library.models import User, Book
+from library.filters import LoanFilter, LoanHistoryFilter
+from library.models import User, Book, Loan, LoanHistory
+from library.services import BookNotAvailable, LoanNotFound, borrow_book, return_book
+from library.overdue import scan_overdue
+from library.tests.helpers import assert_uses_index
 
 
 @pytest.mark.django_db
@@ -58,3 +68,134 @@ def test_loan_access_control():
     client.force_authenticate(user=user2)
     return_response = client.post(f"/api/return/{loan_id}/", format='json')
     assert return_response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_borrow_does_not_trust_stale_availability():
+    user1 = User.objects.create_user(username="racer1", password="pass1")
+    user2 = User.objects.create_user(username="racer2", password="pass2")
+    book = Book.objects.create(title="Race Book", author="Author", isbn="3333333333333", page_count=10)
+
+    # Both requests loaded the book while it was still available
+    first_copy = Book.objects.get(pk=book.pk)
+    second_copy = Book.objects.get(pk=book.pk)
+
+    borrow_book(user1, first_copy)
+    with pytest.raises(BookNotAvailable):
+        borrow_book(user2, second_copy)
+
+    assert Loan.objects.filter(book=book).count() == 1
+
+
+@pytest.mark.django_db
+def test_return_closes_a_loan_only_once():
+    user = User.objects.create_user(username="returner", password="pass1")
+    book = Book.objects.create(title="Return Once", author="Author", isbn="4444444444444", page_count=10)
+    loan = borrow_book(user, book)
+
+    return_book(user, loan.pk)
+    with pytest.raises(LoanNotFound):
+        return_book(user, loan.pk)
+
+    book.refresh_from_db()
+    loan.refresh_from_db()
+    assert book.available is True
+    assert loan.returned_at is not None
+
+
+def _statements(queries):
+    # Savepoints only appear because each test runs inside a transaction
+    return [q["sql"] for q in queries.captured_queries if "SAVEPOINT" not in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_borrow_and_return_query_counts():
+    user = User.objects.create_user(username="counter", password="pass1")
+    book = Book.objects.create(title="Counted", author="Author", isbn="5555555555555", page_count=10)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    # Book lookup during validation, conditional UPDATE, INSERT
+    with CaptureQueriesContext(connection) as queries:
+        loan_id = client.post("/api/loans/", {"book": book.id}, format='json').data["id"]
+    assert len(_statements(queries)) == 3
+
+    # Book id of the open loan, conditional UPDATE of the loan, UPDATE of the book
+    with CaptureQueriesContext(connection) as queries:
+        client.post(f"/api/return/{loan_id}/", format='json')
+    assert len(_statements(queries)) == 3
+
+
+@pytest.mark.django_db
+def test_loan_list_is_scoped_to_the_user_unless_admin():
+    owner = User.objects.create_user(username="owner", password="pass123")
+    other = User.objects.create_user(username="other", password="pass123")
+    admin = User.objects.create_user(username="admin", password="pass123", is_admin=True)
+    books = [Book.objects.create(title=f"Scoped {i}", author="Author", isbn=f"{1700000000000 + i}",
+                                 page_count=10) for i in range(3)]
+    returned = Loan.objects.create(user=owner, book=books[0], returned_at=timezone.now())
+    active = Loan.objects.create(user=owner, book=books[1])
+    theirs = Loan.objects.create(user=other, book=books[2])
+    client = APIClient()
+
+    client.force_authenticate(user=owner)
+    assert [loan["id"] for loan in client.get("/api/loans/").data["results"]] == [returned.id, active.id]
+    assert [loan["id"] for loan in client.get("/api/loans/?status=active").data["results"]] == [active.id]
+    assert [loan["id"] for loan in client.get("/api/loans/?status=returned").data["results"]] == [returned.id]
+    assert client.get(f"/api/loans/{theirs.id}/").status_code == 404
+    assert client.get("/api/loans/?status=lost").status_code == 400
+
+    client.force_authenticate(user=admin)
+    assert client.get("/api/loans/").data["count"] == 3
+
+
+@pytest.mark.django_db
+def test_loan_lookups_use_composite_and_partial_indexes():
+    user = User.objects.create_user(username="planner", password="pass123")
+    book = Book.objects.create(title="Planned", author="Author", isbn="1700000000009", page_count=10)
+
+    user_loans = Loan.objects.filter(user=user).order_by('id')
+    assert_uses_index(LoanFilter({"status": "active"}, queryset=user_loans).qs, "loan_user_returned_idx")
+    assert_uses_index(LoanFilter({"status": "returned"}, queryset=user_loans).qs, "loan_user_returned_idx")
+    assert_uses_index(Loan.objects.filter(book=book, returned_at__isnull=True), "loan_open_book_idx")
+
+    history = LoanHistoryFilter({"status": "returned"}, queryset=LoanHistory.objects.filter(user=user)).qs
+    assert_uses_index(history, "loan_user_returned_idx")
+    assert_uses_index(history, "archivedloan_user_idx")
+
+
+@pytest.mark.django_db
+def test_borrow_sets_due_date_and_overdue_loans_can_be_listed(settings):
+    settings.LIBRARY_LOAN_PERIOD_DAYS = 21
+    user = User.objects.create_user(username="due", password="pass123")
+    books = [Book.objects.create(title=f"Due {i}", author="Author", isbn=f"{1700000000100 + i}",
+                                 page_count=10) for i in range(2)]
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    loan = Loan.objects.get(pk=client.post("/api/loans/", {"book": books[0].id}, format='json').data["id"])
+    assert loan.due_at - loan.borrowed_at == timedelta(days=21)
+    late = Loan.objects.create(user=user, book=books[1], borrowed_at=timezone.now() - timedelta(days=30),
+                               due_at=timezone.now() - timedelta(days=9))
+    assert [row["id"] for row in client.get("/api/loans/?status=overdue").data["results"]] == [late.id]
+
+
+@pytest.mark.django_db
+def test_overdue_scan_pages_through_the_open_due_index():
+    user = User.objects.create_user(username="late", password="pass123")
+    book = Book.objects.create(title="Late", author="Author", isbn="1700000000200", page_count=10)
+    now = timezone.now()
+    due = now - timedelta(days=3)
+    # Equal due dates straddle a chunk boundary; the returned and future loans are skipped
+    loans = [Loan.objects.create(user=user, book=book, due_at=due - timedelta(days=i // 2)) for i in range(5)]
+    Loan.objects.create(user=user, book=book, due_at=due, returned_at=now)
+    Loan.objects.create(user=user, book=book, due_at=now + timedelta(days=1))
+
+    chunks = list(scan_overdue(now, chunk_size=2, flag=False))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert sorted(row[0] for chunk in chunks for row in chunk) == sorted(loan.pk for loan in loans)
+
+    overdue = Loan.objects.filter(returned_at__isnull=True, due_at__lt=now).order_by('due_at', 'id')
+    assert_uses_index(overdue, "loan_open_due_idx")
+    assert_uses_index(overdue.filter(due_at__gte=due).filter(Q(due_at__gt=due) | Q(due_at=due, pk__gt=1)),
+                      "loan_open_due_idx")
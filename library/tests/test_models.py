@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 import pytest
 from library.models import Book, User, Loan
 from django.utils import timezone
@@ -29,6 +31,18 @@ def test_loan_creation():
     assert loan.is_returned() is True
 
 
+@pytest.mark.django_db
+def test_loan_is_due_a_loan_period_after_it_was_borrowed(settings):
+    settings.LIBRARY_LOAN_PERIOD_DAYS = 21
+    user = User.objects.create_user(username="due_tester", password="password123")
+    book = Book.objects.create(title="Due Book", author="Author", isbn="1234567890130", page_count=100)
+    borrowed_at = timezone.now() - timedelta(days=3)
+    loan = Loan.objects.create(user=user, book=book, borrowed_at=borrowed_at)
+    assert loan.due_at == borrowed_at + timedelta(days=21)
+    due_at = timezone.now()
+    assert Loan.objects.create(user=user, book=book, due_at=due_at).due_at == due_at
+
+
 @pytest.mark.django_db
 def test_book_availability_changes_on_loan_and_return():
     user = User.objects.create_user(username="user3", password="password123")
@@ -0,0 +1,106 @@
+import json
+from base64 import urlsafe_b64encode
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from rest_framework.test import APIClient
+from library.models import User, Book, Loan
+
+
+def _walk(client, url, params):
+    """Follow `next` links from the first keyset page and collect every result."""
+    response = client.get(url, params)
+    assert response.status_code == 200
+    pages = [response.data]
+    while response.data["next"]:
+        response = client.get(response.data["next"])
+        assert response.status_code == 200
+        pages.append(response.data)
+    return pages
+
+
+@pytest.mark.django_db
+def test_keyset_pagination_walks_books_in_id_order():
+    books = [
+        Book.objects.create(title=f"Book {i:02d}", author="Author", isbn=f"{5000000000000 + i}", page_count=100 + i)
+        for i in range(25)
+    ]
+    client = APIClient()
+
+    pages = _walk(client, "/api/books/", {"pagination": "cursor"})
+    assert [len(page["results"]) for page in pages] == [10, 10, 5]
+    assert [b["id"] for page in pages for b in page["results"]] == [b.id for b in books]
+    assert "count" not in pages[0]
+    assert pages[0]["previous"] is None
+
+    # Walking back from the last page returns the previous page unchanged
+    response = client.get(pages[-1]["previous"])
+    assert response.data["results"] == pages[1]["results"]
+
+
+@pytest.mark.django_db
+def test_keyset_pagination_follows_ordering_with_ties():
+    for i in range(15):
+        Book.objects.create(title="Same Title" if i % 2 else f"Title {i:02d}", author="Author",
+                            isbn=f"{6000000000000 + i}", page_count=500 - i)
+    client = APIClient()
+
+    for ordering, key in (("title", "title"), ("-page_count", "page_count")):
+        pages = _walk(client, "/api/books/", {"pagination": "cursor", "ordering": ordering, "page_size": 4})
+        rows = [b for page in pages for b in page["results"]]
+        assert len(rows) == 15
+        assert len({b["id"] for b in rows}) == 15
+        expected = sorted(Book.objects.values(key, "id"), key=lambda r: (r[key], r["id"]),
+                          reverse=ordering.startswith("-"))
+        assert [b["id"] for b in rows] == [r["id"] for r in expected]
+
+
+@pytest.mark.django_db
+def test_keyset_cursor_is_bound_to_its_ordering():
+    for i in range(12):
+        Book.objects.create(title=f"Book {i}", author="Author", isbn=f"{7000000000000 + i}", page_count=10)
+    client = APIClient()
+
+    next_url = client.get("/api/books/", {"pagination": "cursor"}).data["next"]
+    cursor = parse_qs(urlparse(next_url).query)["cursor"][0]
+    assert client.get("/api/books/", {"cursor": cursor}).status_code == 200
+    assert client.get("/api/books/", {"cursor": cursor, "ordering": "title"}).status_code == 404
+    assert client.get("/api/books/", {"cursor": "not-a-cursor"}).status_code == 404
+
+
+@pytest.mark.django_db
+def test_keyset_cursor_with_a_value_the_field_cannot_hold_is_rejected():
+    Book.objects.create(title="Book", author="Author", isbn="7000000000100", page_count=10)
+    client = APIClient()
+
+    def crafted(value):
+        payload = json.dumps({"o": "page_count", "d": False, "v": value, "id": 1}).encode()
+        return urlsafe_b64encode(payload).decode().rstrip("=")
+
+    for value in ({"a": 1}, "abc", None, [1]):
+        response = client.get("/api/books/", {"ordering": "page_count", "cursor": crafted(value)})
+        assert response.status_code == 404, value
+    assert client.get("/api/books/", {"ordering": "page_count", "cursor": crafted("5")}).status_code == 200
+
+
+@pytest.mark.django_db
+def test_page_number_pagination_is_still_the_default():
+    for i in range(12):
+        Book.objects.create(title=f"Book {i}", author="Author", isbn=f"{8000000000000 + i}", page_count=10)
+
+    response = APIClient().get("/api/books/", {"page": 2})
+    assert response.data["count"] == 12
+    assert len(response.data["results"]) == 2
+
+
+@pytest.mark.django_db
+def test_keyset_pagination_for_loans():
+    user = User.objects.create_user(username="pager", password="pass123")
+    book = Book.objects.create(title="Loaned", author="Author", isbn="9000000000001", page_count=10)
+    loans = [Loan.objects.create(user=user, book=book) for _ in range(13)]
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    pages = _walk(client, "/api/loans/", {"pagination": "cursor", "count": "estimate"})
+    assert [loan["id"] for page in pages for loan in page["results"]] == [loan.id for loan in loans]
+    assert "estimated_count" in pages[0]
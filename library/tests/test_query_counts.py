@@ -0,0 +1,145 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from library.models import User, Book, Loan, due_date
+from library.services import borrow_book
+from library.tests.helpers import full_scans
+
+# Statements per request (JWT user lookup included), with enough rows that an
+# N+1 would show. Raise a budget only together with the change that needs it.
+QUERY_BUDGETS = [
+    ("get", "/api/", None, "reader", 1),
+    ("get", "/api/books/", None, None, 2),
+    ("get", "/api/books/?author=Author 1&available=true&ordering=title", None, None, 2),
+    ("get", "/api/books/?search=guard", None, None, 2),
+    ("get", "/api/books/?search=guard&facets=true", None, None, 3),
+    ("get", "/api/books/?pagination=cursor&ordering=-page_count", None, None, 1),
+    ("get", "/api/books/{book}/", None, None, 1),
+    ("get", "/api/loans/", None, "reader", 3),
+    ("get", "/api/loans/?status=active", None, "admin", 3),
+    ("post", "/api/loans/", {"book": "{book}"}, "reader", 4),
+    ("post", "/api/return/{loan}/", None, "reader", 4),
+    ("post", "/api/loans/bulk/", {"books": ["{book}", "{other_book}"]}, "reader", 4),
+    ("post", "/api/return/bulk/", {"loans": ["{loan}"]}, "reader", 4),
+    ("post", "/api/auth/token/refresh/", {"refresh": "{refresh}"}, None, 1),
+    ("get", "/api/metrics/", None, "admin", 1),
+    ("get", "/api/changes/", None, "admin", 4),
+]
+
+ADMIN_CHANGELISTS = [
+    "/admin/library/book/",
+    "/admin/library/book/?author=Author 1&available__exact=1",
+    "/admin/library/book/?q=guard",
+    "/admin/library/loan/",
+    "/admin/library/loan/?q=reader",
+    "/admin/library/loan/?q=guard",
+    "/admin/library/loanhistory/?q=guard",
+]
+
+
+@pytest.fixture
+def guard_data():
+    reader = User.objects.create_user(username="reader", password="pass123")
+    admin = User.objects.create_user(username="admin", password="pass123", is_admin=True)
+    books = Book.objects.bulk_create(
+        Book(title=f"Guard {i}", author=f"Author {i % 3}", isbn=f"{1900000000000 + i}", page_count=10 + i)
+        for i in range(30)
+    )
+    for book in books[10:25]:
+        Loan.objects.create(user=reader if book.pk % 2 else admin, book=book)
+    loan = Loan.objects.filter(user=reader).first()
+    Book.objects.filter(pk__in=[book.pk for book in books[10:25]]).update(available=False, available_copies=0)
+    refresh = RefreshToken.for_user(reader)
+    return {
+        "tokens": {"reader": str(refresh.access_token), "admin": str(RefreshToken.for_user(admin).access_token)},
+        "ids": {"book": books[0].pk, "other_book": books[1].pk, "loan": loan.pk, "refresh": str(refresh)},
+    }
+
+
+def _fill(value, ids):
+    if isinstance(value, str):
+        filled = value.format(**ids)
+        return int(filled) if filled.isdigit() else filled
+    if isinstance(value, list):
+        return [_fill(item, ids) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, ids) for key, item in value.items()}
+    return value
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("method, path, data, role, budget", QUERY_BUDGETS)
+def test_route_query_budget(guard_data, method, path, data, role, budget):
+    client = APIClient()
+    if role:
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {guard_data['tokens'][role]}")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(client, method)(_fill(path, guard_data["ids"]), _fill(data, guard_data["ids"]),
+                                           format='json')
+    assert response.status_code < 400, response.data
+    statements = [q["sql"] for q in queries.captured_queries if "SAVEPOINT" not in q["sql"]]
+    assert len(statements) <= budget, "\n".join(statements)
+
+
+def _admin_client():
+    client = Client()
+    client.force_login(User.objects.get(username="admin"))
+    return client
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("path", ADMIN_CHANGELISTS)
+def test_admin_changelist_queries_do_not_grow_with_rows(guard_data, path):
+    client = _admin_client()
+
+    def statements():
+        client.get(path)  # Caches the top authors
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+        assert response.status_code == 200
+        return [q["sql"] for q in queries.captured_queries if "SAVEPOINT" not in q["sql"]]
+
+    before = statements()
+    reader = User.objects.get(username="reader")
+    books = Book.objects.bulk_create(
+        Book(title=f"Guard extra {i}", author=f"Author {i % 7}", isbn=f"{1910000000000 + i}", page_count=5)
+        for i in range(40)
+    )
+    Loan.objects.bulk_create(Loan(user=reader, book=book, due_at=due_date(timezone.now())) for book in books)
+    after = statements()
+    assert len(after) == len(before), "\n".join(after)
+    assert not any("DISTINCT" in sql for sql in after)
+
+
+@pytest.mark.django_db
+def test_admin_search_and_author_filter(guard_data):
+    client = _admin_client()
+    loans = client.get("/admin/library/loan/?q=reader").context["cl"].result_list
+    assert loans and {loan.user.username for loan in loans} == {"reader"}
+    loans = client.get("/admin/library/loan/?q=guard 12").context["cl"].result_list
+    assert [loan.book.title for loan in loans] == ["Guard 12"]
+
+    response = client.get("/admin/library/book/?author=Author 1")
+    assert {book.author for book in response.context["cl"].result_list} == {"Author 1"}
+    assert b"Author 0 (10)" in response.content and b'name="author" value="Author 1"' in response.content
+
+
+@pytest.mark.django_db
+def test_admin_author_filter_reads_only_the_author_index_and_outlives_borrows(guard_data):
+    client = _admin_client()
+
+    def grouped_queries():
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/admin/library/book/")
+        assert b"Author 0 (10)" in response.content
+        return [q["sql"] for q in queries.captured_queries if "GROUP BY" in q["sql"]]
+
+    cold = grouped_queries()
+    assert len(cold) == 1 and full_scans(cold[0]) == []
+    borrow_book(User.objects.get(username="reader"), Book.objects.get(title="Guard 0"))
+    assert grouped_queries() == []
@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from library.models import User, Book
+from library.tests.helpers import full_scans
+
+BOOK_COUNT = 5000
+AUTHORS = [f"Author {i:03d}" for i in range(200)]
+
+# Every query shape the book list supports, plus the admin changelist's filters and ordering.
+API_SHAPES = [
+    "/api/books/",
+    "/api/books/?page=3",
+    "/api/books/?author=Author 007",
+    "/api/books/?available=true",
+    "/api/books/?available=false",
+    "/api/books/?author=Author 007&available=true",
+    "/api/books/?ordering=title",
+    "/api/books/?ordering=-title",
+    "/api/books/?ordering=page_count",
+    "/api/books/?ordering=-page_count",
+    "/api/books/?search=title",
+    "/api/books/?pagination=cursor",
+    "/api/books/?pagination=cursor&ordering=title",
+    "/api/books/?pagination=cursor&ordering=-page_count&available=true",
+    "/api/books/42/",
+]
+ADMIN_SHAPES = [
+    "/admin/library/book/",
+    "/admin/library/book/?author=Author+007",
+    "/admin/library/book/?available__exact=1",
+    "/admin/library/book/?o=2",
+]
+
+
+@pytest.fixture
+def large_catalog():
+    Book.objects.bulk_create(
+        Book(title=f"Title {(i * 7919) % BOOK_COUNT:05d}", author=AUTHORS[i % len(AUTHORS)],
+             isbn=f"{1800000000000 + i}", page_count=50 + (i * 31) % 900, available=i % 4 != 0,
+             available_copies=int(i % 4 != 0))
+        for i in range(BOOK_COUNT)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def _scans(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+        # Follow one keyset page so the seek query is covered as well
+        if response.status_code == 200 and "pagination=cursor" in url:
+            client.get(response.data["next"])
+    assert response.status_code == 200, url
+    selects = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("SELECT")]
+    return {table for sql in selects if "library_book" in sql for table in full_scans(sql)}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", API_SHAPES)
+def test_book_api_query_shapes_avoid_full_scans(large_catalog, url):
+    assert "library_book" not in _scans(APIClient(), url.replace("/42/", f"/{Book.objects.first().pk}/"))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", ADMIN_SHAPES)
+def test_book_admin_query_shapes_avoid_full_scans(large_catalog, url):
+    client = APIClient()
+    client.force_login(User.objects.create_user(username="planner", password="pass123", is_admin=True))
+    assert "library_book" not in _scans(client, url)
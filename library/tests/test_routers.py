@@ -0,0 +1,95 @@
+import time
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from rest_framework.request import Request
+from rest_framework_simplejwt.tokens import RefreshToken
+from library import routers
+from library.authentication import CachedJWTAuthentication
+from library.middleware import ReplicaRoutingMiddleware
+from library.models import User, Book
+
+# Routing is only visible outside the per-test transaction, hence transaction=True
+pytestmark = [pytest.mark.django_db(transaction=True), pytest.mark.usefixtures("replica")]
+
+
+@pytest.fixture
+def replica():
+    # The alias is never connected to: only the routing decisions are checked
+    with override_settings(LIBRARY_READ_REPLICAS=["replica1"], LIBRARY_REPLICA_STICKY_SECONDS=5):
+        yield
+
+
+def test_router_sends_reads_to_replicas_and_writes_to_the_primary():
+    assert Book.objects.all().db == "replica1"
+    with routers.use_primary():
+        assert Book.objects.all().db == "default"
+    with transaction.atomic():
+        assert Book.objects.all().db == "default"
+    assert Book.objects.all().db == "replica1"
+
+    router = routers.ReplicaRouter()
+    assert router.db_for_write(Book) == "default"
+    assert router.allow_migrate("replica1", "library") is False
+    assert router.allow_migrate("default", "library") is None
+
+
+def test_writers_read_their_writes_until_the_sticky_window_ends():
+    user = User.objects.create_user(username="writer", password="pass123")
+    factory = RequestFactory()
+    seen = []
+
+    def view(request):
+        if "HTTP_AUTHORIZATION" in request.META:
+            request.user, _ = CachedJWTAuthentication().authenticate(Request(request))
+        elif request.method == "POST":
+            request.user = user
+        seen.append(Book.objects.all().db)
+        return HttpResponse(status=201 if request.method == "POST" else 200)
+
+    middleware = ReplicaRoutingMiddleware(view)
+    middleware(factory.get("/api/books/"))
+    assert not routers.user_is_pinned(user.pk)
+    middleware(factory.post("/api/loans/"))
+    assert routers.user_is_pinned(user.pk)
+
+    token = RefreshToken.for_user(user).access_token
+    middleware(factory.get("/api/loans/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+    middleware(factory.get("/api/books/"))
+    assert seen == ["replica1", "default", "default", "replica1"]
+
+
+def test_every_read_of_a_request_goes_to_the_same_replica():
+    seen = []
+
+    def view(request):
+        seen.append({Book.objects.all().db for _ in range(20)})
+        return HttpResponse()
+
+    middleware = ReplicaRoutingMiddleware(view)
+    with override_settings(LIBRARY_READ_REPLICAS=["replica1", "replica2"]):
+        for _ in range(20):
+            middleware(RequestFactory().get("/api/books/"))
+    assert all(len(aliases) == 1 for aliases in seen)
+    # Requests still spread over the replicas
+    assert set.union(*seen) == {"replica1", "replica2"}
+
+
+def test_fresh_reads_use_the_primary_within_the_replication_window():
+    with routers.fresh_reads(time.time() - 1):
+        assert Book.objects.all().db == "default"
+    with routers.fresh_reads(time.time() - 60):
+        assert Book.objects.all().db == "replica1"
+
+
+def test_replicas_require_a_cache_shared_by_the_workers(tmp_path):
+    with pytest.raises(ImproperlyConfigured):
+        routers.check_shared_cache()
+    shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": str(tmp_path)}}
+    with override_settings(CACHES=shared):
+        routers.check_shared_cache()
+    with override_settings(LIBRARY_READ_REPLICAS=[]):
+        routers.check_shared_cache()
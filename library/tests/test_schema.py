@@ -0,0 +1,56 @@
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+from django.test import Client, override_settings
+from library import schema
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    schema.document.cache_clear()
+    with override_settings(LIBRARY_OPENAPI_DIR=str(tmp_path)):
+        yield tmp_path
+    schema.document.cache_clear()
+
+
+def test_schema_is_generated_once_and_revalidated_with_etag(artifacts):
+    client = Client()
+    response = client.get("/swagger.json")
+    assert response.status_code == 200
+    assert response["Cache-Control"] == f"public, max-age={settings.LIBRARY_OPENAPI_MAX_AGE}"
+    paths = response.json()["paths"]
+    assert {"name": "facets", "in": "query", "type": "boolean"}.items() <= next(
+        parameter for parameter in paths["/books/"]["get"]["parameters"] if parameter["name"] == "facets"
+    ).items()
+    assert [path.name for path in artifacts.iterdir()] == [schema.artifact_path().name]
+
+    assert client.get("/swagger.json", HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+    # drf_yasg's URL for the document still works
+    assert client.get("/swagger/?format=openapi").content == response.content
+    for page in ("/swagger/", "/redoc/"):
+        ui = client.get(page)
+        assert ui.status_code == 200 and b"/swagger.json" in ui.content
+
+
+def test_workers_serve_the_existing_artifact_and_stale_ones_are_removed(artifacts):
+    (artifacts / "openapi-0000000000000000.json").write_bytes(b"{}")
+    schema.artifact_path().write_bytes(b'{"swagger": "2.0"}')
+    assert schema.document().body == b'{"swagger": "2.0"}'
+
+    schema.write_artifact()
+    assert [path.name for path in artifacts.iterdir()] == [schema.artifact_path().name]
+
+
+def test_api_workers_do_not_import_drf_yasg():
+    code = (
+        "import sys, django; django.setup(); "
+        "from django.urls import resolve; resolve('/api/books/'); "
+        "print(sorted(name for name in sys.modules if name.startswith('drf_yasg.')))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        env={"DJANGO_SETTINGS_MODULE": "library_system.settings", "PATH": ""}, cwd=settings.BASE_DIR,
+    )
+    assert result.stdout.strip() == "[]"
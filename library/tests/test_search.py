@@ -0,0 +1,61 @@
+import pytest
+from rest_framework.test import APIClient
+from library.models import Book
+
+
+def _titles(response):
+    return [book["title"] for book in response.data["results"]]
+
+
+@pytest.mark.django_db
+def test_search_matches_words_and_prefixes():
+    Book.objects.create(title="Harry Potter", author="Rowling", isbn="1000000000001", page_count=300)
+    Book.objects.create(title="The Hobbit", author="Tolkien", isbn="1000000000002", page_count=310)
+
+    client = APIClient()
+    assert _titles(client.get("/api/books/", {"search": "potter"})) == ["Harry Potter"]
+    assert _titles(client.get("/api/books/", {"search": "tolk"})) == ["The Hobbit"]
+    assert _titles(client.get("/api/books/", {"search": "1000000000002"})) == ["The Hobbit"]
+    assert _titles(client.get("/api/books/", {"search": "harry tolkien"})) == []
+
+
+@pytest.mark.django_db
+def test_search_ranks_by_relevance():
+    Book.objects.create(title="Cooking Basics", author="Dune Fan", isbn="2000000000001", page_count=100)
+    Book.objects.create(title="Dune Dune Dune", author="Herbert", isbn="2000000000002", page_count=400)
+
+    response = APIClient().get("/api/books/", {"search": "dune"})
+    assert _titles(response) == ["Dune Dune Dune", "Cooking Basics"]
+
+    # An explicit ordering still wins over relevance
+    response = APIClient().get("/api/books/", {"search": "dune", "ordering": "title"})
+    assert _titles(response) == ["Cooking Basics", "Dune Dune Dune"]
+
+
+@pytest.mark.django_db
+def test_search_index_follows_updates_and_deletes():
+    book = Book.objects.create(title="Old Title", author="Author", isbn="3000000000001", page_count=100)
+    client = APIClient()
+
+    book.title = "New Title"
+    book.save()
+    assert _titles(client.get("/api/books/", {"search": "old"})) == []
+    assert _titles(client.get("/api/books/", {"search": "new"})) == ["New Title"]
+
+    Book.objects.filter(pk=book.pk).update(author="Renamed")
+    assert _titles(client.get("/api/books/", {"search": "renamed"})) == ["New Title"]
+
+    book.delete()
+    assert _titles(client.get("/api/books/", {"search": "new"})) == []
+
+
+@pytest.mark.django_db
+def test_search_ignores_query_syntax():
+    Book.objects.create(title="C++ Primer", author="Lippman", isbn="4000000000001", page_count=900)
+
+    response = APIClient().get("/api/books/", {"search": 'c++ "primer" OR NEAR('})
+    assert response.status_code == 200
+    assert _titles(response) == []
+
+    response = APIClient().get("/api/books/", {"search": '"primer" c++'})
+    assert _titles(response) == ["C++ Primer"]
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from library.models import User, Book, Loan
+from library.renderers import TimedJSONRenderer
+from library.serializers import BookSerializer, LoanSerializer
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("serializer_class", [BookSerializer, LoanSerializer])
+def test_fast_list_serializer_matches_drf(serializer_class):
+    reader = User.objects.create_user(username="reader", password="pass123")
+    for i in range(5):
+        book = Book.objects.create(title=f"Fast {i}", author="Author", isbn=f"{2300000000000 + i}",
+                                   page_count=100 + i, total_copies=i + 1)
+        loan = Loan.objects.create(user=reader, book=book)
+        if i % 2:
+            Loan.objects.filter(pk=loan.pk).update(returned_at=timezone.now() + timedelta(microseconds=i))
+    rows = list(serializer_class.Meta.model.objects.order_by("pk"))
+
+    expected = serializers.ListSerializer(child=serializer_class(), instance=rows).data
+    assert serializer_class(rows, many=True).data == expected
+
+
+@pytest.mark.django_db
+def test_sparse_fieldsets_narrow_output_and_select():
+    Book.objects.create(title="Sparse", author="Author", isbn="2300000000100", page_count=10)
+    client = APIClient()
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/api/books/", {"fields": "title,id", "ordering": "-page_count",
+                                              "pagination": "cursor"})
+    assert response.data["results"] == [{"id": response.data["results"][0]["id"], "title": "Sparse"}]
+    select = queries.captured_queries[-1]["sql"]
+    assert '"library_book"."title"' in select and '"library_book"."isbn"' not in select
+
+    book_id = response.data["results"][0]["id"]
+    assert client.get(f"/api/books/{book_id}/", {"fields": "isbn"}).data == {"isbn": "2300000000100"}
+
+    response = client.get("/api/books/", {"fields": "title,secret"})
+    assert response.status_code == 400
+    assert "secret" in response.data["fields"][0]
+
+
+@pytest.mark.django_db
+def test_sparse_fieldsets_do_not_apply_to_writes():
+    admin = User.objects.create_user(username="admin", password="pass123", is_admin=True)
+    client = APIClient()
+    client.force_authenticate(user=admin)
+
+    response = client.post("/api/books/?fields=id", {"title": "Written", "author": "Author",
+                                                     "isbn": "2300000000200", "page_count": 10}, format="json")
+    assert response.status_code == 201
+    assert response.data["title"] == "Written"
+
+
+@pytest.mark.parametrize("accepted", [None, "application/json; indent=4"])
+def test_renderer_output_matches_drf(monkeypatch, accepted):
+    data = {
+        "text": "café \u2028 <script>", "when": timezone.now(), "day": timezone.now().date(),
+        "price": Decimal("1.50"), "nested": [{1: "int key"}, (1, 2)], "none": None,
+    }
+    expected = JSONRenderer().render(data, accepted)
+
+    monkeypatch.setattr("library.renderers.orjson", None)
+    assert TimedJSONRenderer().render(data, accepted) == expected
+
+    orjson = pytest.importorskip("orjson")
+    monkeypatch.setattr("library.renderers.orjson", orjson)
+    rendered = TimedJSONRenderer().render(data, accepted)
+    assert rendered == expected
+    assert b"\\u2028" in rendered
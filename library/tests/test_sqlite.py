@@ -0,0 +1,54 @@
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from library.management.commands.import_books import Command as ImportCommand
+from library.models import Book, User
+from library.services import borrow_book
+
+PRAGMAS = (
+    "import django; django.setup(); from django.db import connection; cursor = connection.cursor(); "
+    "print(*(cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in ('journal_mode', 'synchronous', 'busy_timeout')))"
+)
+
+
+def _pragmas(tmp_path, production_mode):
+    env = {"DJANGO_SETTINGS_MODULE": "library_system.settings", "PATH": "",
+           "LIBRARY_DATABASE_URL": f"sqlite:///{tmp_path / 'db.sqlite3'}"}
+    if production_mode is not None:
+        env["SQLITE_PRODUCTION_MODE"] = production_mode
+    result = subprocess.run([sys.executable, "-c", PRAGMAS], capture_output=True, text=True, check=True,
+                            env=env, cwd=settings.BASE_DIR)
+    return result.stdout.split()
+
+
+def test_sqlite_production_mode_is_opt_in(tmp_path):
+    # Off by default, so the checked-in database keeps its journal mode
+    assert _pragmas(tmp_path, None)[0] == "delete"
+    assert _pragmas(tmp_path, "True") == ["wal", "1", "10000"]  # synchronous=NORMAL, 10 s busy timeout
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(SQLITE_PRODUCTION_MODE=True)
+def test_only_write_paths_take_the_write_lock_up_front():
+    if connection.vendor != "sqlite":
+        pytest.skip("SQLite only")
+    user = User.objects.create_user(username="locker", password="pass123")
+    book = Book.objects.create(title="Locked", author="Author", isbn="1700000000001", page_count=1)
+
+    with CaptureQueriesContext(connection) as borrow:
+        borrow_book(user, book)
+    with CaptureQueriesContext(connection) as batch:
+        ImportCommand().write_batch({"1700000000002": Book(title="Imported", author="Author", isbn="1700000000002",
+                                                           page_count=1)})
+    with CaptureQueriesContext(connection) as read:
+        with transaction.atomic():
+            Book.objects.count()
+    assert borrow.captured_queries[0]["sql"] == "BEGIN IMMEDIATE"
+    assert batch.captured_queries[0]["sql"] == "BEGIN IMMEDIATE"
+    assert read.captured_queries[0]["sql"] == "BEGIN"
+    assert connection.transaction_mode is None
@@ -0,0 +1,45 @@
+import gc
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import get_resolver
+from library import autocomplete
+from library.fieldsets import readable_fields
+from library.serializers import BookSerializer, LoanSerializer
+from library.startup import warm_up
+
+
+@pytest.mark.django_db
+def test_warm_up_primes_the_resolver_serializers_connections_and_typeahead():
+    connection.close()
+    readable_fields.cache_clear()
+    autocomplete.reset()
+    try:
+        timings = warm_up()
+    finally:
+        gc.unfreeze()
+    assert set(timings) == {"resolver", "rest_framework", "serializers", "databases", "autocomplete", "gc"}
+    assert autocomplete.autocomplete_stats()["built"]
+    assert get_resolver()._populated
+    misses = readable_fields.cache_info().misses
+    readable_fields(BookSerializer), readable_fields(LoanSerializer)
+    assert readable_fields.cache_info().misses == misses
+    assert connection.connection is not None
+
+
+def test_startup_profile_reports_phases_and_imports(tmp_path, monkeypatch):
+    # The profiled boot must not touch db.sqlite3
+    monkeypatch.setenv("LIBRARY_DATABASE_URL", f"sqlite:///{tmp_path / 'boot.sqlite3'}")
+    out = StringIO()
+    call_command("startup_profile", "--path", "/swagger/", "--json", stdout=out)
+    report = json.loads(out.getvalue())
+
+    phases = [row["phase"] for row in report["phases"]]
+    assert phases[:3] == ["settings", "import django", "django.setup"]
+    assert {"import_models library", "ready library", "middleware", "urlconf"} <= set(phases)
+    assert phases[-1] == "first request /swagger/"
+    assert report["status"] == 200
+    assert report["packages"]["django"]["modules"] > 100
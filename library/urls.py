@@ -1,6 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BookViewSet, LoanViewSet, RegisterView, ReturnBookView
+from . import async_views
+from .views import (
+    BookExportView, BookViewSet, BulkReturnView, ChangeFeedView, LoanExportView, LoanViewSet, MetricsView, RegisterView,
+    ReturnBookView,
+)
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 router = DefaultRouter()
@@ -11,6 +15,14 @@ urlpatterns = [
     path('auth/register/', RegisterView.as_view(), name='register'),
     path('auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('return/bulk/', BulkReturnView.as_view(), name='return_books_bulk'),
     path('return/<int:pk>/', ReturnBookView.as_view(), name='return_book'),
+    path('export/books/', BookExportView.as_view(), name='export_books'),
+    path('export/loans/', LoanExportView.as_view(), name='export_loans'),
+    path('changes/', ChangeFeedView.as_view(), name='changes'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('async/books/', async_views.book_list, name='async-book-list'),
+    path('async/books/<int:pk>/', async_views.book_detail, name='async-book-detail'),
+    path('async/loans/', async_views.loan_list, name='async-loan-list'),
     path('', include(router.urls)),
 ]
@@ -1,14 +1,36 @@
-from rest_framework import viewsets, permissions, generics, status, filters, serializers
+from rest_framework import viewsets, mixins, permissions, generics, status, filters, serializers, exceptions
+from rest_framework.decorators import action
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.shortcuts import render
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_yasg.utils import swagger_auto_schema
 from typing import Any
 
-from .models import Book, Loan
-from .serializers import BookSerializer, LoanSerializer, RegisterSerializer
+from .autocomplete import DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, autocomplete_stats, suggest
+from .caching import CachedRetrieveListMixin, _not_modified, cache_stats
+from .changes import changes_since
+from .exports import BOOK_EXPORT_FIELDS, EXPORT_CONTENT_TYPES, LOAN_EXPORT_FIELDS, aexport_rows, export_rows
+from .facets import AUTHOR_FACET_SIZE, FACETS_PARAM, book_facets, facets_requested
+from .fieldsets import FIELDS_PARAM, SparseFieldsetMixin
+from .filters import OPEN_LOAN_STATUSES, BookFilter, LoanFilter, LoanHistoryFilter
+from .instrumentation import route_stats
+from .models import Book, Loan, LoanHistory
+from .pagination import LibraryPagination
+from .schema import document, openapi, swagger_auto_schema
+from .search import FullTextSearchFilter
+from .serializers import (
+    BookSerializer, BulkBorrowSerializer, BulkReturnSerializer, ChangeFeedSerializer, LoanHistorySerializer,
+    LoanSerializer, RegisterSerializer,
+)
+from .services import (
+    BookNotAvailable, ConcurrentUpdate, LoanNotFound, borrow_book, borrow_books, return_book, return_books,
+)
 
 
 ROLE_DESCRIPTION = """
@@ -23,6 +45,11 @@ ROLE_DESCRIPTION = """
 *JWT authentication is required for borrowing and returning books.
 """
 
+FIELDS_PARAMETER = openapi.Parameter(
+    FIELDS_PARAM, openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Comma separated fields to return, e.g. `id,title` (all by default).",
+)
+
 
 class RegisterView(generics.CreateAPIView):
     """
@@ -32,42 +59,123 @@ class RegisterView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(CachedRetrieveListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows books to be viewed or edited.
-    Supports filtering, searching and ordering.
+    Supports filtering, full-text searching (ranked by relevance) and ordering.
+    List and detail responses are cached and revalidated with ETags.
+    ``autocomplete`` answers typeahead from an in-process prefix index.
+    ``?facets=true`` adds author and availability counts to the list;
+    ``?fields=`` narrows the output of reads.
     """
     queryset = Book.objects.all().order_by('id')
     serializer_class = BookSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['author', 'available']
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
+    pagination_class = LibraryPagination
+    filterset_class = BookFilter
     search_fields = ['title', 'author', 'isbn']
     ordering_fields = ['title', 'page_count']
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'autocomplete']:
             return [permissions.AllowAny()]
         elif self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [permissions.IsAdminUser()]
         return super().get_permissions()
 
-    @swagger_auto_schema(operation_description=ROLE_DESCRIPTION)
+    @swagger_auto_schema(operation_description=ROLE_DESCRIPTION, manual_parameters=[
+        FIELDS_PARAMETER,
+        openapi.Parameter(FACETS_PARAM, openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+                          description=f"Add counts of matching books per availability and for the "
+                                      f"{AUTHOR_FACET_SIZE} most frequent authors."),
+    ])
     def list(self, request: Any, *args: Any, **kwargs: Any) -> Response:
         """
         List all books with filtering, searching, and ordering options.
         """
         return super().list(request, *args, **kwargs)
 
+    def paginate_queryset(self, queryset):
+        self.filtered_queryset = queryset
+        return super().paginate_queryset(queryset)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if facets_requested(self.request.query_params):
+            response.data['facets'] = book_facets(self.filtered_queryset, self.request.query_params)
+        return response
+
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Typed prefix."),
+        openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                          description=f"Suggestions to return (default {DEFAULT_SUGGESTIONS}, "
+                                      f"at most {MAX_SUGGESTIONS})."),
+    ], responses={200: 'Matching titles and authors, best first.'})
+    @action(detail=False, methods=['get'], filter_backends=[], pagination_class=None)
+    def autocomplete(self, request: Any) -> Response:
+        """
+        Suggest titles and authors with a word starting with ``?q=``, for a search box.
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_SUGGESTIONS)), MAX_SUGGESTIONS)
+        except ValueError:
+            limit = DEFAULT_SUGGESTIONS
+        return Response({'query': query, 'results': suggest(query, max(limit, 1))})
+
 
-class LoanViewSet(viewsets.ModelViewSet):
+class LoanViewSet(SparseFieldsetMixin, mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                  viewsets.GenericViewSet):
     """
     API endpoint that allows loans (borrowing books) to be viewed or created.
-    Only authenticated users can create loans.
+    Loans are closed through ``/api/return/``, which puts the copy back; they
+    cannot be edited or deleted here.
+    Only authenticated users can create loans. Users see their own loans;
+    administrators see everyone's. Filter with ``?status=active|overdue|returned``.
+    Reads cover archived loans too, except for open loans (``active`` and
+    ``overdue``), which only need the loan table. ``?fields=`` narrows the output of reads.
     """
-    queryset = Loan.objects.all()
+    queryset = Loan.objects.all().order_by('id')
+    history_queryset = LoanHistory.objects.all().order_by('id')
     serializer_class = LoanSerializer
+    filter_backends = [DjangoFilterBackend]
+    pagination_class = LibraryPagination
     permission_classes = [permissions.IsAuthenticated]
 
+    def http_method_not_allowed(self, request: Any, *args: Any, **kwargs: Any) -> Response:
+        if request.method in ('PUT', 'PATCH', 'DELETE'):
+            raise exceptions.MethodNotAllowed(
+                request.method, detail='Loans cannot be edited or deleted; return them with POST /api/return/<id>/.',
+            )
+        return super().http_method_not_allowed(request, *args, **kwargs)
+
+    @property
+    def filterset_class(self):
+        return LoanHistoryFilter if self.reads_history() else LoanFilter
+
+    def reads_history(self) -> bool:
+        # Schema generation pairs the filterset with the class-level queryset;
+        # both variants take the same parameters and return the same fields.
+        if getattr(self, 'swagger_fake_view', False):
+            return False
+        return (self.action in ('list', 'retrieve')
+                and self.request.query_params.get('status') not in OPEN_LOAN_STATUSES)
+
+    def get_queryset(self):
+        queryset = self.history_queryset.all() if self.reads_history() else super().get_queryset()
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset.none()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+    @swagger_auto_schema(manual_parameters=[FIELDS_PARAMETER])
+    def list(self, request: Any, *args: Any, **kwargs: Any) -> Response:
+        """
+        List the caller's loans (everyone's for administrators).
+        """
+        return super().list(request, *args, **kwargs)
+
     @swagger_auto_schema(operation_description=ROLE_DESCRIPTION)
     def create(self, request: Any, *args: Any, **kwargs: Any) -> Response:
         """
@@ -78,14 +186,35 @@ class LoanViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer: serializers.ModelSerializer) -> None:
         """
-        Override to update book availability when loan is created.
+        Borrow the book atomically, failing if another request got it first.
         """
-        book = serializer.validated_data['book']
-        if not book.available:
-            raise serializers.ValidationError("Book is not available for borrowing.")
-        book.available = False
-        book.save()
-        serializer.save(user=self.request.user)
+        try:
+            serializer.instance = borrow_book(self.request.user, serializer.validated_data['book'])
+        except BookNotAvailable as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def get_serializer_class(self):
+        if self.action == 'bulk':
+            return BulkBorrowSerializer
+        if self.reads_history():
+            return LoanHistorySerializer
+        return super().get_serializer_class()
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request: Any) -> Response:
+        """
+        Borrow several books in one request.
+
+        Every book is processed in a single transaction; unavailable or
+        unknown books are reported per item and do not fail the batch.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            results = borrow_books(request.user, serializer.validated_data['books'])
+        except ConcurrentUpdate as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(_bulk_summary(results, 'borrowed'), status=status.HTTP_200_OK)
 
 
 class ReturnBookView(APIView):
@@ -108,12 +237,151 @@ class ReturnBookView(APIView):
             A JSON response indicating success or failure.
         """
         try:
-            loan = Loan.objects.get(pk=pk, user=request.user, returned_at__isnull=True)
-        except Loan.DoesNotExist:
-            return Response({'error': 'Loan not found or already returned'}, status=status.HTTP_404_NOT_FOUND)
-
-        loan.returned_at = timezone.now()
-        loan.book.available = True
-        loan.book.save()
-        loan.save()
+            return_book(request.user, pk)
+        except LoanNotFound as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_404_NOT_FOUND)
         return Response({'status': 'Book returned successfully'}, status=status.HTTP_200_OK)
+
+
+class BulkReturnView(generics.GenericAPIView):
+    """
+    API endpoint to return several borrowed books at once.
+    Only the caller's open loans are returned; other ids are reported per item.
+    """
+    serializer_class = BulkReturnSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request: Any) -> Response:
+        """
+        Mark the given loans as returned and put their books back on the shelf.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            results = return_books(request.user, serializer.validated_data['loans'])
+        except ConcurrentUpdate as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(_bulk_summary(results, 'returned'), status=status.HTTP_200_OK)
+
+
+def _bulk_summary(results: list, succeeded: str) -> dict:
+    done = sum(1 for result in results if result['status'] == succeeded)
+    return {succeeded: done, 'failed': len(results) - done, 'results': results}
+
+
+class ExportView(APIView):
+    """
+    Base for admin-only endpoints that stream a whole table as CSV or JSON lines.
+
+    ``?output=csv|jsonl|ndjson`` picks the format (CSV by default); other query
+    parameters are applied through ``filterset_class``. Under ASGI the rows are
+    streamed from an async iterator.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    queryset = None
+    filterset_class = None
+    export_fields = ()
+    export_name = 'export'
+
+    def get(self, request: Any) -> Any:
+        fmt = request.query_params.get('output', 'csv')
+        if fmt not in EXPORT_CONTENT_TYPES:
+            return Response({'output': [f"Choose one of: {', '.join(EXPORT_CONTENT_TYPES)}."]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        filterset = self.filterset_class(request.query_params, queryset=self.queryset.all())
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # The rows are read after the response leaves the routing middleware: pick the database now
+        queryset = filterset.qs
+        queryset = queryset.using(queryset.db)
+        stream = aexport_rows if isinstance(request._request, ASGIRequest) else export_rows
+        response = StreamingHttpResponse(
+            stream(queryset, self.export_fields, fmt), content_type=EXPORT_CONTENT_TYPES[fmt],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.export_name}.{fmt}"'
+        return response
+
+
+class BookExportView(ExportView):
+    """
+    API endpoint streaming the catalog. Honors the book list's ``author`` and ``available`` filters.
+    """
+    queryset = Book.objects.all()
+    filterset_class = BookFilter
+    export_fields = BOOK_EXPORT_FIELDS
+    export_name = 'books'
+
+
+class LoanExportView(ExportView):
+    """
+    API endpoint streaming the loan history, optionally within a ``borrowed_at`` date range.
+    """
+    queryset = LoanHistory.objects.all()
+    filterset_class = LoanHistoryFilter
+    export_fields = LOAN_EXPORT_FIELDS
+    export_name = 'loans'
+
+
+class ChangeFeedView(generics.GenericAPIView):
+    """
+    Admin-only API endpoint listing the books and loans changed after a sequence number.
+    """
+    serializer_class = ChangeFeedSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(query_serializer=ChangeFeedSerializer,
+                         responses={200: 'Changed objects in sequence order, and the cursor to continue from.'})
+    def get(self, request: Any) -> Response:
+        """
+        Return the books and loans changed after ``?since=``, each with its
+        current data or ``deleted``. Keep requesting with ``since`` set to the
+        response's ``next`` while ``has_more`` is true.
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(changes_since(**serializer.validated_data, context=self.get_serializer_context()))
+
+
+class MetricsView(APIView):
+    """
+    Admin-only API endpoint exposing this process's performance counters.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request: Any) -> Response:
+        return Response({'response_cache': cache_stats(), 'autocomplete': autocomplete_stats(), 'routes': route_stats()})
+
+
+@require_safe
+def openapi_document(request: Any) -> HttpResponse:
+    """
+    Serve the pre-generated OpenAPI document with ``ETag``/``Last-Modified`` and 304 support.
+    """
+    body, etag, last_modified = document()
+    headers = {
+        'ETag': etag, 'Last-Modified': http_date(last_modified),
+        'Cache-Control': f'public, max-age={settings.LIBRARY_OPENAPI_MAX_AGE}',
+    }
+    if _not_modified(request, etag, last_modified):
+        return HttpResponseNotModified(headers=headers)
+    return HttpResponse(body, content_type='application/json', headers=headers)
+
+
+@require_safe
+def swagger_ui(request: Any) -> HttpResponse:
+    """
+    Swagger UI over :func:`openapi_document`. ``?format=openapi`` returns the
+    document itself, as drf_yasg's view did.
+    """
+    if request.GET.get('format') == 'openapi':
+        return openapi_document(request)
+    return render(request, 'library/swagger_ui.html')
+
+
+@require_safe
+def redoc_ui(request: Any) -> HttpResponse:
+    """
+    ReDoc over :func:`openapi_document`.
+    """
+    return render(request, 'library/redoc.html')
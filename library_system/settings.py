@@ -1,7 +1,7 @@
 import os
 import dj_database_url
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'library.instrumentation.InstrumentationMiddleware',
+    'library.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,7 +46,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'library.middleware.AsyncWhiteNoiseMiddleware',
 
 ]
 
@@ -81,19 +83,92 @@ WSGI_APPLICATION = 'library_system.wsgi.application'
 # }
 
 DATABASES = {
-    # PostgreSQL configuration above
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    # PostgreSQL configuration above. LIBRARY_DATABASE_URL points the project at another database, e.g. a
+    # scratch SQLite file for benchmarks; unlike DATABASE_URL, no platform sets it behind your back.
+    'default': dj_database_url.config('LIBRARY_DATABASE_URL', default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
+}
+
+# SQLite production mode for several worker processes (gunicorn -w 3) sharing one file:
+# - WAL journaling lets reads proceed while one connection writes;
+# - synchronous=NORMAL syncs at checkpoints rather than on every commit (still safe in WAL mode);
+# - a busy timeout makes a writer wait for the lock instead of failing with "database is locked".
+# The transactions that read before they write (borrows, returns, batch jobs) also begin with
+# BEGIN IMMEDIATE then, see library.services.write_transaction. Opt-in with SQLITE_PRODUCTION_MODE=True:
+# WAL mode sticks to the database file, which would rewrite the checked-in development database.
+SQLITE_PRODUCTION_MODE = config('SQLITE_PRODUCTION_MODE', default=False, cast=bool)
+if SQLITE_PRODUCTION_MODE and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {
+        **DATABASES['default'].get('OPTIONS', {}),
+        'timeout': config('SQLITE_BUSY_TIMEOUT', default=10, cast=int),
+        'init_command': ';'.join([
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            f"PRAGMA mmap_size={config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int)}",
+        ]),
     }
+
+# Read replicas (DATABASE_REPLICA_URLS=url1,url2) serve safe-method reads; see library/routers.py.
+# Locally, SQLite files kept up to date with ``manage.py sync_replicas`` stand in for them.
+for _number, _url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica{_number}'] = {**dj_database_url.parse(_url), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['library.routers.ReplicaRouter']
+
+# Response cache for the book catalog. Local memory is per process; set
+# REDIS_URL to share the cache (and its invalidations) between workers.
+REDIS_URL = config('REDIS_URL', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'library',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
+LIBRARY_CACHE_ALIAS = 'default'
+# Book responses and authenticated users are only cached by default with REDIS_URL: with local
+# memory, a borrow or a change to a user would only evict them from the worker that made it, and
+# the others (gunicorn -w 3) would serve stale copies until they expire.
+LIBRARY_RESPONSE_CACHE = config('LIBRARY_RESPONSE_CACHE', default=bool(REDIS_URL), cast=bool)
+LIBRARY_RESPONSE_CACHE_TIMEOUT = config('LIBRARY_RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+LIBRARY_AUTH_CACHE_TIMEOUT = config('LIBRARY_AUTH_CACHE_TIMEOUT', default=60 if REDIS_URL else 0, cast=int)
+# How long the admin's list of top authors is cached, whatever changes in the catalog
+LIBRARY_TOP_AUTHORS_TIMEOUT = config('LIBRARY_TOP_AUTHORS_TIMEOUT', default=3600, cast=int)
+# Seconds before a process rebuilds its typeahead index even without changes
+LIBRARY_AUTOCOMPLETE_MAX_AGE = config('LIBRARY_AUTOCOMPLETE_MAX_AGE', default=300, cast=int)
+# Loans are due back this many days after they are borrowed
+LIBRARY_LOAN_PERIOD_DAYS = config('LIBRARY_LOAN_PERIOD_DAYS', default=14, cast=int)
+# Returned loans older than this are moved to the archive by ``manage.py archive_loans``
+LIBRARY_LOAN_ARCHIVE_DAYS = config('LIBRARY_LOAN_ARCHIVE_DAYS', default=365, cast=int)
+LIBRARY_READ_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica')]
+# Users who wrote read from the primary for this long; also the longest replication lag tolerated
+LIBRARY_REPLICA_STICKY_SECONDS = config('LIBRARY_REPLICA_STICKY_SECONDS', default=5, cast=int)
+# Where ``manage.py generate_openapi`` (or the first request for it) writes the OpenAPI document
+LIBRARY_OPENAPI_DIR = config('LIBRARY_OPENAPI_DIR', default=str(BASE_DIR / 'openapi'))
+LIBRARY_OPENAPI_MAX_AGE = config('LIBRARY_OPENAPI_MAX_AGE', default=300, cast=int)
+# How long /api/changes/ holds back new changes. PostgreSQL can commit sequence numbers
+# out of order, SQLite cannot (see library/changes.py)
+LIBRARY_CHANGES_SETTLE_SECONDS = config(
+    'LIBRARY_CHANGES_SETTLE_SECONDS', default=5 if DATABASES['default']['ENGINE'].endswith('postgresql') else 0,
+    cast=int,
+)
+# Have each WSGI worker warm up (see library/startup.py) before it takes traffic
+LIBRARY_WARMUP = config('LIBRARY_WARMUP', default=False, cast=bool)
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'library.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'library.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -104,6 +179,22 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# One line per request from library.instrumentation.InstrumentationMiddleware
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'library.requests': {
+            'handlers': ['console'],
+            'level': config('REQUEST_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,22 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Library API",
-        default_version='v1',
-        description="API for Library Management System",
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from library.views import openapi_document, redoc_ui, swagger_ui
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('library.urls')),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('swagger.json', openapi_document, name='schema-json'),
+    path('swagger/', swagger_ui, name='schema-swagger-ui'),
+    path('redoc/', redoc_ui, name='schema-redoc'),
 ]